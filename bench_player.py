@@ -0,0 +1,1275 @@
+# --- START OF FILE bench_player.py ---
+#
+# Benchmarks de player.py que se pueden ejecutar en Linux, sin Windows ni instaladores reales.
+# Uso:  python bench_player.py [descargas catalogo ...] [--mb 64] [--kbps-conexion 4096] [--apps 300]
+#                              [--copia-mb 1024] [--json resultados.json] [--comparar anterior.json]
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import player
+
+# --- INSTALADORES FALSOS ---
+# Script Python ejecutable que se hace pasar por un instalador. Su perfil llega en los argumentos
+# (como args_instalacion): segundos=0.2 codigo=0 cpu=0.5 (fracción de tiempo quemando CPU) io_mb=4
+# (MB escritos y sincronizados a disco); fallos=2 codigo_fallo=1618 estado=RUTA (las 2 primeras
+# ejecuciones salen con 1618, contadas en RUTA), colgar=1 (se queda parado sin hacer nada) y
+# salida_mb=8 (escribe 8 MB en stdout y otros tantos en stderr).
+_INSTALADOR_FALSO = """#!{python}
+import hashlib, os, sys, tempfile, time
+perfil = dict(a.split("=", 1) for a in sys.argv[1:] if "=" in a)
+if perfil.get("estado"):
+    ejecuciones = int(open(perfil["estado"]).read()) + 1 if os.path.exists(perfil["estado"]) else 1
+    with open(perfil["estado"], "w") as f:
+        f.write(str(ejecuciones))
+    if ejecuciones <= int(perfil.get("fallos", 0)):
+        sys.exit(int(perfil.get("codigo_fallo", 1618)))
+if perfil.get("colgar"):
+    time.sleep(3600)
+for i in range(int(perfil.get("salida_mb", 0)) * 16):
+    linea = ("progreso " + str(i) + " " + "." * 64 + "\\n") * 1024
+    (sys.stdout if i % 2 else sys.stderr).buffer.write(linea.encode()[:64 * 1024])
+segundos = float(perfil.get("segundos", 0))
+cpu = float(perfil.get("cpu", 0))
+io_mb = int(perfil.get("io_mb", 0))
+if io_mb:
+    with tempfile.TemporaryFile() as f:
+        bloque = os.urandom(1024 * 1024)
+        for _ in range(io_mb):
+            f.write(bloque)
+        f.flush()
+        os.fsync(f.fileno())
+fin = time.perf_counter() + segundos
+h = hashlib.sha256()
+while time.perf_counter() < fin:
+    if cpu > 0:
+        t0 = time.perf_counter()
+        while time.perf_counter() - t0 < 0.01 * cpu:
+            h.update(b"x" * 4096)
+    time.sleep(min(0.01 * (1 - cpu), max(0.0, fin - time.perf_counter())))
+sys.exit(int(perfil.get("codigo", 0)))
+"""
+
+def contenido_instalador_falso(relleno=0):
+    # El relleno (un comentario final) da al instalador el tamaño que se quiera descargar o copiar
+    return _INSTALADOR_FALSO.format(python=sys.executable).encode() + b"#" * relleno + b"\n"
+
+def crear_instalador_falso(ruta, relleno=0):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "wb") as f:
+        f.write(contenido_instalador_falso(relleno))
+    os.chmod(ruta, 0o755)
+    return ruta
+
+def perfil_instalador(segundos=0.0, codigo=0, cpu=0.0, io_mb=0, **extra):
+    return [f"segundos={segundos}", f"codigo={codigo}", f"cpu={cpu}", f"io_mb={io_mb}"] + [f"{k}={v}" for k, v in extra.items()]
+
+# --- SERVIDOR HTTP DE PRUEBA ---
+class _ManejadorPrueba(BaseHTTPRequestHandler):
+    # Sirve self.server.contenido con soporte opcional de Range y limitación por conexión
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.conexiones_abiertas += 1
+
+    def _cabeceras_comunes(self):
+        if self.server.rangos:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", self.server.etag)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.server.contenido)))
+        self._cabeceras_comunes()
+        self.end_headers()
+
+    def do_GET(self):
+        contenido = self.server.contenido
+        if self.headers.get("If-None-Match") == self.server.etag:
+            self.send_response(304)
+            self._cabeceras_comunes()
+            self.end_headers()
+            return
+        inicio, fin = 0, len(contenido) - 1
+        rango = self.headers.get("Range")
+        if rango and self.server.rangos and rango.startswith("bytes="):
+            a, _, b = rango[6:].partition("-")
+            inicio = int(a)
+            fin = min(int(b), fin) if b else fin
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {inicio}-{fin}/{len(contenido)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(fin - inicio + 1))
+        self._cabeceras_comunes()
+        self.end_headers()
+        datos = memoryview(contenido)[inicio:fin + 1]
+        with self.server.lock:
+            if self.server.cortes_pendientes > 0:
+                # Simula un corte de red: se envía solo una parte y se cierra la conexión
+                self.server.cortes_pendientes -= 1
+                datos = datos[:len(datos) // 2]
+                self.close_connection = True
+            self.server.bytes_servidos += len(datos)
+        self._enviar(datos)
+
+    def _enviar(self, datos):
+        bps = self.server.bytes_por_segundo_conexion
+        total = self.server.bytes_por_segundo_total
+        trozo = 64 * 1024
+        t0 = time.perf_counter()
+        enviado = 0
+        try:
+            for i in range(0, len(datos), trozo):
+                if total:
+                    # Enlace compartido: cada trozo reserva su hueco en el reparto de todas las conexiones
+                    with self.server.lock:
+                        turno = max(time.perf_counter(), self.server.siguiente_envio)
+                        self.server.siguiente_envio = turno + min(trozo, len(datos) - i) / total
+                    espera = turno - time.perf_counter()
+                    if espera > 0:
+                        time.sleep(espera)
+                self.wfile.write(datos[i:i + trozo])
+                enviado += min(trozo, len(datos) - i)
+                if bps:
+                    adelanto = enviado / bps - (time.perf_counter() - t0)
+                    if adelanto > 0:
+                        time.sleep(adelanto)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+class ServidorPrueba:
+    def __init__(self, tam_bytes, rangos=True, bytes_por_segundo_conexion=0, cortes=0, contenido=None,
+                 bytes_por_segundo_total=0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _ManejadorPrueba)
+        self.httpd.daemon_threads = True
+        self.httpd.contenido = contenido if contenido is not None else os.urandom(tam_bytes)
+        self.httpd.rangos = rangos
+        self.httpd.etag = f'"{tam_bytes:x}"'
+        self.httpd.bytes_por_segundo_conexion = bytes_por_segundo_conexion
+        self.httpd.bytes_por_segundo_total = bytes_por_segundo_total
+        self.httpd.siguiente_envio = 0.0
+        self.httpd.cortes_pendientes = cortes
+        self.httpd.bytes_servidos = 0
+        self.httpd.conexiones_abiertas = 0
+        self.httpd.lock = threading.Lock()
+        self.hilo = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/instalador.exe"
+
+    def __enter__(self):
+        self.hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+# --- BENCHMARKS ---
+def _medir_descarga(srv, conexiones, directorio):
+    destino = os.path.join(directorio, f"descarga_{conexiones}.bin")
+    t0 = time.perf_counter()
+    metadatos = {}
+    ok = player.descargar_archivo(srv.url, destino, conexiones=conexiones, metadatos=metadatos)
+    segundos = time.perf_counter() - t0
+    with open(destino, 'rb') as f:
+        if not ok or f.read() != srv.httpd.contenido:
+            raise RuntimeError(f"Descarga incorrecta con {conexiones} conexiones")
+    if metadatos["sha256"] != hashlib.sha256(srv.httpd.contenido).hexdigest():
+        raise RuntimeError(f"SHA-256 incorrecto con {conexiones} conexiones")
+    os.remove(destino)
+    return segundos
+
+def bench_descargas(args):
+    tam = args.mb * 1024 * 1024
+    bps = args.kbps_conexion * 1024
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rangos in (True, False):
+            with ServidorPrueba(tam, rangos=rangos, bytes_por_segundo_conexion=bps) as srv:
+                for conexiones in (1, 2, 4, 8):
+                    if not rangos and conexiones > 1:
+                        continue
+                    segundos = _medir_descarga(srv, conexiones, tmp)
+                    resultados.append(("rangos" if rangos else "sin rangos", conexiones, segundos, args.mb / segundos))
+    print(f"Descarga de {args.mb} MB, límite por conexión {args.kbps_conexion} KB/s")
+    print(f"{'servidor':<12}{'conexiones':>12}{'segundos':>12}{'MB/s':>10}")
+    for servidor, conexiones, segundos, mbs in resultados:
+        print(f"{servidor:<12}{conexiones:>12}{segundos:>12.2f}{mbs:>10.1f}")
+    return {f"{servidor.replace(' ', '_')}_{conexiones}": {"segundos": segundos, "mb_s": mbs}
+            for servidor, conexiones, segundos, mbs in resultados}
+
+def _descargar_a_la_vez(srv, conexiones_por_descarga, directorio):
+    # Una descarga por elemento, todas a la vez; devuelve los segundos de cada una
+    segundos = [None] * len(conexiones_por_descarga)
+    def descargar(i, conexiones):
+        destino = os.path.join(directorio, f"simultanea_{i}.bin")
+        t0 = time.perf_counter()
+        if player.descargar_archivo(srv.url, destino, conexiones=conexiones):
+            segundos[i] = time.perf_counter() - t0
+            os.remove(destino)
+    hilos = [threading.Thread(target=descargar, args=(i, c)) for i, c in enumerate(conexiones_por_descarga)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    if None in segundos:
+        raise RuntimeError("Alguna descarga simultánea falló")
+    return segundos
+
+def bench_limite_descarga(args):
+    # 1) Tope global de 4x el límite por conexión con 3 descargas simultáneas de 8, 1 y 1 conexiones: el
+    #    total no pasa del tope y cada descarga recibe su parte aunque abra más conexiones.
+    # 2) Servidor tras un enlace de 4x el límite por conexión: 64 rangos con las conexiones fijas al máximo
+    #    frente a la concurrencia adaptativa, que debería bajar hacia 4 sin perder caudal.
+    bps = args.kbps_conexion * 1024
+    tope = 4 * bps
+    originales = player.DESCARGA_LIMITE_BPS, player.DESCARGA_CONCURRENCIA_ADAPTATIVA
+    resultados = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tam = args.mb // 2 * 1024 * 1024
+            with ServidorPrueba(tam) as srv:
+                player.fijar_limite_descarga(tope)
+                t0 = time.perf_counter()
+                segundos = _descargar_a_la_vez(srv, (8, 1, 1), tmp)
+                total = time.perf_counter() - t0
+            caudales = [tam / s / 1024 / 1024 for s in segundos]
+            resultados["tope"] = {"mb_s_total": 3 * tam / total / 1024 / 1024, "mb_s_por_descarga": caudales}
+            print(f"Tope de {tope // 1024 // 1024} MB/s, 3 descargas de {tam // 1024 // 1024} MB con 8/1/1 conexiones: "
+                  f"{resultados['tope']['mb_s_total']:.1f} MB/s en total, por descarga "
+                  f"{' / '.join(f'{c:.1f}' for c in caudales)} MB/s")
+            tam = 4 * args.mb * 1024 * 1024
+            with ServidorPrueba(tam, bytes_por_segundo_conexion=bps, bytes_por_segundo_total=tope) as srv:
+                for adaptativa in (False, True):
+                    player.DESCARGA_CONCURRENCIA_ADAPTATIVA = adaptativa
+                    player.fijar_limite_descarga(0)
+                    t0 = time.perf_counter()
+                    _descargar_a_la_vez(srv, (64,), tmp)
+                    segundos = time.perf_counter() - t0
+                    _, concurrencia = player.controles_descarga()
+                    limites = [limite for _, limite, _ in concurrencia.ajustes] or [concurrencia.limite]
+                    modo = "adaptativa" if adaptativa else "fija"
+                    resultados[modo] = {"segundos": segundos, "mb_s": tam / segundos / 1024 / 1024,
+                                        "conexiones_medias": sum(limites) / len(limites), "limite_final": concurrencia.limite}
+                    print(f"Enlace de {tope // 1024 // 1024} MB/s ({args.kbps_conexion // 1024} MB/s por conexión), "
+                          f"{tam // 1024 // 1024} MB en 64 rangos, concurrencia {modo}: {segundos:.2f} s, "
+                          f"{resultados[modo]['mb_s']:.1f} MB/s, límites {limites}")
+    finally:
+        player.DESCARGA_CONCURRENCIA_ADAPTATIVA = originales[1]
+        player.fijar_limite_descarga(originales[0])
+    return resultados
+
+def bench_reanudacion(args):
+    # Cada una de las primeras conexiones se corta a mitad: con reanudación solo se vuelve a
+    # pedir lo que falta, así que lo servido apenas supera el tamaño del fichero.
+    tam = args.mb * 1024 * 1024
+    cortes = 2
+    with tempfile.TemporaryDirectory() as tmp, ServidorPrueba(tam, cortes=cortes) as srv:
+        reintentos, player.DESCARGA_REINTENTOS = player.DESCARGA_REINTENTOS, cortes + 1
+        espera, player.time.sleep = player.time.sleep, lambda s: None
+        try:
+            segundos = _medir_descarga(srv, 1, tmp)
+        finally:
+            player.DESCARGA_REINTENTOS, player.time.sleep = reintentos, espera
+        servidos = srv.httpd.bytes_servidos
+    print(f"Reanudación tras {cortes} cortes: {servidos / tam:.2f}x el tamaño del fichero servido ({segundos:.2f} s)")
+    return {"servido_x": servidos / tam, "segundos": segundos}
+
+def bench_cache(args):
+    tam = args.mb * 1024 * 1024
+    with tempfile.TemporaryDirectory() as tmp, ServidorPrueba(tam, bytes_por_segundo_conexion=args.kbps_conexion * 1024) as srv:
+        cache_dir, player.CACHE_DIR = player.CACHE_DIR, os.path.join(tmp, "cache")
+        try:
+            tiempos = []
+            for _ in range(2):
+                destino = os.path.join(tmp, "instalador.exe")
+                t0 = time.perf_counter()
+                if not player.descargar_con_cache(srv.url, destino):
+                    raise RuntimeError("Descarga con caché fallida")
+                tiempos.append(time.perf_counter() - t0)
+            # Otro instalador que no cabe junto al primero: al expulsar el primero se borra también su
+            # enlace duro en la carpeta de descargas, que si no seguiría ocupando el disco
+            tam_max, player.CACHE_TAM_MAX = player.CACHE_TAM_MAX, tam + tam // 2
+            try:
+                with ServidorPrueba(tam) as otro:
+                    if not player.descargar_con_cache(otro.url, os.path.join(tmp, "otro.exe")):
+                        raise RuntimeError("Descarga con caché fallida")
+            finally:
+                player.CACHE_TAM_MAX = tam_max
+            if os.path.exists(destino):
+                raise RuntimeError("La expulsión de la caché dejó el enlace del instalador en descargas")
+        finally:
+            player.CACHE_DIR = cache_dir
+    print(f"Caché de instaladores ({args.mb} MB): en frío {tiempos[0]:.2f} s, en caliente {tiempos[1] * 1000:.1f} ms; "
+          f"la expulsión libera también el enlace en descargas")
+    return {"frio_s": tiempos[0], "caliente_s": tiempos[1]}
+
+def bench_sesion(args):
+    # Mismo instalador pedido por 4 tareas a la vez y luego 10 veces seguidas (validaciones
+    # contra la caché): se cuentan bytes servidos y conexiones TCP abiertas.
+    import concurrent.futures
+    tam = args.mb * 1024 * 1024
+    with tempfile.TemporaryDirectory() as tmp, ServidorPrueba(tam, bytes_por_segundo_conexion=args.kbps_conexion * 1024) as srv:
+        cache_dir, player.CACHE_DIR = player.CACHE_DIR, os.path.join(tmp, "cache")
+        try:
+            with concurrent.futures.ThreadPoolExecutor(4) as pool:
+                destinos = [os.path.join(tmp, f"app{i}.exe") for i in range(4)]
+                if not all(pool.map(lambda d: player.descargar_con_cache(srv.url, d), destinos)):
+                    raise RuntimeError("Descarga compartida fallida")
+            servidos = srv.httpd.bytes_servidos
+            conexiones = srv.httpd.conexiones_abiertas
+            for _ in range(10):
+                player.descargar_con_cache(srv.url, destinos[0])
+            conexiones_repetidas = srv.httpd.conexiones_abiertas - conexiones
+        finally:
+            player.CACHE_DIR = cache_dir
+    print(f"Single-flight: 4 peticiones simultáneas -> {servidos / tam:.2f}x bytes servidos, {conexiones} conexiones")
+    print(f"Sesión compartida: 10 validaciones repetidas -> {conexiones_repetidas} conexiones nuevas")
+    return {"single_flight_servido_x": servidos / tam, "single_flight_conexiones": conexiones,
+            "conexiones_nuevas_repetidas": conexiones_repetidas}
+
+def bench_verificacion(args):
+    # Hash integrado en la descarga frente a descargar y volver a leer el fichero para hashearlo
+    tam = args.mb * 1024 * 1024
+    with tempfile.TemporaryDirectory() as tmp, ServidorPrueba(tam) as srv:
+        destino = os.path.join(tmp, "instalador.exe")
+        metadatos = {}
+        t0 = time.perf_counter()
+        player.descargar_archivo(srv.url, destino, metadatos=metadatos)
+        integrado = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        with open(destino, 'rb') as f:
+            hashlib.sha256(f.read()).hexdigest()
+        relectura = time.perf_counter() - t0
+    print(f"Verificación SHA-256 ({args.mb} MB, sin límite de red): descarga+hash {integrado:.2f} s "
+          f"(hash {metadatos['segundos_hash']:.2f} s dentro), relectura posterior evitada {relectura:.2f} s")
+    return {"descarga_hash_s": integrado, "hash_s": metadatos["segundos_hash"], "relectura_s": relectura}
+
+def bench_progreso(args):
+    # Descarga sin GUI y con una ventana de progreso real drenando el canal a PROGRESO_HZ
+    tam = args.mb * 1024 * 1024
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp, ServidorPrueba(tam) as srv:
+        resultados["sin GUI"] = _medir_descarga(srv, player.DESCARGA_CONEXIONES, tmp)
+        try:
+            import tkinter as tk
+            from tkinter import ttk
+            root = tk.Tk()
+        except Exception as e:  # Sin display (p. ej. CI) no hay GUI que medir
+            print(f"Progreso con GUI omitido: {e}")
+            root = None
+        if root is not None:
+            root.withdraw()
+            player.progress_window = tk.Toplevel(root)
+            player.progress_bar = ttk.Progressbar(player.progress_window, mode="determinate")
+            player.progress_label_status = ttk.Label(player.progress_window)
+            player.progress_label_percentage = ttk.Label(player.progress_window)
+            resultado = {}
+            def trabajar():
+                resultado["segundos"] = _medir_descarga(srv, player.DESCARGA_CONEXIONES, tmp)
+                root.after(0, root.quit)
+            player.progress_window.after(0, player._drenar_canal_progreso)
+            threading.Thread(target=trabajar, daemon=True).start()
+            root.mainloop()
+            root.destroy()
+            player.progress_window = None
+            resultados["con GUI"] = resultado["segundos"]
+    for modo, segundos in resultados.items():
+        print(f"Descarga {args.mb} MB {modo}: {segundos:.2f} s ({args.mb / segundos:.1f} MB/s)")
+    return resultados
+
+def bench_planificador(args):
+    # 6 instaladores silenciosos simulados (sleep): en secuencia tardan la suma, con el planificador
+    # lo que el más lento. Además, coste fijo por tarea con 500 tareas vacías.
+    duraciones = {"A": 0.3, "B": 0.5, "C": 0.2, "D": 0.4, "E": 0.6, "F": 0.1}
+    t0 = time.perf_counter()
+    player.PlanificadorTareas(duraciones, max_paralelas=1).ejecutar(lambda t: time.sleep(duraciones[t]) or player.TAREA_OK)
+    secuencial = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    player.PlanificadorTareas(duraciones, max_paralelas=6).ejecutar(lambda t: time.sleep(duraciones[t]) or player.TAREA_OK)
+    paralelo = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    grupos = {"B": "msi", "E": "msi"}
+    player.PlanificadorTareas(duraciones, grupos=grupos, max_paralelas=6).ejecutar(lambda t: time.sleep(duraciones[t]) or player.TAREA_OK)
+    con_grupo = time.perf_counter() - t0
+    n = 500
+    vacias = [f"t{i}" for i in range(n)]
+    t0 = time.perf_counter()
+    player.PlanificadorTareas(vacias, max_paralelas=player.MAX_TAREAS_PARALELAS).ejecutar(lambda t: player.TAREA_OK)
+    coste = (time.perf_counter() - t0) / n
+    print(f"Planificador: 6 tareas en secuencia {secuencial:.2f} s, en paralelo {paralelo:.2f} s, "
+          f"con B y E exclusivas {con_grupo:.2f} s; coste por tarea {coste * 1e6:.0f} µs")
+    return {"secuencial_s": secuencial, "paralelo_s": paralelo, "con_grupo_s": con_grupo, "coste_por_tarea_s": coste}
+
+def _ejecutar_catalogo(apps, max_paralelas=1):
+    # Recorre apps con el planificador y el preparador reales, sin ventana de progreso
+    planificador = player.PlanificadorTareas.desde_config(apps, player.APLICACIONES_CONFIG, max_paralelas)
+    player.linea_tiempo = player.LineaTiempo()
+    preparador = player.PreparadorTareas(planificador.orden_previsto()) if player.PIPELINE_ACTIVO else None
+    t0 = time.perf_counter()
+    resultados = planificador.ejecutar(lambda app: player.ejecutar_tarea(app, None, 0, len(apps), preparador))
+    if preparador:
+        preparador.cerrar()
+    if any(r != player.TAREA_OK for r in resultados.values()):
+        raise RuntimeError(f"Tareas fallidas: {resultados}")
+    return time.perf_counter() - t0
+
+def bench_pipeline(args):
+    # 4 apps "descargar_e_instalar" en secuencia (max_paralelas=1); cada instalación simulada dura
+    # lo mismo que su descarga. Con el pipeline la descarga de la siguiente se solapa con la actual.
+    n = 4
+    tam = 4 * 1024 * 1024
+    segundos_instalacion = 0.5
+    with tempfile.TemporaryDirectory() as tmp, ServidorPrueba(tam, bytes_por_segundo_conexion=tam * 2) as srv:
+        originales = (dict(player.APLICACIONES_CONFIG), player.DESCARGAS_DIR, player.CACHE_DIR,
+                      player.PIPELINE_ACTIVO, player.instalar_exe)
+        player.DESCARGAS_DIR = tmp
+        player.instalar_exe = lambda ruta, args=None, **kw: time.sleep(segundos_instalacion) or True
+        tiempos = {}
+        try:
+            for modo in (False, True):
+                player.CACHE_DIR = os.path.join(tmp, f"cache_{modo}")
+                player.APLICACIONES_CONFIG.clear()
+                for i in range(n):
+                    player.APLICACIONES_CONFIG[f"App{i}"] = {"tipo": "descargar_e_instalar", "url_descarga": f"{srv.url}?{modo}{i}",
+                                                            "nombre_archivo_descargado": f"app{i}_{modo}.exe"}
+                player.PIPELINE_ACTIVO = modo
+                tiempos["con pipeline" if modo else "sin pipeline"] = _ejecutar_catalogo(list(player.APLICACIONES_CONFIG))
+            print(player.linea_tiempo.resumen())
+            # Cerrar el preparador con una descarga adelantada a medias: el hilo debe terminar
+            # enseguida y sin dejar el .part en disco
+            with ServidorPrueba(tam, bytes_por_segundo_conexion=tam // 8) as lento:
+                player.APLICACIONES_CONFIG.clear()
+                player.APLICACIONES_CONFIG["Lenta"] = {"tipo": "descargar_e_instalar", "url_descarga": lento.url,
+                                                       "nombre_archivo_descargado": "lenta.exe"}
+                preparador = player.PreparadorTareas(["Lenta"])
+                time.sleep(0.5)
+                t0 = time.perf_counter()
+                preparador.cerrar()
+                preparador._pool.shutdown(wait=True)
+                cancelacion = time.perf_counter() - t0
+                restos = [n for n in os.listdir(tmp) if n.startswith("lenta.exe")]
+                if restos or cancelacion > 1.0:
+                    raise RuntimeError(f"Cancelación del pipeline: {cancelacion:.2f} s, restos {restos}")
+        finally:
+            config, player.DESCARGAS_DIR, player.CACHE_DIR, player.PIPELINE_ACTIVO, player.instalar_exe = originales
+            player.APLICACIONES_CONFIG.clear()
+            player.APLICACIONES_CONFIG.update(config)
+    for modo, segundos in tiempos.items():
+        print(f"Pipeline: {n} tareas (descarga ~0.5 s + instalación {segundos_instalacion} s) {modo}: {segundos:.2f} s")
+    print(f"Pipeline: descarga adelantada cancelada al cerrar en {cancelacion * 1000:.0f} ms, sin .part")
+    return dict(tiempos, cancelacion_s=cancelacion)
+
+def bench_reconciliacion(args):
+    # 20 apps con sondas sobre rutas falsas (%PF_PRUEBA%): la primera ejecución "instala" (0.3 s cada
+    # una, y el instalador simulado crea el archivo que la sonda busca); la segunda las detecta y no
+    # lanza nada. Un tercio usa sonda de comando y otro tercio marcador.
+    n = 20
+    segundos_instalacion = 0.3
+    with tempfile.TemporaryDirectory() as tmp:
+        originales = (dict(player.APLICACIONES_CONFIG), player.PROGRAMAS_DIR, player.MARCADORES_DIR,
+                      player.DIARIO_EJECUCION_RUTA, player.instalar_exe, player.COPIA_LOCAL_MODO)
+        os.environ["PF_PRUEBA"] = os.path.join(tmp, "pf")
+        player.PROGRAMAS_DIR = tmp
+        player.COPIA_LOCAL_MODO = "nunca"
+        player.MARCADORES_DIR = os.path.join(tmp, "marcadores")
+        player.DIARIO_EJECUCION_RUTA = os.path.join(tmp, "diario.jsonl")
+        def instalar_falso(ruta, args=None, **kw):
+            time.sleep(segundos_instalacion)
+            destino = os.path.join(tmp, "pf", os.path.basename(os.path.dirname(ruta)), "app.exe")
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            open(destino, "wb").close()
+            return True
+        player.instalar_exe = instalar_falso
+        try:
+            player.APLICACIONES_CONFIG.clear()
+            for i in range(n):
+                os.makedirs(os.path.join(tmp, f"App{i}"))
+                open(os.path.join(tmp, f"App{i}", "setup.exe"), "wb").close()
+                if i % 3 == 0:
+                    sonda = {"tipo": "archivo", "ruta": f"%PF_PRUEBA%/App{i}/app.exe"}
+                elif i % 3 == 1:
+                    sonda = {"tipo": "comando", "comando": [sys.executable, "-c", f"import os; print(os.path.exists(r'{tmp}/pf/App{i}/app.exe'))"],
+                             "esperado": "True"}
+                else:
+                    sonda = {"tipo": "marcador"}
+                player.APLICACIONES_CONFIG[f"App{i}"] = {"tipo": "instalar_local", "exe_filename": "setup.exe", "detectar": [sonda]}
+            apps = list(player.APLICACIONES_CONFIG)
+            tiempos = []
+            for _ in range(2):
+                t0 = time.perf_counter()
+                resultados = player.ejecutar_seleccion(apps)
+                tiempos.append(time.perf_counter() - t0)
+            saltadas = sum(r == player.TAREA_YA_INSTALADA for r in resultados.values())
+        finally:
+            (config, player.PROGRAMAS_DIR, player.MARCADORES_DIR, player.DIARIO_EJECUCION_RUTA, player.instalar_exe,
+             player.COPIA_LOCAL_MODO) = originales
+            player.APLICACIONES_CONFIG.clear()
+            player.APLICACIONES_CONFIG.update(config)
+            del os.environ["PF_PRUEBA"]
+    print(f"Reconciliación: {n} apps, primera ejecución {tiempos[0]:.2f} s, segunda {tiempos[1]:.2f} s "
+          f"({saltadas} detectadas como ya instaladas)")
+    return {"primera_s": tiempos[0], "segunda_s": tiempos[1], "detectadas": saltadas}
+
+def bench_diario(args):
+    # 8 hilos registran 250 transiciones cada uno esperando a que estén en disco: con el escritor que
+    # agrupa lotes frente a un fsync por registro bajo un lock
+    hilos, por_hilo = 8, 250
+    with tempfile.TemporaryDirectory() as tmp:
+        diario = player.DiarioEjecucion(os.path.join(tmp, "agrupado.jsonl"))
+        def agrupado(i):
+            for j in range(por_hilo):
+                diario.registrar("terminada", f"App{i}", esperar=True, resultado=player.TAREA_OK, segundos=j)
+        lock = threading.Lock()
+        with open(os.path.join(tmp, "directo.jsonl"), "ab", buffering=0) as f:
+            def directo(i):
+                for j in range(por_hilo):
+                    linea = f'{{"evento": "terminada", "app": "App{i}", "segundos": {j}}}\n'.encode()
+                    with lock:
+                        f.write(linea)
+                        os.fsync(f.fileno())
+            tiempos = {}
+            for nombre, funcion in (("fsync por registro", directo), ("escritura agrupada", agrupado)):
+                t0 = time.perf_counter()
+                trabajadores = [threading.Thread(target=funcion, args=(i,)) for i in range(hilos)]
+                for t in trabajadores:
+                    t.start()
+                for t in trabajadores:
+                    t.join()
+                tiempos[nombre] = time.perf_counter() - t0
+        diario.cerrar()
+        escritos = len(player.leer_diario(os.path.join(tmp, "agrupado.jsonl")))
+    if escritos != hilos * por_hilo:
+        raise RuntimeError(f"El diario tiene {escritos} registros, se esperaban {hilos * por_hilo}")
+    for nombre, segundos in tiempos.items():
+        print(f"Diario: {hilos * por_hilo} registros durables desde {hilos} hilos, {nombre}: {segundos:.3f} s "
+              f"({segundos / (hilos * por_hilo) * 1e6:.0f} µs por registro)")
+    return tiempos
+
+def bench_traza(args):
+    # Coste por tramo con la traza activa y desactivada, y traza de Chrome de una descarga real
+    n = 100000
+    player.linea_tiempo = player.LineaTiempo()
+    costes = {}
+    try:
+        for activa in (True, False):
+            player.TRAZA_ACTIVA = activa
+            t0 = time.perf_counter()
+            for _ in range(n):
+                with player.tramo("vacío"):
+                    pass
+            costes[activa] = (time.perf_counter() - t0) / n
+    finally:
+        player.TRAZA_ACTIVA = True
+    with tempfile.TemporaryDirectory() as tmp, ServidorPrueba(8 * 1024 * 1024, bytes_por_segundo_conexion=16 * 1024 * 1024) as srv:
+        player.linea_tiempo = player.LineaTiempo()
+        player.fijar_tarea_actual("Descarga")
+        player.descargar_archivo(srv.url, os.path.join(tmp, "app.exe"))
+        player.fijar_tarea_actual(None)
+        ruta_traza = os.path.join(tmp, "traza.json")
+        player.linea_tiempo.exportar_chrome(ruta_traza)
+        with open(ruta_traza, encoding="utf-8") as f:
+            eventos = [e for e in json.load(f)["traceEvents"] if e["ph"] == "X"]
+    print(player.linea_tiempo.tabla_resumen())
+    print(f"Traza: coste por tramo activa {costes[True] * 1e6:.2f} µs, desactivada {costes[False] * 1e6:.3f} µs; "
+          f"descarga de 8 MB -> {len(eventos)} tramos ({', '.join(sorted({e['name'] for e in eventos}))})")
+    return {"tramo_activa_s": costes[True], "tramo_desactivada_s": costes[False]}
+
+def bench_supervision(args):
+    # Cuatro instaladores silenciosos supervisados: uno correcto, uno que pide reinicio (3010), uno que
+    # falla dos veces con 1618 antes de instalar y uno que se cuelga (lo detiene el plazo, o el vigilante
+    # de inactividad si psutil está instalado). Las esperas entre reintentos se acortan. En POSIX el
+    # código de salida es de 8 bits, así que 3010/1618 se sustituyen por 20/21 en la tabla de cada app.
+    with tempfile.TemporaryDirectory() as tmp, EntornoAislado(tmp):
+        perfiles = {
+            "Correcta": perfil_instalador(0.1),
+            "Reinicio": perfil_instalador(0.1, codigo=20),
+            "Reintentable": perfil_instalador(0.1, fallos=2, codigo_fallo=21, estado=os.path.join(tmp, "intentos")),
+            "Colgada": perfil_instalador(colgar=1),
+        }
+        for nombre, perfil in perfiles.items():
+            crear_instalador_falso(os.path.join(player.PROGRAMAS_DIR, nombre, "setup.exe"))
+            player.APLICACIONES_CONFIG[nombre] = {"tipo": "instalar_local", "exe_filename": "setup.exe",
+                                                  "args_instalacion": perfil, "reintentos": 2,
+                                                  "codigos_salida": {20: player.SALIDA_REINICIO, 21: player.SALIDA_REINTENTABLE}}
+        player.APLICACIONES_CONFIG["Colgada"].update(timeout_instalacion=3, reintentos=0)
+        originales = (player.INSTALADOR_ESPERA_REINTENTO, player.INSTALADOR_INACTIVIDAD)
+        player.INSTALADOR_ESPERA_REINTENTO, player.INSTALADOR_INACTIVIDAD = 0.1, 1
+        try:
+            t0 = time.perf_counter()
+            resultados = player.ejecutar_seleccion(list(perfiles), forzar=True)
+            segundos = time.perf_counter() - t0
+        finally:
+            player.INSTALADOR_ESPERA_REINTENTO, player.INSTALADOR_INACTIVIDAD = originales
+        esperados = {"Correcta": player.TAREA_OK, "Reinicio": player.TAREA_OK,
+                     "Reintentable": player.TAREA_OK, "Colgada": player.TAREA_FALLO}
+        if resultados != esperados or player.reinicios_pendientes != {"Reinicio"}:
+            raise RuntimeError(f"Supervisión inesperada: {resultados}, reinicio {player.reinicios_pendientes}")
+    vigilante = "inactividad (psutil)" if player.PSUTIL_DISPONIBLE else "plazo"
+    print(f"Supervisión: 4 instaladores en {segundos:.2f} s; reinicio detectado, 2 reintentos con éxito, "
+          f"colgado detenido por {vigilante}")
+    return {"segundos": segundos}
+
+def bench_salida(args):
+    # 8 instaladores en paralelo que escriben 16 MB cada uno por stdout+stderr, frente a los mismos
+    # sin salida: la captura no debe alargar la ejecución y cada registro queda acotado por la rotación
+    n, salida_mb = 8, 8
+    tiempos = {}
+    with tempfile.TemporaryDirectory() as tmp, EntornoAislado(tmp):
+        for con_salida in (False, True):
+            player.APLICACIONES_CONFIG.clear()
+            for i in range(n):
+                nombre = f"Ruidosa{i}" if con_salida else f"Callada{i}"
+                crear_instalador_falso(os.path.join(player.PROGRAMAS_DIR, nombre, "setup.exe"))
+                player.APLICACIONES_CONFIG[nombre] = {"tipo": "instalar_local", "exe_filename": "setup.exe",
+                                                      "args_instalacion": perfil_instalador(0.2, salida_mb=salida_mb if con_salida else 0)}
+            apps = list(player.APLICACIONES_CONFIG)
+            t0 = time.perf_counter()
+            resultados = player.ejecutar_seleccion(apps, forzar=True)
+            tiempos["con salida" if con_salida else "sin salida"] = time.perf_counter() - t0
+            if any(r != player.TAREA_OK for r in resultados.values()):
+                raise RuntimeError(f"Tareas fallidas: {resultados}")
+        archivos = [os.path.join(player.REGISTROS_DIR, f) for f in os.listdir(player.REGISTROS_DIR) if f.startswith("Ruidosa0")]
+        guardado = sum(os.path.getsize(f) for f in archivos)
+    tope = player.REGISTRO_TAM_MAX * (player.REGISTRO_COPIAS + 1)
+    if guardado > tope:
+        raise RuntimeError(f"El registro ocupa {guardado} bytes, por encima del tope {tope}")
+    print(f"Salida: {n} instaladores en paralelo, sin salida {tiempos['sin salida']:.2f} s, con {2 * salida_mb} MB cada uno "
+          f"{tiempos['con salida']:.2f} s ({n * 2 * salida_mb / tiempos['con salida']:.0f} MB/s capturados); "
+          f"registro de una app: {len(archivos)} archivos, {guardado / 1024 / 1024:.1f} MB")
+    return {"sin_salida_s": tiempos["sin salida"], "con_salida_s": tiempos["con salida"], "registro_bytes": guardado}
+
+def bench_registro(args):
+    # Coste por mensaje para el hilo que registra: un print síncrono a archivo (lo que había, con la
+    # consola redirigida) frente al log encolado, y un log.debug descartado por nivel. 8 hilos a la vez.
+    n, hilos = 10000, 8  # ~12 MB de registro: cabe en REGISTRO_LOG_COPIAS rotaciones
+
+    def medir(funcion):
+        def trabajo(i):
+            player.fijar_tarea_actual(f"App{i}")
+            for j in range(n):
+                funcion(j)
+        t0 = time.perf_counter()
+        trabajadores = [threading.Thread(target=trabajo, args=(i,)) for i in range(hilos)]
+        for t in trabajadores:
+            t.start()
+        for t in trabajadores:
+            t.join()
+        return (time.perf_counter() - t0) / (n * hilos) * 1e6
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "salida.txt"), "w", encoding="utf-8") as salida:
+            sincrono = medir(lambda j: print(f"DEBUG: bloque {j} recibido", file=salida, flush=True))
+        ruta = os.path.join(tmp, "player.log.jsonl")
+        player.configurar_registro("DEBUG", ruta=ruta)
+        try:
+            encolado = medir(lambda j: player.log.debug(f"bloque {j} recibido"))
+            player.fijar_nivel_log("INFO")
+            descartado = medir(lambda j: player.log.debug("bloque %s recibido", j))
+        finally:
+            player.cerrar_registro()
+            player.fijar_tarea_actual(None)
+        lineas = 0
+        for nombre in os.listdir(tmp):
+            if nombre.startswith("player.log.jsonl"):
+                with open(os.path.join(tmp, nombre), encoding="utf-8") as f:
+                    lineas += sum(1 for _ in f)
+    if lineas != n * hilos:
+        raise RuntimeError(f"Se esperaban {n * hilos} líneas en el registro y hay {lineas}")
+    print(f"Registro: {hilos} hilos x {n} mensajes, por mensaje: print síncrono {sincrono:.1f} µs, "
+          f"log encolado (JSON) {encolado:.1f} µs, debug descartado por nivel {descartado:.2f} µs")
+    return {"print_sincrono_us": sincrono, "log_encolado_us": encolado, "descartado_us": descartado}
+
+class _RaizFalsa:
+    # Sustituye a la raíz de Tk: after() ejecuta la función en otro hilo, como haría el bucle de eventos
+    def after(self, ms, funcion):
+        threading.Timer(ms / 1000, funcion).start()
+
+def bench_sincronizacion(args):
+    # 50 tareas "instalar_local" cuyo instalador vuelve al instante: lo que queda es el coste fijo por
+    # tarea (antes 0.5 s de pausa tras cada una). Además, la espera a la ventana de progreso con un
+    # Event frente al sondeo cada 0.1 s que había antes.
+    n = 50
+    with tempfile.TemporaryDirectory() as tmp:
+        originales = (dict(player.APLICACIONES_CONFIG), player.PROGRAMAS_DIR, player.instalar_exe, player.COPIA_LOCAL_MODO)
+        player.PROGRAMAS_DIR = tmp
+        player.COPIA_LOCAL_MODO = "nunca"  # Sin EntornoAislado: las copias irían a la carpeta del repositorio
+        player.instalar_exe = lambda ruta, args=None, **kw: True
+        try:
+            player.APLICACIONES_CONFIG.clear()
+            for i in range(n):
+                os.makedirs(os.path.join(tmp, f"App{i}"))
+                with open(os.path.join(tmp, f"App{i}", "setup.exe"), "wb") as f:
+                    f.write(b"MZ")
+                player.APLICACIONES_CONFIG[f"App{i}"] = {"tipo": "instalar_local", "exe_filename": "setup.exe"}
+            segundos = _ejecutar_catalogo(list(player.APLICACIONES_CONFIG))
+        finally:
+            config, player.PROGRAMAS_DIR, player.instalar_exe, player.COPIA_LOCAL_MODO = originales
+            player.APLICACIONES_CONFIG.clear()
+            player.APLICACIONES_CONFIG.update(config)
+    raiz = _RaizFalsa()
+    esperas = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        player.ejecutar_en_tk(raiz, lambda: True, timeout=5)
+        esperas.append(time.perf_counter() - t0)
+    espera = sorted(esperas)[len(esperas) // 2]
+    print(f"Sincronización: {n} tareas en {segundos:.2f} s ({segundos / n * 1000:.1f} ms por tarea); "
+          f"la pausa fija anterior sumaba {n * 0.5:.1f} s")
+    print(f"Sincronización: espera a la ventana con Event {espera * 1000:.2f} ms (mediana); "
+          f"el sondeo cada 0.1 s añadía hasta 100 ms")
+    return {"tareas": n, "segundos": segundos, "espera_ventana_s": espera}
+
+# --- CATÁLOGO GENERADO ---
+_GLOBALES_AISLADAS = ("PROGRAMAS_DIR", "DESCARGAS_DIR", "CACHE_DIR", "DOCUMENTOS_DIR", "MARCADORES_DIR",
+                      "DIARIO_EJECUCION_RUTA", "REGISTROS_DIR", "INDICE_PROGRAMAS_RUTA", "VERIFICACION_PROGRAMAS_RUTA",
+                      "COPIA_LOCAL_DIR", "COPIA_LOCAL_MODO", "COPIA_LOCAL_PRESUPUESTO", "instalar_exe")
+
+class EntornoAislado:
+    # Redirige las rutas de player a un directorio temporal y restaura la configuración al salir
+    def __init__(self, tmp):
+        self.tmp = tmp
+
+    def __enter__(self):
+        self._originales = {nombre: getattr(player, nombre) for nombre in _GLOBALES_AISLADAS}
+        self._config = dict(player.APLICACIONES_CONFIG)
+        player.PROGRAMAS_DIR = os.path.join(self.tmp, "Programas")
+        player.DESCARGAS_DIR = os.path.join(self.tmp, "descargas")
+        player.CACHE_DIR = os.path.join(player.DESCARGAS_DIR, "cache")
+        player.DOCUMENTOS_DIR = os.path.join(self.tmp, "Documentos")
+        player.MARCADORES_DIR = os.path.join(self.tmp, "marcadores")
+        player.DIARIO_EJECUCION_RUTA = os.path.join(self.tmp, "diario.jsonl")
+        player.REGISTROS_DIR = os.path.join(self.tmp, "registros")
+        player.INDICE_PROGRAMAS_RUTA = os.path.join(self.tmp, "indice_programas.json")
+        player.VERIFICACION_PROGRAMAS_RUTA = os.path.join(self.tmp, "verificacion_programas.json")
+        player.COPIA_LOCAL_DIR = os.path.join(player.DESCARGAS_DIR, "copias_locales")
+        for ruta in (player.PROGRAMAS_DIR, player.DESCARGAS_DIR, player.DOCUMENTOS_DIR):
+            os.makedirs(ruta, exist_ok=True)
+        player.APLICACIONES_CONFIG.clear()
+        return self
+
+    def __exit__(self, *exc):
+        for nombre, valor in self._originales.items():
+            setattr(player, nombre, valor)
+        player.APLICACIONES_CONFIG.clear()
+        player.APLICACIONES_CONFIG.update(self._config)
+
+def generar_catalogo(n, url_descarga=None, tam_copia=256 * 1024):
+    # n entradas de APLICACIONES_CONFIG con la mezcla de un catálogo real: sobre todo instaladores
+    # locales silenciosos con perfiles distintos, algunas copias y, si hay servidor, descargas.
+    # Cada 25 apps una depende de la anterior y cada 10 comparten grupo exclusivo.
+    for i in range(n):
+        nombre = f"App{i:04d}"
+        clase = i % 10
+        if clase == 8 and url_descarga:
+            entrada = {"tipo": "descargar_e_instalar", "url_descarga": f"{url_descarga}?app={i}",
+                       "nombre_archivo_descargado": f"{nombre}.exe", "args_instalacion": perfil_instalador(0.01)}
+        elif clase in (6, 7):
+            entrada = {"tipo": "copiar_exe", "exe_filename": f"{nombre}.exe"}
+            crear_instalador_falso(os.path.join(player.PROGRAMAS_DIR, nombre, entrada["exe_filename"]), tam_copia)
+        else:
+            entrada = {"tipo": "instalar_local", "exe_filename": "setup.exe",
+                       "args_instalacion": perfil_instalador(segundos=(i % 5) * 0.01, cpu=0.5 if i % 3 == 0 else 0.0,
+                                                             io_mb=1 if i % 4 == 0 else 0)}
+            crear_instalador_falso(os.path.join(player.PROGRAMAS_DIR, nombre, "setup.exe"))
+        if i % 25 == 24:
+            entrada["depends_on"] = [f"App{i - 1:04d}"]
+        if i % 10 == 5:
+            entrada["exclusive_group"] = "msi"
+        entrada["priority"] = i % 3
+        player.APLICACIONES_CONFIG[nombre] = entrada
+    return list(player.APLICACIONES_CONFIG)
+
+def bench_catalogo(args):
+    # Ejecución completa sin ventana (ejecutar_seleccion, lo mismo que hace procesar_seleccion) de un
+    # catálogo generado de args.apps entradas con instaladores falsos y descargas del servidor local
+    instalar_original = player.instalar_exe
+    def instalar_ejecutable(ruta, args_inst=None, **kw):
+        os.chmod(ruta, 0o755)  # Lo descargado no trae bit de ejecución; en Windows no hace falta
+        return instalar_original(ruta, args_inst, **kw)
+    contenido = contenido_instalador_falso(relleno=1024 * 1024)
+    with tempfile.TemporaryDirectory() as tmp, EntornoAislado(tmp), \
+            ServidorPrueba(len(contenido), contenido=contenido, bytes_por_segundo_conexion=args.kbps_conexion * 1024) as srv:
+        apps = generar_catalogo(args.apps, srv.url)
+        player.instalar_exe = instalar_ejecutable
+        t0 = time.perf_counter()
+        resultados = player.ejecutar_seleccion(apps, forzar=True)
+        segundos = time.perf_counter() - t0
+    fallidas = [app for app, r in resultados.items() if r != player.TAREA_OK]
+    if fallidas:
+        raise RuntimeError(f"Tareas fallidas en el catálogo: {fallidas[:5]}...")
+    print(f"Catálogo: {len(apps)} apps en {segundos:.2f} s ({len(apps) / segundos:.1f} tareas/s)")
+    return {"apps": len(apps), "segundos": segundos, "tareas_por_segundo": len(apps) / segundos}
+
+def bench_comprobacion(args):
+    # Comprobación previa del catálogo generado (args.apps entradas, con HEAD al servidor local):
+    # sin manifiesto, con manifiesto sin verificar en este equipo (recalcula hashes) y ya verificado
+    # (solo stat), en serie frente a en paralelo. Al final, un instalador dañado con su mtime
+    # original y otro borrado deben dar "no seguir".
+    contenido = contenido_instalador_falso(relleno=1024 * 1024)
+    tiempos = {}
+    with tempfile.TemporaryDirectory() as tmp, EntornoAislado(tmp), \
+            ServidorPrueba(len(contenido), contenido=contenido) as srv:
+        apps = generar_catalogo(args.apps, srv.url)
+        def medir(nombre):
+            for hilos in (1, player.COMPROBACION_HILOS):
+                original, player.COMPROBACION_HILOS = player.COMPROBACION_HILOS, hilos
+                try:
+                    informe = player.comprobar_seleccion(apps)
+                finally:
+                    player.COMPROBACION_HILOS = original
+                if not informe["ok"]:
+                    raise RuntimeError(player.texto_comprobacion(informe))
+                tiempos[f"{nombre}_{'serie' if hilos == 1 else 'paralelo'}_s"] = informe["segundos"]
+        medir("sin_manifiesto")
+        archivos = {}
+        for app in apps:
+            config = player.APLICACIONES_CONFIG[app]
+            if config["tipo"] != "descargar_e_instalar":
+                ruta = os.path.join(player.PROGRAMAS_DIR, app, config["exe_filename"])
+                st = os.stat(ruta)
+                archivos[f"{app}/{config['exe_filename']}"] = {"tam": st.st_size, "mtime": st.st_mtime,
+                                                               "sha256": player.sha256_archivo(ruta)}
+        def escribir_manifiesto():
+            with open(player.ruta_manifiesto(), "w", encoding="utf-8") as f:
+                json.dump({"archivos": archivos}, f)
+        escribir_manifiesto()
+        medir("rehash")
+        player._guardar_estado_verificacion(archivos)
+        medir("verificado")
+        locales = [a for a in apps if player.APLICACIONES_CONFIG[a]["tipo"] == "instalar_local"]
+        danada = os.path.join(player.PROGRAMAS_DIR, locales[0], "setup.exe")
+        st = os.stat(danada)
+        with open(danada, "r+b") as f:
+            f.seek(st.st_size // 2)
+            f.write(b"\xff" * 16)
+        os.utime(danada, ns=(st.st_atime_ns, st.st_mtime_ns))  # Como una copia que conserva el mtime...
+        os.remove(player.VERIFICACION_PROGRAMAS_RUTA)  # ...en un equipo que aún no la ha verificado
+        os.remove(os.path.join(player.PROGRAMAS_DIR, locales[1], "setup.exe"))
+        informe = player.comprobar_seleccion(apps)
+    errores = [c for c in informe["comprobaciones"] if c["estado"] == player.COMPROBACION_ERROR]
+    if informe["ok"] or sorted(c["app"] for c in errores) != sorted(locales[:2]):
+        raise RuntimeError(f"La comprobación no detectó el instalador dañado y el que falta: {errores}")
+    print(f"Comprobación previa de {len(apps)} apps (serie / paralelo): "
+          f"sin manifiesto {tiempos['sin_manifiesto_serie_s']:.3f} / {tiempos['sin_manifiesto_paralelo_s']:.3f} s, "
+          f"recalculando hashes {tiempos['rehash_serie_s']:.3f} / {tiempos['rehash_paralelo_s']:.3f} s, "
+          f"ya verificado {tiempos['verificado_serie_s']:.3f} / {tiempos['verificado_paralelo_s']:.3f} s; "
+          f"instalador dañado y borrado detectados")
+    return tiempos
+
+def bench_indice(args):
+    # Índice de PROGRAMAS_DIR con args.apps carpetas de un instalador (Inno, NSIS, MSI o sin firma,
+    # una de ellas con la firma partida entre dos bloques de lectura) y un árbol "Extras" con 10 veces
+    # más archivos: indexado completo, reindexado sin cambios (solo el listado) y tras tocar 10 archivos
+    tam = 64 * 1024
+    firmas = [b"Inno Setup Setup Data (6.2.0)", b"\xef\xbe\xad\xdeNullsoftInst", None, b""]
+    esperado = {}
+    with tempfile.TemporaryDirectory() as tmp, EntornoAislado(tmp):
+        for i in range(args.apps):
+            firma = firmas[i % len(firmas)]
+            nombre = f"Nueva{i:04d}"
+            os.makedirs(os.path.join(player.PROGRAMAS_DIR, nombre))
+            ruta = os.path.join(player.PROGRAMAS_DIR, nombre, "setup.msi" if firma is None else "setup.exe")
+            if firma is None:
+                datos = player.FIRMA_OLE + os.urandom(tam)
+            elif i == 1:
+                datos = b"MZ" + os.urandom(player.HASH_BLOQUE - 6) + firma + os.urandom(tam)
+            else:
+                datos = b"MZ" + os.urandom(tam) + firma + os.urandom(tam)
+            with open(ruta, "wb") as f:
+                f.write(datos)
+            esperado[nombre] = ["inno", "nsis", "msi", None][i % len(firmas)]
+        extras = []
+        for i in range(args.apps * 10):
+            carpeta = os.path.join(player.PROGRAMAS_DIR, "Extras", f"lote{i // 100:03d}")
+            os.makedirs(carpeta, exist_ok=True)
+            extras.append(os.path.join(carpeta, f"herramienta{i:05d}.exe"))
+            with open(extras[-1], "wb") as f:
+                f.write(b"MZ" + os.urandom(4096))
+        tiempos = {}
+        for paso in ("completo", "sin_cambios", "diez_cambios"):
+            if paso == "diez_cambios":
+                for ruta in extras[:10]:
+                    os.utime(ruta, (time.time(), os.stat(ruta).st_mtime + 10))
+            t0 = time.perf_counter()
+            archivos, leidos = player.actualizar_indice_programas()
+            tiempos[paso] = (time.perf_counter() - t0, leidos)
+        nuevas = player.descubrir_aplicaciones(archivos)
+        tipos = {nombre: player.APLICACIONES_CONFIG.get(nombre, {}).get("args_instalacion") for nombre in esperado}
+    if tiempos["sin_cambios"][1] != 0 or tiempos["diez_cambios"][1] != 10:
+        raise RuntimeError(f"Reindexado no incremental: {tiempos}")
+    fallos = [n for n, t in esperado.items() if tipos[n] != (player.ARGS_SILENCIOSOS.get(t) if t else None)]
+    if fallos or len(nuevas) != sum(1 for t in esperado.values() if t):
+        raise RuntimeError(f"Tipos o descubrimiento incorrectos: {fallos[:5]}")
+    total = len(archivos)
+    print(f"Índice: {total} instaladores; completo {tiempos['completo'][0]:.2f} s, sin cambios "
+          f"{tiempos['sin_cambios'][0]:.3f} s ({tiempos['sin_cambios'][0] / total * 1e6:.0f} µs por archivo), "
+          f"10 cambiados {tiempos['diez_cambios'][0]:.3f} s; {len(nuevas)} apps descubiertas")
+    return {"archivos": total, "completo_s": tiempos["completo"][0], "sin_cambios_s": tiempos["sin_cambios"][0],
+            "diez_cambios_s": tiempos["diez_cambios"][0], "descubiertas": len(nuevas)}
+
+def bench_manifiesto(args):
+    # Paquete con 4 instaladores de args.mb MB y 400 archivos pequeños: crear el manifiesto en un solo
+    # hilo, con hilos y con el pool de procesos, verificar sin cambios (solo stat) y tras modificar un archivo.
+    # Los archivos están recién escritos (en la caché del SO): mide CPU de hash, no la unidad.
+    tiempos = {}
+    en_pool = max(2, player.MANIFIESTO_PROCESOS)  # Aunque la máquina tenga un solo núcleo, para ver el coste del pool
+    with tempfile.TemporaryDirectory() as tmp, EntornoAislado(tmp):
+        for i in range(4):
+            os.makedirs(os.path.join(player.PROGRAMAS_DIR, f"Grande{i}"))
+            with open(os.path.join(player.PROGRAMAS_DIR, f"Grande{i}", "setup.exe"), "wb") as f:
+                f.write(os.urandom(args.mb * 1024 * 1024))
+        for i in range(400):
+            carpeta = os.path.join(player.PROGRAMAS_DIR, f"Peque{i // 50}")
+            os.makedirs(carpeta, exist_ok=True)
+            with open(os.path.join(carpeta, f"archivo{i}.dll"), "wb") as f:
+                f.write(os.urandom(64 * 1024))
+        originales = player.MANIFIESTO_PROCESOS, player.MANIFIESTO_MIN_PROCESOS
+        for modo, procesos, minimo in (("1_proceso", 1, originales[1]), ("hilos", en_pool, float("inf")), ("pool", en_pool, 0)):
+            player.MANIFIESTO_PROCESOS, player.MANIFIESTO_MIN_PROCESOS = procesos, minimo
+            try:
+                t0 = time.perf_counter()
+                n, total = player.crear_manifiesto()
+                tiempos[f"crear_{modo}_s"] = time.perf_counter() - t0
+            finally:
+                player.MANIFIESTO_PROCESOS, player.MANIFIESTO_MIN_PROCESOS = originales
+        tam_manifiesto = os.path.getsize(player.ruta_manifiesto())
+        t0 = time.perf_counter()
+        sin_cambios = player.verificar_manifiesto()
+        tiempos["verificar_sin_cambios_s"] = time.perf_counter() - t0
+        with open(os.path.join(player.PROGRAMAS_DIR, "Grande0", "setup.exe"), "r+b") as f:
+            f.write(b"corrupto")
+        t0 = time.perf_counter()
+        con_cambio = player.verificar_manifiesto()
+        tiempos["verificar_un_cambio_s"] = time.perf_counter() - t0
+    if not sin_cambios["ok"] or sin_cambios["releidos"] or con_cambio["distintos"] != ["Grande0/setup.exe"] \
+            or con_cambio["releidos"] != 1:
+        raise RuntimeError(f"Verificación incorrecta: {sin_cambios} / {con_cambio}")
+    mb = total / 1024 / 1024
+    print(f"Manifiesto: {n} archivos ({mb:.0f} MB, manifiesto de {tam_manifiesto / 1024:.0f} KB); crear en 1 proceso "
+          f"{tiempos['crear_1_proceso_s']:.2f} s ({mb / tiempos['crear_1_proceso_s']:.0f} MB/s), con {en_pool} hilos "
+          f"{tiempos['crear_hilos_s']:.2f} s ({mb / tiempos['crear_hilos_s']:.0f} MB/s), con "
+          f"{en_pool} procesos {tiempos['crear_pool_s']:.2f} s ({mb / tiempos['crear_pool_s']:.0f} MB/s); "
+          f"verificar sin cambios {tiempos['verificar_sin_cambios_s'] * 1000:.1f} ms, "
+          f"con 1 archivo cambiado {tiempos['verificar_un_cambio_s']:.2f} s")
+    return tiempos
+
+def bench_copia_local(args):
+    # 8 instaladores de args.mb / 8 MB ejecutados desde la copia local: primera ejecución (se copian
+    # mientras se ejecuta el anterior), segunda (se reutilizan), tras cambiar los mtimes del origen con
+    # el paquete ya verificado (se reutilizan por hash) y con un presupuesto de 3 instaladores.
+    n = 8
+    relleno = args.mb * 1024 * 1024 // n
+    copiado = [0]
+    copiado_lock = threading.Lock()  # Las preparaciones del pipeline copian desde varios hilos
+    copiar_original = player._copiar_secuencial
+    def copiar_contando(origen, destino, progreso):
+        with copiado_lock:
+            copiado[0] += os.path.getsize(origen)
+        return copiar_original(origen, destino, progreso)
+    ejecuciones = {}
+    with tempfile.TemporaryDirectory() as tmp, EntornoAislado(tmp):
+        player.COPIA_LOCAL_MODO = "siempre"
+        player._copiar_secuencial = copiar_contando
+        try:
+            for i in range(n):
+                crear_instalador_falso(os.path.join(player.PROGRAMAS_DIR, f"Local{i}", "setup.exe"), relleno)
+                player.APLICACIONES_CONFIG[f"Local{i}"] = {"tipo": "instalar_local", "exe_filename": "setup.exe",
+                                                         "args_instalacion": perfil_instalador(0.05)}
+            apps = list(player.APLICACIONES_CONFIG)
+            def ejecutar(nombre):
+                copiado[0] = 0
+                t0 = time.perf_counter()
+                resultados = player.ejecutar_seleccion(apps, forzar=True)
+                segundos = time.perf_counter() - t0
+                if any(r != player.TAREA_OK for r in resultados.values()):
+                    raise RuntimeError(f"Tareas fallidas: {resultados}")
+                ejecuciones[nombre] = {"segundos": segundos, "copiado_bytes": copiado[0]}
+            ejecutar("primera")
+            ejecutar("reutilizada")
+            player.crear_manifiesto()
+            for i in range(n):
+                ruta = os.path.join(player.PROGRAMAS_DIR, f"Local{i}", "setup.exe")
+                os.utime(ruta, (time.time(), os.stat(ruta).st_mtime + 60))
+            player.verificar_manifiesto()
+            ejecutar("mtime_cambiado")
+            player.COPIA_LOCAL_PRESUPUESTO = 3 * (relleno + 4096)
+            ejecutar("presupuesto")
+            ocupado = sum(os.path.getsize(os.path.join(raiz, f)) for raiz, _, archivos in os.walk(player.COPIA_LOCAL_DIR)
+                          for f in archivos if f != "estado.json")
+        finally:
+            player._copiar_secuencial = copiar_original
+    total = n * relleno
+    if ejecuciones["primera"]["copiado_bytes"] < total or ejecuciones["reutilizada"]["copiado_bytes"] \
+            or ejecuciones["mtime_cambiado"]["copiado_bytes"] or ocupado > 3 * (relleno + 4096):
+        raise RuntimeError(f"Copia local incorrecta: {ejecuciones}, ocupado {ocupado}")
+    print(f"Copia local: {n} instaladores ({total / 1024 / 1024:.0f} MB); primera ejecución "
+          f"{ejecuciones['primera']['segundos']:.2f} s copiando {ejecuciones['primera']['copiado_bytes'] / 1024 / 1024:.0f} MB, "
+          f"segunda {ejecuciones['reutilizada']['segundos']:.2f} s sin copiar nada, mtimes cambiados "
+          f"{ejecuciones['mtime_cambiado']['segundos']:.2f} s sin copiar nada; con presupuesto de 3 quedan "
+          f"{ocupado / 1024 / 1024:.0f} MB")
+    return dict(ejecuciones, ocupado_tras_presupuesto_bytes=ocupado)
+
+def bench_copia(args):
+    # copiar_archivo (copy_file_range/sendfile, o readinto en un búfer reutilizado sin ellas) frente a
+    # shutil.copy2: 500 archivos de 64 KB y uno de args.copia_mb MB. Los datos del origen están en la
+    # caché del SO, así que se mide el coste de copiar y no la velocidad del disco de origen.
+    class Contador:
+        def __init__(self):
+            self.bytes = 0
+        def sumar(self, n):
+            self.bytes += n
+    modos = {
+        "copy2": lambda o, d: shutil.copy2(o, d),
+        "rapida": lambda o, d: player.copiar_archivo(o, d, Contador()),
+        "bloques": lambda o, d: player.copiar_archivo(o, d, Contador()),
+    }
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        pequenos = []
+        for i in range(500):
+            pequenos.append(os.path.join(tmp, f"p{i}.dll"))
+            with open(pequenos[-1], "wb") as f:
+                f.write(os.urandom(64 * 1024))
+        grande = os.path.join(tmp, "grande.bin")
+        with open(grande, "wb") as f:
+            for _ in range(args.copia_mb):
+                f.write(os.urandom(1024 * 1024))
+        for caso, origenes in (("pequenos", pequenos), ("grande", [grande])):
+            total = sum(os.path.getsize(o) for o in origenes)
+            for modo, copiar in modos.items():
+                player.COPIA_RAPIDA = modo != "bloques"
+                try:
+                    destino = os.path.join(tmp, f"destino_{modo}")
+                    os.makedirs(destino, exist_ok=True)
+                    t0 = time.perf_counter()
+                    for origen in origenes:
+                        copiar(origen, os.path.join(destino, os.path.basename(origen)))
+                    segundos = time.perf_counter() - t0
+                finally:
+                    player.COPIA_RAPIDA = True
+                if os.path.getsize(os.path.join(destino, os.path.basename(origenes[-1]))) != os.path.getsize(origenes[-1]):
+                    raise RuntimeError(f"Copia {modo} incompleta")
+                shutil.rmtree(destino)
+                resultados[f"{caso}_{modo}_s"] = segundos
+                resultados[f"{caso}_{modo}_mb_s"] = total / 1024 / 1024 / segundos
+    for caso, descripcion in (("pequenos", "500 x 64 KB"), ("grande", f"1 x {args.copia_mb} MB")):
+        print(f"Copia {descripcion}: " + ", ".join(f"{modo} {resultados[f'{caso}_{modo}_mb_s']:.0f} MB/s"
+                                                  for modo in modos))
+    return resultados
+
+def _destino_lento(ruta, bytes_por_segundo):
+    # FIFO en la ruta .parcial que escribirá la copia, vaciado por un hilo a bytes_por_segundo: un
+    # destino lento de verdad (una memoria USB) sin depender del hardware
+    os.mkfifo(ruta + ".parcial")
+    def vaciar():
+        with open(ruta + ".parcial", "rb", buffering=0) as f:
+            t0 = time.perf_counter()
+            leido = 0
+            while True:
+                datos = f.read(1024 * 1024)
+                if not datos:
+                    return
+                leido += len(datos)
+                espera = leido / bytes_por_segundo - (time.perf_counter() - t0)
+                if espera > 0:
+                    time.sleep(espera)
+    hilo = threading.Thread(target=vaciar, daemon=True)
+    hilo.start()
+    return hilo
+
+def bench_copia_multiple(args):
+    # Un instalador de args.mb MB a 3 destinos lentos (32, 64 y 128 MB/s) y a 4 archivos en disco:
+    # una copia detrás de otra con copiar_archivo frente a copiar_a_varios (una lectura, un hilo por destino)
+    velocidades = (32, 64, 128)
+    tiempos = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        origen = os.path.join(tmp, "origen.bin")
+        with open(origen, "wb") as f:
+            f.write(os.urandom(args.mb * 1024 * 1024))
+        for modo in ("secuencial", "multiple"):
+            destinos = [os.path.join(tmp, f"{modo}_lento{v}") for v in velocidades]
+            hilos = [_destino_lento(d, v * 1024 * 1024) for d, v in zip(destinos, velocidades)]
+            t0 = time.perf_counter()
+            if modo == "secuencial":
+                for destino in destinos:
+                    player.copiar_archivo(origen, destino)
+            else:
+                errores = player.copiar_a_varios(origen, destinos)
+                if any(errores.values()):
+                    raise RuntimeError(f"Copia múltiple fallida: {errores}")
+            for hilo in hilos:
+                hilo.join()
+            tiempos[f"lentos_{modo}_s"] = time.perf_counter() - t0
+            destinos = [os.path.join(tmp, f"{modo}_disco{i}.bin") for i in range(4)]
+            t0 = time.perf_counter()
+            if modo == "secuencial":
+                for destino in destinos:
+                    player.copiar_archivo(origen, destino)
+            else:
+                player.copiar_a_varios(origen, destinos)
+            tiempos[f"disco_{modo}_s"] = time.perf_counter() - t0
+            if any(os.path.getsize(d) != args.mb * 1024 * 1024 for d in destinos):
+                raise RuntimeError("Copia a disco incompleta")
+    ideal = args.mb / min(velocidades)
+    print(f"Copia múltiple de {args.mb} MB a destinos de {'/'.join(map(str, velocidades))} MB/s: una tras otra "
+          f"{tiempos['lentos_secuencial_s']:.2f} s, a la vez {tiempos['lentos_multiple_s']:.2f} s "
+          f"(el más lento solo: {ideal:.2f} s); a 4 archivos en disco: {tiempos['disco_secuencial_s']:.2f} s "
+          f"frente a {tiempos['disco_multiple_s']:.2f} s")
+    return tiempos
+
+def _tiempos_importacion(codigo, modulo):
+    # -X importtime escribe en stderr "self [us] | cumulative [us] | paquete", con los hijos antes que
+    # el padre y dos espacios más de sangría por nivel. Devuelve (segundos acumulados del módulo,
+    # {hijo directo: segundos acumulados}).
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__)))
+    hijos = {}
+    for linea in proc.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, paquete = linea[len("import time:"):].split("|")
+        nivel = (len(paquete) - len(paquete.lstrip()) - 1) // 2
+        if nivel == 1:
+            hijos[paquete.strip()] = int(acumulado) / 1e6
+        elif nivel == 0:
+            if paquete.strip() == modulo:
+                return int(acumulado) / 1e6, hijos
+            hijos = {}
+    return None, {}
+
+def bench_arranque(args):
+    # Coste de importar player (lo que paga el arranque antes de la primera ventana) y de los módulos
+    # que ahora se difieren hasta que una tarea los necesita
+    repeticiones = 5
+    muestras = [_tiempos_importacion("import player", "player") for _ in range(repeticiones)]
+    total = sorted(m[0] for m in muestras)[repeticiones // 2]
+    hijos = muestras[-1][1]
+    print("Arranque: módulos importados por player (acumulado, última ejecución):")
+    for paquete, segundos in sorted(hijos.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {paquete:<28}{segundos * 1000:>9.1f} ms")
+    print(f"Arranque: import player (mediana de {repeticiones}): {total * 1000:.1f} ms")
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "player.py")
+    sin_ventana = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, script, "--listar"], capture_output=True, check=True)
+        sin_ventana.append(time.perf_counter() - t0)
+    cli = sorted(sin_ventana)[repeticiones // 2]
+    print(f"Arranque: 'player.py --listar' sin ventana, proceso completo (mediana): {cli * 1000:.1f} ms")
+    for diferido in ("requests", "tkinter", "pywinauto"):
+        if any(p == diferido or p.startswith(diferido + ".") for p in hijos):
+            print(f"Arranque: AVISO: '{diferido}' se importa al arrancar")
+            continue
+        coste = _tiempos_importacion(f"import {diferido}", diferido)[0] if importlib.util.find_spec(diferido) else None
+        estado = f"{coste * 1000:.1f} ms diferidos" if coste is not None else "no instalado"
+        print(f"Arranque: {diferido:<10} no se importa al arrancar ({estado})")
+    return {"import_player_s": total, "cli_sin_ventana_s": cli, "modulos_s": hijos}
+
+BENCHMARKS = {
+    "arranque": bench_arranque,
+    "descargas": bench_descargas,
+    "reanudacion": bench_reanudacion,
+    "cache": bench_cache,
+    "sesion": bench_sesion,
+    "verificacion": bench_verificacion,
+    "progreso": bench_progreso,
+    "planificador": bench_planificador,
+    "pipeline": bench_pipeline,
+    "sincronizacion": bench_sincronizacion,
+    "reconciliacion": bench_reconciliacion,
+    "diario": bench_diario,
+    "traza": bench_traza,
+    "catalogo": bench_catalogo,
+    "supervision": bench_supervision,
+    "salida": bench_salida,
+    "registro": bench_registro,
+    "comprobacion": bench_comprobacion,
+    "indice": bench_indice,
+    "manifiesto": bench_manifiesto,
+    "copia_local": bench_copia_local,
+    "copia": bench_copia,
+    "copia_multiple": bench_copia_multiple,
+    "limite_descarga": bench_limite_descarga,
+}
+
+def _aplanar(valor, prefijo=""):
+    # {"a": {"b": 1}, "c": [2, 3]} -> {"a.b": 1, "c.0": 2, "c.1": 3}, solo valores numéricos
+    if isinstance(valor, dict):
+        planos = {}
+        for clave, v in valor.items():
+            planos.update(_aplanar(v, f"{prefijo}{clave}."))
+        return planos
+    if isinstance(valor, (list, tuple)):
+        planos = {}
+        for i, v in enumerate(valor):
+            planos.update(_aplanar(v, f"{prefijo}{i}."))
+        return planos
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return {prefijo.rstrip("."): valor}
+    return {}
+
+def _commit_actual():
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+        return proc.stdout.strip() or None
+    except OSError:
+        return None
+
+def _comparar(anterior, actual):
+    previos = _aplanar(anterior["resultados"])
+    print(f"\nComparación con {anterior.get('commit') or '?'} ({anterior.get('fecha', '?')}):")
+    for clave, valor in _aplanar(actual["resultados"]).items():
+        if clave in previos and previos[clave]:
+            print(f"  {clave:<50}{previos[clave]:>12.4g} -> {valor:<12.4g}({valor / previos[clave]:.2f}x)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de player.py")
+    parser.add_argument("nombres", nargs="*", help=f"Benchmarks a ejecutar: {', '.join(BENCHMARKS)} (por defecto todos)")
+    parser.add_argument("--mb", type=int, default=64, help="Tamaño del instalador servido")
+    parser.add_argument("--kbps-conexion", type=int, default=8192, help="Límite por conexión del servidor (0 = sin límite)")
+    parser.add_argument("--apps", type=int, default=300, help="Entradas del catálogo generado")
+    parser.add_argument("--copia-mb", type=int, default=1024, help="Tamaño del archivo grande del benchmark de copia")
+    parser.add_argument("--json", metavar="RUTA", help="Guardar los resultados en JSON para comparar entre commits")
+    parser.add_argument("--comparar", metavar="RUTA", help="JSON de una ejecución anterior con el que comparar")
+    args = parser.parse_args(argv)
+    desconocidos = [n for n in args.nombres if n not in BENCHMARKS]
+    if desconocidos:
+        parser.error(f"Benchmark desconocido: {', '.join(desconocidos)}")
+    resultados = {}
+    for nombre in args.nombres or list(BENCHMARKS):
+        resultados[nombre] = BENCHMARKS[nombre](args)
+    salida = {"commit": _commit_actual(), "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "python": sys.version.split()[0], "plataforma": sys.platform,
+              "parametros": {"mb": args.mb, "kbps_conexion": args.kbps_conexion, "apps": args.apps},
+              "resultados": resultados}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(salida, f, indent=2, ensure_ascii=False, default=str)
+        print(f"Resultados escritos en '{args.json}'")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            _comparar(json.load(f), json.loads(json.dumps(salida, default=str)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,42 @@
 # --- START OF FILE player.py ---
 
-import tkinter as tk
-from tkinter import ttk, messagebox, font as tkfont # Importar tkfont
 import os
+import sys
+import errno
+import argparse
+import json
+import re
+import hashlib
+import importlib.util
+import mmap
 import shutil
-import requests
 import subprocess
 import threading
 import time
+import itertools
+import contextlib
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
 
-# Intenta importar pywinauto
-try:
-    from pywinauto.application import Application, ProcessNotFoundError
-    from pywinauto.findwindows import ElementNotFoundError, WindowNotFoundError
-    from pywinauto.timings import TimeoutError as PywinautoTimeoutError
-    PYWINAUTO_AVAILABLE = True
-except ImportError:
-    PYWINAUTO_AVAILABLE = False
-    print("ADVERTENCIA: pywinauto no está instalado.")
+# requests y pywinauto se importan al primer uso (cargar_requests / dentro de la tarea de Autologon):
+# arrancar la ventana no debe pagar su importación si no se descarga nada ni se configura Autologon.
+# Para saber si pywinauto está instalado basta con localizar el paquete, sin importarlo.
+requests = None
+PYWINAUTO_AVAILABLE = importlib.util.find_spec("pywinauto") is not None
+
+def cargar_requests():
+    global requests
+    if requests is None:
+        import requests as modulo_requests
+        import requests.adapters
+        requests = modulo_requests
+    return requests
 
 # --- CONFIGURACIÓN DE APLICACIONES ---
+# Campos opcionales comunes: "sha256" (verificación de descargas), "depends_on", "exclusive_group"
+# y "priority" para el planificador (ver PLANIFICADOR DE TAREAS) y "detectar" para saltarse las apps
+# que ya están instaladas (ver DETECCIÓN DE APPS INSTALADAS).
 APLICACIONES_CONFIG = {
     "Autologon": {
         "tipo": "configurar_autologon_gui",
@@ -27,36 +44,45 @@ APLICACIONES_CONFIG = {
         "username": "player",
         "domain": "",
         "password": "player",
+        "detectar": [{"tipo": "comando", "comando": ["reg", "query", r"HKLM\SOFTWARE\Microsoft\Windows NT\CurrentVersion\Winlogon", "/v", "AutoAdminLogon"],
+                      "esperado": r"REG_SZ\s+1\b"}],
         "icon": "👤" # Ejemplo de icono Unicode
     },
     "Chrome": {
         "tipo": "instalar_local",
         "exe_filename": "Ninite Chrome Installer.exe",
         "args_instalacion": [],
+        "exclusive_group": "interfaz", # Ninite muestra su ventana (y dos a la vez se bloquean entre sí)
+        "detectar": [{"tipo": "archivo", "ruta": "%ProgramFiles%/Google/Chrome/Application/chrome.exe"}],
         "icon": "🌐"
     },
     "Novalct": {
         "tipo": "instalar_manual_asistido",
         "exe_filename": "NovaLCT V5.4.7.1.exe",
         "mensaje_usuario": "Se abrirá el instalador de NovaLCT.\n\nPor favor, completa la instalación manualmente.\n\nUna vez FINALIZADA, cierra esta ventana para continuar.",
+        "detectar": [{"tipo": "marcador"}],
         "icon": "💡"
     },
     "PlataformaUniversal": {
         "tipo": "instalar_local",
         "exe_filename": "LSPlayerVideo-0.11.3 Multicliente Standard Setup.exe",
         "args_instalacion": ["/VERYSILENT", "/SUPPRESSMSGBOXES"],
+        "detectar": [{"tipo": "marcador"}],
         "icon": "🎬"
     },
     "TeamViewer": {
         "tipo": "instalar_local",
         "exe_filename": "TeamViewer_Host_Setup_x64.exe",
         "args_instalacion": ["/S"],
+        "detectar": [{"tipo": "archivo", "ruta": "%ProgramFiles%/TeamViewer/TeamViewer.exe"}],
         "icon": "💻"
     },
     "VLC": {
         "tipo": "instalar_local",
         "exe_filename": "Ninite VLC Installer.exe",
         "args_instalacion": [],
+        "exclusive_group": "interfaz",
+        "detectar": [{"tipo": "archivo", "ruta": "%ProgramFiles%/VideoLAN/VLC/vlc.exe"}],
         "icon": "⏯️"
     }
 }
@@ -64,15 +90,221 @@ APLICACIONES_CONFIG = {
 # --- RUTAS IMPORTANTES ---
 PROGRAMAS_DIR = "D:/Programas"
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DESCARGAS_DIR = os.path.join(BASE_DIR, "archivos_descargados_temp")
+
+def _directorio_estado():
+    # Lo que debe sobrevivir a la ejecución (diario, registros, marcadores, índices...). En el .exe de un
+    # solo archivo __file__ está en la carpeta temporal _MEIxxxx, que se borra al salir: ahí se usa
+    # %ProgramData%\AutomateInstall (por equipo, aunque el .exe esté en una unidad compartida).
+    if not getattr(sys, "frozen", False):
+        return BASE_DIR
+    if os.environ.get("ProgramData"):
+        return os.path.join(os.environ["ProgramData"], "AutomateInstall")
+    return os.path.dirname(os.path.abspath(sys.executable))
+
+ESTADO_DIR = _directorio_estado()
+
+def ruta_estado(*partes):
+    return os.path.join(ESTADO_DIR, *partes)
+
+DESCARGAS_DIR = ruta_estado("archivos_descargados_temp")
 DOCUMENTOS_DIR = os.path.join(os.path.expanduser("~"), "Documents")
+MARCADORES_DIR = ruta_estado("estado_instalacion")  # Marcadores de apps ya instaladas
+DIARIO_EJECUCION_RUTA = ruta_estado("diario_ejecucion.jsonl")  # Para --resume tras un reinicio
+REGISTROS_DIR = ruta_estado("registros_instaladores")  # Salida de cada instalador
+os.makedirs(ESTADO_DIR, exist_ok=True)
 os.makedirs(DESCARGAS_DIR, exist_ok=True)
 
+# --- REGISTRO (LOG) ---
+# Los mensajes de diagnóstico van a log (logger "player") y no a print: el hilo que registra solo
+# encola el evento y un hilo escritor lo vuelca como una línea JSON en REGISTRO_LOG_RUTA, con la
+# tarea, la fase y el intento del hilo que lo emitió. El nivel se elige al arrancar (--log-nivel,
+# PLAYER_LOG_NIVEL) o en caliente con fijar_nivel_log; --depurar lo baja a DEBUG y además lo muestra
+# en la consola, así que el mismo ejecutable sirve de versión normal y de versión de depuración.
+REGISTRO_LOG_RUTA = ruta_estado("player.log.jsonl")
+REGISTRO_LOG_TAM_MAX = 5 * 1024 * 1024
+REGISTRO_LOG_COPIAS = 3
+NIVELES_LOG = ("DEBUG", "INFO", "WARNING", "ERROR")
+NIVEL_LOG_POR_DEFECTO = "INFO"
+
+log = logging.getLogger("player")
+log.propagate = False
+log.addHandler(logging.NullHandler())  # Sin configurar (p. ej. importado desde otro script) no escribe nada
+
+_ATRIBUTOS_REGISTRO = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+class _ContextoHilo(logging.Filter):
+    # Se evalúa en el hilo que registra, antes de encolar: ahí es donde se sabe la tarea en curso
+    def filter(self, record):
+        record.app = getattr(_contexto_hilo, "tarea", None)
+        record.fase = getattr(_contexto_hilo, "fase", None)
+        record.intento = getattr(_contexto_hilo, "intento", None)
+        return True
+
+class _FormatoJSON(logging.Formatter):
+    def format(self, record):
+        evento = {"t": round(record.created, 3), "nivel": record.levelname, "msg": record.getMessage(),
+                  "hilo": record.threadName}
+        for campo, valor in vars(record).items():
+            if campo not in _ATRIBUTOS_REGISTRO and valor is not None:
+                evento[campo] = valor
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+class _FormatoConsola(logging.Formatter):
+    def format(self, record):
+        app = getattr(record, "app", None)
+        return f"{record.levelname}: {f'[{app}] ' if app else ''}{record.getMessage()}"
+
+_escritor_log = None
+
+def configurar_registro(nivel=None, consola=False, ruta=None):
+    # Sustituye la configuración anterior. Sin nivel se usa PLAYER_LOG_NIVEL o NIVEL_LOG_POR_DEFECTO.
+    # En consola solo salen avisos y errores salvo con consola=True (--depurar), que lo muestra todo.
+    global _escritor_log
+    import logging.handlers  # Trae socket, pickle...: no se paga al importar player
+    cerrar_registro()
+    nivel = (nivel or os.environ.get("PLAYER_LOG_NIVEL") or NIVEL_LOG_POR_DEFECTO).upper()
+    if nivel not in NIVELES_LOG:
+        raise ValueError(f"Nivel de log desconocido: {nivel} (válidos: {', '.join(NIVELES_LOG)})")
+    archivo = logging.handlers.RotatingFileHandler(ruta or REGISTRO_LOG_RUTA, maxBytes=REGISTRO_LOG_TAM_MAX,
+                                                   backupCount=REGISTRO_LOG_COPIAS, encoding="utf-8", delay=True)
+    archivo.setFormatter(_FormatoJSON())
+    destinos = [archivo]
+    if sys.stderr is not None:  # En el ejecutable sin consola no hay stderr
+        pantalla = logging.StreamHandler(sys.stderr)
+        pantalla.setFormatter(_FormatoConsola())
+        pantalla.setLevel(logging.DEBUG if consola else logging.WARNING)
+        destinos.append(pantalla)
+    cola = queue.SimpleQueue()
+    encolador = logging.handlers.QueueHandler(cola)
+    encolador.addFilter(_ContextoHilo())
+    for manejador in list(log.handlers):
+        log.removeHandler(manejador)
+    log.addHandler(encolador)
+    log.setLevel(nivel)
+    _escritor_log = logging.handlers.QueueListener(cola, *destinos, respect_handler_level=True)
+    _escritor_log.start()
+
+def fijar_nivel_log(nivel):
+    log.setLevel(nivel.upper())
+
+def cerrar_registro():
+    # Vacía la cola y cierra el archivo. Se llama al salir de main; también sirve para reconfigurar.
+    global _escritor_log
+    if _escritor_log is None:
+        return
+    escritor, _escritor_log = _escritor_log, None
+    escritor.stop()
+    for manejador in escritor.handlers:
+        manejador.close()
+
+# --- AVISOS AL USUARIO ---
+# tkinter solo se importa al abrir la ventana (cargar_tk). La lógica de tareas avisa al usuario con
+# estas funciones: con la GUI cargada muestran diálogos; en modo sin ventana escriben en la consola.
+tk = ttk = messagebox = tkfont = None
+root_tk = None  # Ventana principal: los avisos desde hilos de trabajo se abren en su hilo
+RESPUESTA_AUTOMATICA = False  # --yes: en modo sin ventana, responder "sí" a las preguntas
+
+def cargar_tk():
+    global tk, ttk, messagebox, tkfont
+    import tkinter
+    from tkinter import ttk as tk_ttk, messagebox as tk_messagebox, font as tk_font
+    tk, ttk, messagebox, tkfont = tkinter, tk_ttk, tk_messagebox, tk_font
+
+def ejecutar_en_tk(root_gui, funcion, timeout=None):
+    # Ejecuta funcion() en el hilo de Tk y espera su resultado con un Event en vez de sondear.
+    # Devuelve None si no termina antes de timeout; las excepciones se relanzan en el llamante.
+    hecho = threading.Event()
+    salida = {}
+    def envoltorio():
+        try:
+            salida["valor"] = funcion()
+        except Exception as e:
+            salida["error"] = e
+        finally:
+            hecho.set()
+    root_gui.after(0, envoltorio)
+    if not hecho.wait(timeout):
+        return None
+    if "error" in salida:
+        raise salida["error"]
+    return salida["valor"]
+
+def conectar_consola():
+    # El ejecutable se construye sin consola (console=False) y ahí sys.stdout es None: en modo CLI
+    # se engancha a la consola desde la que se lanzó. Si no la hay, escribir_consola va al registro.
+    if sys.stdout is not None or os.name != "nt":
+        return
+    import ctypes
+    if not ctypes.windll.kernel32.AttachConsole(-1):  # ATTACH_PARENT_PROCESS
+        return
+    sys.stdout = open("CONOUT$", "w", encoding="utf-8", errors="replace", buffering=1)
+    sys.stderr = open("CONOUT$", "w", encoding="utf-8", errors="replace", buffering=1)
+
+def escribir_consola(texto, nivel=logging.INFO):
+    salida = sys.stdout or sys.__stderr__
+    if salida is None:
+        log.log(nivel, texto)
+        return
+    salida.write(f"{texto}\n")  # Una sola escritura: no se mezcla entre hilos
+    salida.flush()
+
+def _en_hilo_tk():
+    return threading.current_thread() is threading.main_thread()  # mainloop corre en el hilo principal
+
+def _raiz_tk(root_gui):
+    return root_gui if root_gui is not None else root_tk
+
+def _mostrar(funcion_tk, nivel, titulo, mensaje, root_gui):
+    # Tk no es seguro entre hilos: fuera de su hilo el diálogo siempre se encola con after()
+    raiz = _raiz_tk(root_gui)
+    if messagebox is None or (raiz is None and not _en_hilo_tk()):
+        escribir_consola(f"{nivel}: {titulo}: {mensaje}", logging.ERROR if nivel == "ERROR" else logging.WARNING)
+    elif _en_hilo_tk():
+        getattr(messagebox, funcion_tk)(titulo, mensaje)
+    else:
+        raiz.after(0, lambda: getattr(messagebox, funcion_tk)(titulo, mensaje))  # Sin bloquear al hilo de trabajo
+
+def mostrar_error(titulo, mensaje, root_gui=None):
+    _mostrar("showerror", "ERROR", titulo, mensaje, root_gui)
+
+def mostrar_advertencia(titulo, mensaje, root_gui=None):
+    _mostrar("showwarning", "ADVERTENCIA", titulo, mensaje, root_gui)
+
+def mostrar_info(titulo, mensaje, root_gui=None):
+    _mostrar("showinfo", "INFO", titulo, mensaje, root_gui)
+
+def preguntar_ok_cancelar(titulo, mensaje, root_gui=None, antes=None, despues=None):
+    # Desde un hilo de trabajo el diálogo se abre en el hilo de Tk y el hilo de trabajo espera la respuesta;
+    # antes/despues se ejecutan también allí (p. ej. soltar y recuperar el grab de la ventana de progreso)
+    raiz = _raiz_tk(root_gui)
+    if messagebox is not None and (raiz is not None or _en_hilo_tk()):
+        def preguntar():
+            if antes:
+                antes()
+            try:
+                return messagebox.askokcancel(titulo, mensaje)
+            finally:
+                if despues:
+                    despues()
+        return preguntar() if _en_hilo_tk() else ejecutar_en_tk(raiz, preguntar)
+    print(f"{titulo}\n{mensaje}")
+    if RESPUESTA_AUTOMATICA:
+        print("(--yes: se continúa sin esperar respuesta)")
+        return True
+    if sys.stdin and sys.stdin.isatty():
+        return input("¿Continuar? [s/N] ").strip().lower() in ("s", "si", "sí", "y", "yes")
+    return False
+
 # --- LÓGICA DE PROCESAMIENTO (sin cambios visuales aquí) ---
 progress_window = None
 progress_bar = None
 progress_label_status = None
 progress_label_percentage = None
+progress_marco_tareas = None
+progress_filas = {}  # tarea -> widgets de su fila en la ventana de progreso
+progress_total_tareas = 0
+tiempos_verificacion = {}  # app -> segundos dedicados a verificar su SHA-256 durante la descarga
+reinicios_pendientes = set()  # apps cuyo instalador pidió reiniciar (código 3010/1641...)
 
 # ... (TODAS LAS FUNCIONES DE LÓGICA: actualizar_progreso_gui, descargar_archivo, etc.
 #      PERMANECEN IGUALES QUE EN LA VERSIÓN ANTERIOR)
@@ -86,159 +318,2649 @@ def actualizar_progreso_gui(valor_barra=None, texto_status=None, texto_porcentaj
             progress_label_percentage.config(text=texto_porcentaje)
         progress_window.update_idletasks()
 
-def descargar_archivo(url, ruta_destino_descarga):
-    actualizar_progreso_gui(valor_barra=0, texto_porcentaje="0%")
+def _fila_progreso(tarea):
+    # Una fila (texto, porcentaje y barra) por tarea; con tareas en paralelo cada una pinta la suya
+    fila = progress_filas.get(tarea)
+    if fila is None and progress_marco_tareas is not None:
+        marco = ttk.Frame(progress_marco_tareas)
+        marco.pack(fill="x", pady=(0, 6))
+        marco.columnconfigure(0, weight=1)
+        etiqueta = ttk.Label(marco, text=f"{tarea}: en espera", anchor="w")
+        etiqueta.grid(row=0, column=0, sticky="w")
+        porcentaje = ttk.Label(marco, text="", anchor="e")
+        porcentaje.grid(row=0, column=1, sticky="e")
+        barra = ttk.Progressbar(marco, orient="horizontal", mode="determinate")
+        barra.grid(row=1, column=0, columnspan=2, sticky="ew")
+        fila = progress_filas[tarea] = {"etiqueta": etiqueta, "porcentaje": porcentaje, "barra": barra, "valor": 0}
+    return fila
+
+def actualizar_fila_progreso(tarea, valor_barra=None, texto_status=None, texto_porcentaje=None):
+    fila = _fila_progreso(tarea)
+    if fila is None:  # Ventana sin filas por tarea: todo va a la barra general
+        actualizar_progreso_gui(valor_barra, texto_status, texto_porcentaje)
+        return
+    if valor_barra is not None:
+        fila["barra"]["value"] = fila["valor"] = valor_barra
+        # La barra general es la media de todas las tareas de la selección
+        if progress_bar:
+            progress_bar['value'] = sum(f["valor"] for f in progress_filas.values()) / max(progress_total_tareas, len(progress_filas))
+    if texto_status:
+        fila["etiqueta"].config(text=f"{tarea}: {texto_status}")
+    if texto_porcentaje is not None:
+        fila["porcentaje"].config(text=texto_porcentaje)
+
+# --- CANAL DE PROGRESO ---
+# Los hilos de trabajo nunca tocan Tk: publican en el canal y la ventana de progreso lo drena
+# PROGRESO_HZ veces por segundo, aplicando solo el último valor de cada campo por tarea. Una
+# descarga de 1 GB ya no encola un callback de Tk por cada bloque recibido.
+PROGRESO_HZ = 30
+
+_contexto_hilo = threading.local()
+
+def tarea_actual():
+    return getattr(_contexto_hilo, "tarea", None)
+
+def fijar_tarea_actual(tarea):
+    _contexto_hilo.tarea = tarea
+
+class CanalProgreso:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendiente = {}   # tarea -> campos aún no aplicados
+        self._ultimo = {}      # tarea -> últimos campos publicados
+
+    def publicar(self, tarea, **campos):
+        campos = {k: v for k, v in campos.items() if v is not None}
+        with self._lock:
+            # Se reinserta al final para que al drenar se respete qué tarea habló la última
+            pendiente = self._pendiente.pop(tarea, {})
+            pendiente.update(campos)
+            self._pendiente[tarea] = pendiente
+            self._ultimo.setdefault(tarea, {}).update(campos)
+
+    def drenar(self):
+        with self._lock:
+            pendiente, self._pendiente = self._pendiente, {}
+        return pendiente
+
+    def ultimo(self, tarea, campo):
+        with self._lock:
+            return self._ultimo.get(tarea, {}).get(campo)
+
+canal_progreso = CanalProgreso()
+
+def publicar_progreso(valor_barra=None, texto_status=None, texto_porcentaje=None, tarea=None):
+    canal_progreso.publicar(tarea if tarea is not None else tarea_actual(),
+                            valor_barra=valor_barra, texto_status=texto_status, texto_porcentaje=texto_porcentaje)
+
+def _drenar_canal_progreso():
+    # Se ejecuta en el hilo de Tk y se reprograma mientras exista la ventana de progreso
+    if not (progress_window and progress_window.winfo_exists()):
+        return
+    for tarea, campos in canal_progreso.drenar().items():
+        if tarea is None:
+            actualizar_progreso_gui(**campos)
+        else:
+            actualizar_fila_progreso(tarea, **campos)
+    progress_window.after(1000 // PROGRESO_HZ, _drenar_canal_progreso)
+
+# --- DESCARGAS ---
+DESCARGA_CONEXIONES = 4                         # Conexiones paralelas (rangos HTTP) por descarga
+DESCARGA_TAM_MIN_SEGMENTO = 4 * 1024 * 1024     # Por debajo de esto no compensa trocear
+DESCARGA_BLOQUE = 64 * 1024
+DESCARGA_TIMEOUT = 60
+DESCARGA_REINTENTOS = 3
+DESCARGA_PUNTO_CONTROL = 4 * 1024 * 1024        # Cada cuántos bytes por rango se sincroniza el .part y su diario
+HASH_BLOQUE = 1024 * 1024
+
+HTTP_POOL_HOSTS = 8                             # Hosts distintos con conexiones en reserva
+HTTP_POOL_CONEXIONES = 16                       # Conexiones keep-alive por host (>= DESCARGA_CONEXIONES)
+
+DESCARGA_LIMITE_BPS = 0                         # Tope de todas las descargas juntas en bytes/s (0 = sin límite)
+DESCARGA_RAFAGA_SEGUNDOS = 0.25                 # Cuánto puede adelantarse el cubo de tokens tras estar parado
+DESCARGA_CONCURRENCIA_ADAPTATIVA = True         # Ajustar las conexiones simultáneas según el caudal que aportan
+DESCARGA_CONCURRENCIA_INICIAL = 8
+DESCARGA_CONCURRENCIA_MAX = HTTP_POOL_CONEXIONES
+DESCARGA_AJUSTE_SEGUNDOS = 0.5                  # Ventana en la que se mide el caudal antes de mover el límite
+DESCARGA_MEJORA_MINIMA = 0.10                   # Una conexión más que no sube el caudal al menos esto se retira
+
+_sesion_http = None
+_sesion_http_lock = threading.Lock()
+
+def obtener_sesion_http():
+    # Una única sesión para todo el proceso: reutiliza conexiones TCP/TLS entre sondeos,
+    # rangos y descargas en vez de abrir una nueva por cada requests.get
+    global _sesion_http
+    cargar_requests()
+    with _sesion_http_lock:
+        if _sesion_http is None:
+            sesion = requests.Session()
+            adaptador = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_CONEXIONES)
+            sesion.mount("http://", adaptador)
+            sesion.mount("https://", adaptador)
+            _sesion_http = sesion
+        return _sesion_http
+
+class _CuboTokens:
+    # Tope global de bytes/s para todos los hilos de descarga. Con espera, el turno es de la
+    # descarga que menos lleva consumido: cada una recibe su parte aunque abra más conexiones.
+    def __init__(self, bytes_por_segundo):
+        self.tasa = bytes_por_segundo
+        self.capacidad = max(DESCARGA_BLOQUE, bytes_por_segundo * DESCARGA_RAFAGA_SEGUNDOS)
+        self._tokens = self.capacidad
+        self._ultimo = time.monotonic()
+        self._consumido = {}   # cuota -> bytes (reloj virtual de cada descarga)
+        self._esperando = {}   # cuota -> hilos suyos pidiendo tokens
+        self._cond = threading.Condition()
+
+    def _rellenar(self):
+        ahora = time.monotonic()
+        self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    def consumir(self, cuota, n):
+        # Se paga después de leer (los tokens pueden quedar en negativo): mientras el hilo espera
+        # no lee del socket y TCP frena al servidor
+        with self._cond:
+            otros = [self._consumido[c] for c, hilos in self._esperando.items() if hilos and c is not cuota]
+            if otros and not self._esperando.get(cuota):
+                # Quien vuelve tras un rato sin pedir no puede cobrarse de golpe lo que no usó
+                self._consumido[cuota] = max(self._consumido.get(cuota, 0), min(otros) - self.capacidad)
+            self._esperando[cuota] = self._esperando.get(cuota, 0) + 1
+            try:
+                while True:
+                    self._rellenar()
+                    turno = min((c for c, hilos in self._esperando.items() if hilos),
+                                key=lambda c: self._consumido.get(c, 0))
+                    if turno is cuota and self._tokens > 0:
+                        break
+                    self._cond.wait(max(-self._tokens / self.tasa, 0.001))
+                self._tokens -= n
+                self._consumido[cuota] = self._consumido.get(cuota, 0) + n
+            finally:
+                self._esperando[cuota] -= 1
+                self._cond.notify_all()
+
+    def retirar(self, cuota):
+        with self._cond:
+            if not self._esperando.get(cuota):
+                self._esperando.pop(cuota, None)
+                self._consumido.pop(cuota, None)
+
+class _ConcurrenciaAdaptativa:
+    # Ranuras de conexión compartidas por todas las descargas. Cada DESCARGA_AJUSTE_SEGUNDOS con las
+    # ranuras llenas se compara el caudal con el de la ventana anterior: una conexión más que no
+    # aporta DESCARGA_MEJORA_MINIMA se retira, y se siguen quitando mientras el caudal no caiga en
+    # esa misma proporción. El límite se aplica al abrir cada rango, no a los que ya están en curso.
+    def __init__(self, inicial, maximo, adaptativa=True):
+        self.limite = min(inicial, maximo)
+        self.maximo = maximo
+        self.adaptativa = adaptativa
+        self.ajustes = []      # (segundo, límite, bytes/s) de cada ventana medida con las ranuras llenas
+        self._activas = 0
+        self._abiertas = {}    # cuota -> conexiones suyas abiertas
+        self._esperando = {}   # cuota -> hilos suyos esperando ranura
+        self._caudal_previo = None
+        self._paso = 1
+        self._cond = threading.Condition()
+        self._t0 = time.monotonic()
+        self._abrir_ventana(self._t0)
+
+    def _abrir_ventana(self, ahora):
+        self._inicio_ventana = ahora
+        self._bytes_ventana = 0
+        if self._activas > self.limite:
+            self._ventana = "transicion"  # Tras bajar el límite, hasta que se cierren las conexiones de más
+        elif self._activas == self.limite or self._esperando:
+            self._ventana = "llena"
+        else:
+            self._ventana = "libre"
+
+    def _le_toca(self, cuota):
+        # La siguiente ranura libre es para la descarga que menos conexiones tiene abiertas
+        if self._activas >= self.limite:
+            return False
+        return self._abiertas.get(cuota, 0) <= min(self._abiertas.get(c, 0) for c in self._esperando)
+
+    @contextlib.contextmanager
+    def ranura(self, cuota):
+        with self._cond:
+            self._esperando[cuota] = self._esperando.get(cuota, 0) + 1
+            try:
+                while not self._le_toca(cuota):
+                    self._cond.wait()
+            finally:
+                self._esperando[cuota] -= 1
+                if not self._esperando[cuota]:
+                    del self._esperando[cuota]
+            self._activas += 1
+            self._abiertas[cuota] = self._abiertas.get(cuota, 0) + 1
+            if self._activas == self.limite and self._ventana == "libre":
+                self._abrir_ventana(time.monotonic())  # Se acaban de llenar: la medida empieza aquí
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._activas -= 1
+                self._abiertas[cuota] -= 1
+                if not self._abiertas[cuota]:
+                    del self._abiertas[cuota]
+                if self._activas < self.limite and not self._esperando:
+                    self._ventana = "libre"
+                elif self._activas == self.limite and self._ventana == "transicion":
+                    self._abrir_ventana(time.monotonic())
+                self._cond.notify_all()
+
+    def contar(self, n):
+        if not self.adaptativa:
+            return
+        with self._cond:
+            self._bytes_ventana += n
+            ahora = time.monotonic()
+            if ahora - self._inicio_ventana >= DESCARGA_AJUSTE_SEGUNDOS:
+                self._ajustar(ahora)
+
+    def _ajustar(self, ahora):
+        caudal = self._bytes_ventana / (ahora - self._inicio_ventana)
+        if self._ventana == "libre":
+            self._caudal_previo = None  # Con ranuras libres el caudal no dice nada del límite
+        elif self._ventana == "llena":
+            if self._caudal_previo is not None:
+                if self._paso > 0 and caudal < self._caudal_previo * (1 + DESCARGA_MEJORA_MINIMA):
+                    self._paso = -1
+                elif self._paso < 0 and caudal < self._caudal_previo * (1 - DESCARGA_MEJORA_MINIMA):
+                    self._paso = 1
+            nuevo = min(max(1, self.limite + self._paso), self.maximo)
+            if nuevo == self.limite:
+                self._paso = -self._paso  # En un extremo: la próxima vez se prueba hacia el otro lado
+            self.ajustes.append((round(ahora - self._t0, 2), self.limite, caudal))
+            log.debug(f"Descargas: {self.limite} conexiones dan {caudal / 1024 / 1024:.1f} MB/s; límite -> {nuevo}")
+            self._caudal_previo = caudal
+            self.limite = nuevo
+            self._cond.notify_all()
+        self._abrir_ventana(ahora)
+
+_controles_descarga = None
+_controles_descarga_lock = threading.Lock()
+
+def controles_descarga():
+    # (cubo de tokens o None sin tope, ranuras de conexión) compartidos por todas las descargas del proceso
+    global _controles_descarga
+    with _controles_descarga_lock:
+        if _controles_descarga is None:
+            cubo = _CuboTokens(DESCARGA_LIMITE_BPS) if DESCARGA_LIMITE_BPS > 0 else None
+            inicial = DESCARGA_CONCURRENCIA_INICIAL if DESCARGA_CONCURRENCIA_ADAPTATIVA else DESCARGA_CONCURRENCIA_MAX
+            _controles_descarga = (cubo, _ConcurrenciaAdaptativa(inicial, DESCARGA_CONCURRENCIA_MAX, DESCARGA_CONCURRENCIA_ADAPTATIVA))
+        return _controles_descarga
+
+def fijar_limite_descarga(bytes_por_segundo):
+    # Las descargas ya en curso terminan con los controles con los que empezaron
+    global DESCARGA_LIMITE_BPS, _controles_descarga
+    with _controles_descarga_lock:
+        DESCARGA_LIMITE_BPS = bytes_por_segundo
+        _controles_descarga = None
+
+class _CuotaDescarga:
+    # Lo que comparten los hilos de una misma descarga frente a los controles globales
+    def __init__(self):
+        self._cubo, self._concurrencia = controles_descarga()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._cubo is not None:
+            self._cubo.retirar(self)
+
+    def conexion(self):
+        return self._concurrencia.ranura(self)
+
+    def consumir(self, n):
+        if self._cubo is not None:
+            self._cubo.consumir(self, n)
+        self._concurrencia.contar(n)
+
+class _ProgresoDescarga:
+    # Acumula lo descargado por todos los hilos y publica solo cuando cambia el porcentaje.
+    # Los rangos corren en hilos del pool, así que la tarea se fija al crearlo.
+    def __init__(self, total, descargado=0):
+        self.tarea = tarea_actual()
+        self.total = total
+        self.descargado = descargado
+        self._ultimo_aviso = -1
+        self._lock = threading.Lock()
+
+    def sumar(self, n):
+        with self._lock:
+            self.descargado += n
+            descargado = self.descargado
+            if self.total > 0:
+                marca = int((descargado / self.total) * 100)
+            else:
+                marca = descargado // (1024 * 1024)
+            if marca == self._ultimo_aviso:
+                return
+            self._ultimo_aviso = marca
+        if self.total > 0:
+            publicar_progreso(valor_barra=marca, texto_porcentaje=f"{marca}%", tarea=self.tarea)
+        else:
+            publicar_progreso(valor_barra=(descargado // 1024) % 100, texto_porcentaje=f"{descargado // 1024} KB", tarea=self.tarea)
+
+def sondear_descarga(url, timeout=None):
+    # HEAD para conocer tamaño y soporte de rangos. Si el servidor no responde bien al HEAD
+    # se devuelve None y se descarga con un solo flujo.
+    try:
+        r = obtener_sesion_http().head(url, allow_redirects=True, timeout=timeout or DESCARGA_TIMEOUT)
+        r.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        log.debug(f"HEAD fallido para {url}: {e}")
+        return None
+    return {
+        "url_final": r.url,
+        "total": int(r.headers.get('content-length', 0) or 0),
+        "acepta_rangos": r.headers.get('accept-ranges', '').lower() == 'bytes',
+        "etag": r.headers.get('etag'),
+        "last_modified": r.headers.get('last-modified'),
+    }
+
+def _calcular_segmentos(total, conexiones):
+    # Rangos [inicio, fin] inclusivos, como los espera la cabecera Range
+    n = max(1, min(conexiones, total // DESCARGA_TAM_MIN_SEGMENTO))
+    tam = total // n
+    segmentos = []
+    for i in range(n):
+        inicio = i * tam
+        fin = total - 1 if i == n - 1 else inicio + tam - 1
+        segmentos.append((inicio, fin))
+    return segmentos
+
+class _RangoNoSoportado(Exception):
+    pass
+
+class _DescargaCancelada(Exception):
+    pass
+
+def _comprobar_cancelacion(cancelar):
+    if cancelar is not None and cancelar.is_set():
+        raise _DescargaCancelada("Descarga cancelada")
+
+class _DiarioDescarga:
+    # Descarga parcial reanudable: <destino>.part con los datos y <destino>.part.json con la URL,
+    # los validadores (ETag/Last-Modified) y, por rango, el primer byte que aún no está en disco.
+    # El diario solo avanza después de un fsync del .part, así que nunca apunta a datos perdidos.
+    def __init__(self, ruta_destino, url, info, segmentos):
+        self.ruta_part = ruta_destino + ".part"
+        self.ruta_json = self.ruta_part + ".json"
+        self.url = url
+        self.total = info["total"]
+        self.etag = info.get("etag")
+        self.last_modified = info.get("last_modified")
+        self.segmentos = segmentos  # listas [inicio, fin, siguiente_byte]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def nuevo(cls, ruta_destino, url, info, conexiones):
+        segmentos = [[ini, fin, ini] for ini, fin in _calcular_segmentos(info["total"], conexiones)]
+        diario = cls(ruta_destino, url, info, segmentos)
+        with open(diario.ruta_part, 'wb') as f:
+            f.truncate(diario.total)
+        diario.guardar()
+        return diario
+
+    @classmethod
+    def cargar(cls, ruta_destino, url, info):
+        ruta_part = ruta_destino + ".part"
+        try:
+            with open(ruta_part + ".json", 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            tam_part = os.path.getsize(ruta_part)
+        except (OSError, ValueError):
+            return None
+        # Sin validadores no hay forma de saber si el fichero del servidor es el mismo
+        mismo_recurso = (datos.get("url") == url and datos.get("total") == info["total"] == tam_part
+                         and (info.get("etag") or info.get("last_modified"))
+                         and datos.get("etag") == info.get("etag")
+                         and datos.get("last_modified") == info.get("last_modified"))
+        if not mismo_recurso:
+            log.debug(f"Diario de {os.path.basename(ruta_destino)} descartado (el recurso ha cambiado)")
+            return None
+        return cls(ruta_destino, url, info, datos["segmentos"])
+
+    def guardar(self):
+        datos = {"url": self.url, "total": self.total, "etag": self.etag,
+                 "last_modified": self.last_modified, "segmentos": self.segmentos}
+        temporal = self.ruta_json + ".tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f)
+        os.replace(temporal, self.ruta_json)
+
+    def avanzar(self, segmento, siguiente_byte):
+        with self._lock:
+            segmento[2] = siguiente_byte
+            self.guardar()
+
+    def completado(self):
+        return sum(seg[2] - seg[0] for seg in self.segmentos)
+
+    def pendientes(self):
+        return [seg for seg in self.segmentos if seg[2] <= seg[1]]
+
+    def validador(self):
+        return self.etag or self.last_modified
+
+    def finalizar(self, ruta_destino):
+        os.replace(self.ruta_part, ruta_destino)
+        self.descartar()
+
+    def descartar(self):
+        for ruta in (self.ruta_json, self.ruta_part):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+class _HashSecuencial:
+    # SHA-256 del fichero completo calculado durante la descarga por rangos. Lo que llega justo en la
+    # frontera (el rango que va por delante) se hashea desde memoria; cuando la frontera alcanza un
+    # rango que ya escribió datos, el hilo que lo detecta los lee del .part, recién escritos y aún en
+    # la caché de páginas del SO, sin bloquear al resto de rangos.
+    def __init__(self, ruta_part, segmentos):
+        self._ruta_part = ruta_part
+        self._escrito = {seg[0]: seg[2] for seg in segmentos}   # inicio del rango -> primer byte sin escribir
+        self._fines = {seg[0]: seg[1] for seg in segmentos}
+        self._h = hashlib.sha256()
+        self._lock = threading.Lock()
+        self._poniendose_al_dia = False
+        self.pos = 0
+        self.segundos = 0.0
+
+    def escrito(self, inicio_rango, offset, data):
+        # Llamado por el hilo de un rango después de escribir data en offset
+        with self._lock:
+            self._escrito[inicio_rango] = offset + len(data)
+            if self._poniendose_al_dia or offset < self.pos:
+                return
+            if offset == self.pos:
+                t0 = time.perf_counter()
+                self._h.update(data)
+                self.pos += len(data)
+                self.segundos += time.perf_counter() - t0
+                return
+            if self._limite_disponible() <= self.pos:
+                return
+            self._poniendose_al_dia = True
+        self._ponerse_al_dia()
+
+    def _limite_disponible(self):
+        # Fin del tramo contiguo ya escrito a partir de self.pos
+        limite = self.pos
+        for inicio in sorted(self._escrito):
+            if inicio <= limite <= self._fines[inicio]:
+                limite = self._escrito[inicio]
+        return limite
+
+    def _ponerse_al_dia(self):
+        with open(self._ruta_part, 'rb') as f:
+            while True:
+                with self._lock:
+                    limite = self._limite_disponible()
+                    if limite <= self.pos:
+                        self._poniendose_al_dia = False
+                        return
+                    desde = self.pos
+                t0 = time.perf_counter()
+                f.seek(desde)
+                pendiente = limite - desde
+                while pendiente:
+                    bloque = f.read(min(HASH_BLOQUE, pendiente))
+                    self._h.update(bloque)
+                    pendiente -= len(bloque)
+                with self._lock:
+                    self.pos = limite
+                    self.segundos += time.perf_counter() - t0
+
+    def hexdigest(self, total):
+        with self._lock:
+            self._poniendose_al_dia = True
+        self._ponerse_al_dia()
+        if self.pos != total:
+            raise OSError(f"Hash incompleto: {self.pos} de {total} bytes")
+        return self._h.hexdigest()
+
+def _descargar_segmento(url, diario, segmento, progreso, hash_secuencial, cuota, cancelar=None):
+    inicio_rango, fin, pos = segmento
+    cabeceras = {"Range": f"bytes={pos}-{fin}"}
+    if diario.validador():
+        cabeceras["If-Range"] = diario.validador()  # Si el recurso cambió, el servidor contesta 200 completo
+    with cuota.conexion(), obtener_sesion_http().get(url, headers=cabeceras, stream=True, timeout=DESCARGA_TIMEOUT) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise _RangoNoSoportado(f"Respuesta {response.status_code} a una petición con Range")
+        # Sin búfer: lo escrito es visible al momento para el hash desde otro descriptor
+        with open(diario.ruta_part, 'r+b', buffering=0) as f:
+            f.seek(pos)
+            sin_sincronizar = 0
+            try:
+                for data in response.iter_content(DESCARGA_BLOQUE):
+                    _comprobar_cancelacion(cancelar)
+                    data = data[:fin + 1 - pos]
+                    vista = memoryview(data)
+                    escrito = 0
+                    while escrito < len(data):  # Un write sin búfer puede escribir menos de lo pedido
+                        escrito += f.write(vista[escrito:])
+                    hash_secuencial.escrito(inicio_rango, pos, data)
+                    pos += len(data)
+                    sin_sincronizar += len(data)
+                    progreso.sumar(len(data))
+                    cuota.consumir(len(data))
+                    if sin_sincronizar >= DESCARGA_PUNTO_CONTROL:
+                        os.fsync(f.fileno())
+                        diario.avanzar(segmento, pos)
+                        sin_sincronizar = 0
+            finally:
+                # También si la conexión se corta: lo ya escrito queda registrado para reanudar
+                os.fsync(f.fileno())
+                diario.avanzar(segmento, pos)
+    if pos != fin + 1:
+        raise requests.exceptions.ChunkedEncodingError(f"Rango {inicio_rango}-{fin} incompleto ({pos} de {fin + 1})")
+
+def _descargar_por_rangos(url, ruta_destino, info, conexiones, cuota, cancelar=None):
+    # Devuelve (sha256, segundos dedicados al hash)
+    diario = _DiarioDescarga.cargar(ruta_destino, url, info)
+    if diario:
+        log.debug(f"Reanudando {os.path.basename(ruta_destino)} desde {diario.completado()} de {diario.total} bytes")
+    else:
+        diario = _DiarioDescarga.nuevo(ruta_destino, url, info, conexiones)
+    progreso = _ProgresoDescarga(diario.total, diario.completado())
+    hash_secuencial = _HashSecuencial(diario.ruta_part, diario.segmentos)
+    pendientes = diario.pendientes()
     try:
-        response = requests.get(url, stream=True, timeout=60)
+        if len(pendientes) == 1:
+            _descargar_segmento(info["url_final"], diario, pendientes[0], progreso, hash_secuencial, cuota, cancelar)
+        elif pendientes:
+            log.debug(f"Descarga segmentada de {url} en {len(pendientes)} rangos ({diario.total} bytes)")
+            with ThreadPoolExecutor(max_workers=len(pendientes), thread_name_prefix="descarga") as pool:
+                futuros = [pool.submit(_descargar_segmento, info["url_final"], diario, seg, progreso, hash_secuencial, cuota, cancelar)
+                           for seg in pendientes]
+                for futuro in futuros:
+                    futuro.result()
+    except _RangoNoSoportado:
+        diario.descartar()
+        raise
+    with tramo("verificación", bytes=diario.total):
+        digest = hash_secuencial.hexdigest(diario.total)
+    diario.finalizar(ruta_destino)
+    return digest, hash_secuencial.segundos
+
+def _descargar_flujo_unico(url, ruta_destino, cuota, cancelar=None):
+    # Sin rangos no se puede reanudar: se escribe a .part y solo se renombra si termina
+    ruta_part = ruta_destino + ".part"
+    h = hashlib.sha256()
+    segundos_hash = 0.0
+    with cuota.conexion(), obtener_sesion_http().get(url, stream=True, timeout=DESCARGA_TIMEOUT) as response:
         response.raise_for_status()
-        total_size = int(response.headers.get('content-length', 0))
-        block_size = 8192
-        descargado = 0
-        with open(ruta_destino_descarga, 'wb') as f:
-            for data in response.iter_content(block_size):
-                descargado += len(data)
+        progreso = _ProgresoDescarga(int(response.headers.get('content-length', 0) or 0))
+        with open(ruta_part, 'wb') as f:
+            for data in response.iter_content(DESCARGA_BLOQUE):
+                _comprobar_cancelacion(cancelar)
                 f.write(data)
-                if total_size > 0:
-                    porcentaje = int((descargado / total_size) * 100)
-                    progress_window.after(0, lambda p=porcentaje: actualizar_progreso_gui(valor_barra=p, texto_porcentaje=f"{p}%"))
-                else:
-                    progress_window.after(0, lambda d=descargado: actualizar_progreso_gui(valor_barra=(d // 1024) % 100, texto_porcentaje=f"{d // 1024} KB"))
-        progress_window.after(0, lambda: actualizar_progreso_gui(valor_barra=100, texto_porcentaje="100%"))
+                t0 = time.perf_counter()
+                h.update(data)
+                segundos_hash += time.perf_counter() - t0
+                progreso.sumar(len(data))
+                cuota.consumir(len(data))
+        validadores = {"etag": response.headers.get('etag'), "last_modified": response.headers.get('last-modified')}
+    os.replace(ruta_part, ruta_destino)
+    validadores.update(sha256=h.hexdigest(), segundos_hash=segundos_hash)
+    return validadores
+
+def _descargar_una_vez(url, ruta_destino_descarga, conexiones, cuota, cancelar=None):
+    # Devuelve los validadores HTTP del recurso descargado (para la caché) y su SHA-256
+    with tramo("resolución", url=url):
+        info = sondear_descarga(url)
+    if info is not None and info["acepta_rangos"] and info["total"] > 0:
+        try:
+            digest, segundos_hash = _descargar_por_rangos(url, ruta_destino_descarga, info, conexiones, cuota, cancelar)
+            return {"etag": info["etag"], "last_modified": info["last_modified"],
+                    "sha256": digest, "segundos_hash": segundos_hash}
+        except _RangoNoSoportado as e:
+            log.debug(f"{e}. Se repite con un solo flujo.")
+    return _descargar_flujo_unico(url, ruta_destino_descarga, cuota, cancelar)
+
+def descargar_archivo(url, ruta_destino_descarga, conexiones=None, metadatos=None, cancelar=None):
+    # Si se pasa el dict metadatos, se rellena con el ETag/Last-Modified y el SHA-256 de lo descargado.
+    # Si se activa el Event cancelar, los rangos paran en el siguiente bloque y se borra lo descargado.
+    publicar_progreso(valor_barra=0, texto_porcentaje="0%")
+    conexiones = conexiones or DESCARGA_CONEXIONES
+    cargar_requests()  # Sus excepciones se usan en los except de abajo
+    try:
+        with _CuotaDescarga() as cuota:
+            for intento in range(1, DESCARGA_REINTENTOS + 1):
+                try:
+                    with tramo("descarga", url=url, intento=intento):
+                        validadores = _descargar_una_vez(url, ruta_destino_descarga, conexiones, cuota, cancelar)
+                    if metadatos is not None:
+                        metadatos.update(validadores)
+                    break
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                        requests.exceptions.ChunkedEncodingError) as e:
+                    # Cortes y timeouts: el siguiente intento continúa desde el diario del .part
+                    if intento == DESCARGA_REINTENTOS:
+                        raise
+                    log.debug(f"Descarga interrumpida ({e}). Reintento {intento}/{DESCARGA_REINTENTOS - 1}...")
+                    time.sleep(min(2 ** intento, 10))
+        publicar_progreso(valor_barra=100, texto_porcentaje="100%")
         return True
+    except _DescargaCancelada:
+        # Ya no escribe ningún hilo: el pool de rangos y el .part se cerraron al propagarse
+        for ruta in (ruta_destino_descarga + ".part", ruta_destino_descarga + ".part.json"):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        log.debug(f"Descarga de {os.path.basename(ruta_destino_descarga)} cancelada")
+        return False
+    except (requests.exceptions.RequestException, OSError) as e:
+        mostrar_error("Error de Descarga", f"No se pudo descargar {os.path.basename(ruta_destino_descarga)}:\n{e}")
+        publicar_progreso(texto_status=f"Error descargando {os.path.basename(ruta_destino_descarga)}")
+        return False
+
+# --- CACHÉ DE INSTALADORES ---
+# Caché direccionada por contenido: cada instalador se guarda una sola vez como objetos/<ab>/<sha256>
+# e indice.json relaciona URL -> (sha256, ETag, Last-Modified). Antes de descargar se hace un GET
+# condicional; si el servidor contesta 304 el instalador se enlaza desde la caché sin transferir nada.
+# Cada objeto anota sus "enlaces" en DESCARGAS_DIR: al expulsarlo se borran también, porque un enlace
+# duro mantendría ocupado el espacio que CACHE_TAM_MAX debe liberar.
+CACHE_DIR = os.path.join(DESCARGAS_DIR, "cache")
+CACHE_TAM_MAX = 4 * 1024 * 1024 * 1024          # Límite de la caché; se expulsa por LRU
+
+_cache_lock = threading.Lock()
+
+def _ruta_objeto_cache(digest):
+    return os.path.join(CACHE_DIR, "objetos", digest[:2], digest)
+
+def _leer_indice_cache():
+    try:
+        with open(os.path.join(CACHE_DIR, "indice.json"), 'r', encoding='utf-8') as f:
+            indice = json.load(f)
+    except (OSError, ValueError):
+        indice = {}
+    indice.setdefault("urls", {})
+    indice.setdefault("objetos", {})
+    return indice
+
+def _guardar_indice_cache(indice):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    ruta = os.path.join(CACHE_DIR, "indice.json")
+    with open(ruta + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(indice, f, indent=1)
+    os.replace(ruta + ".tmp", ruta)
+
+def _anotar_enlace(indice, digest, ruta):
+    objeto = indice["objetos"].get(digest)
+    if objeto is not None:
+        ruta = os.path.abspath(ruta)
+        enlaces = objeto.setdefault("enlaces", [])
+        if ruta not in enlaces:
+            enlaces.append(ruta)
+
+def _es_copia_del_objeto(ruta, ruta_objeto):
+    # El enlace duro, o la copia que hizo _enlazar_o_copiar (copy2 conserva tamaño y mtime); si el
+    # archivo se ha sustituido desde entonces (otra versión), ya no es de la caché
+    try:
+        if os.path.samefile(ruta, ruta_objeto):
+            return True
+        st, st_objeto = os.stat(ruta), os.stat(ruta_objeto)
+    except OSError:
+        return False
+    return st.st_size == st_objeto.st_size and st.st_mtime == st_objeto.st_mtime
+
+def _enlazar_o_copiar(origen, destino):
+    # Un enlace duro es instantáneo (misma unidad); si el sistema de ficheros no lo permite, se copia
+    if os.path.exists(destino):
+        if os.path.samefile(origen, destino):
+            return
+        os.remove(destino)
+    try:
+        os.link(origen, destino)
+    except OSError:
+        shutil.copy2(origen, destino)
+
+def _sigue_vigente(url, entrada):
+    cabeceras = {}
+    if entrada.get("etag"):
+        cabeceras["If-None-Match"] = entrada["etag"]
+    if entrada.get("last_modified"):
+        cabeceras["If-Modified-Since"] = entrada["last_modified"]
+    if not cabeceras:
+        return False
+    try:
+        with obtener_sesion_http().get(url, headers=cabeceras, stream=True, timeout=DESCARGA_TIMEOUT) as response:
+            if response.status_code == 304:
+                response.content  # Sin cuerpo: consumirlo devuelve la conexión al pool
+                return True
+            return False
     except requests.exceptions.RequestException as e:
-        messagebox.showerror("Error de Descarga", f"No se pudo descargar {os.path.basename(ruta_destino_descarga)}:\n{e}")
-        progress_window.after(0, lambda: actualizar_progreso_gui(texto_status=f"Error descargando {os.path.basename(ruta_destino_descarga)}"))
+        # Sin conexión es preferible instalar la última versión conocida que no instalar nada
+        log.debug(f"No se pudo validar {url} ({e}). Se usa la copia en caché.")
+        return True
+
+def _expulsar_lru(indice, conservar):
+    ocupado = sum(obj["tam"] for obj in indice["objetos"].values())
+    for digest, obj in sorted(indice["objetos"].items(), key=lambda item: item[1]["ultimo_uso"]):
+        if ocupado <= CACHE_TAM_MAX:
+            break
+        if digest == conservar:
+            continue
+        ruta_objeto = _ruta_objeto_cache(digest)
+        for enlace in obj.get("enlaces", []):
+            if _es_copia_del_objeto(enlace, ruta_objeto):
+                try:
+                    os.remove(enlace)
+                except OSError as e:
+                    log.debug(f"Caché: no se pudo borrar {enlace}: {e}")
+        try:
+            os.remove(ruta_objeto)
+        except FileNotFoundError:
+            pass
+        ocupado -= obj["tam"]
+        del indice["objetos"][digest]
+        log.debug(f"Caché: expulsado {digest[:12]} ({obj['tam']} bytes)")
+    for url in [u for u, e in indice["urls"].items() if e["sha256"] not in indice["objetos"]]:
+        del indice["urls"][url]
+
+def _descargar_con_cache(url, ruta_destino_descarga, sha256_esperado, metadatos, cancelar=None):
+    with _cache_lock:
+        entrada = _leer_indice_cache()["urls"].get(url)
+    if entrada and sha256_esperado and entrada["sha256"] != sha256_esperado:
+        entrada = None  # La configuración pide otra versión: no vale lo que haya en caché
+    if entrada and os.path.exists(_ruta_objeto_cache(entrada["sha256"])):
+        with tramo("resolución", url=url, cache=True):
+            vigente = _sigue_vigente(url, entrada)
+    else:
+        vigente = False
+    if vigente:
+        with _cache_lock:
+            try:
+                _enlazar_o_copiar(_ruta_objeto_cache(entrada["sha256"]), ruta_destino_descarga)
+            except FileNotFoundError:
+                vigente = False  # Otra descarga lo expulsó de la caché después de comprobar que existía
+            else:
+                indice = _leer_indice_cache()
+                if entrada["sha256"] in indice["objetos"]:
+                    indice["objetos"][entrada["sha256"]]["ultimo_uso"] = time.time()
+                    _anotar_enlace(indice, entrada["sha256"], ruta_destino_descarga)
+                    _guardar_indice_cache(indice)
+    if vigente:
+        metadatos.update(entrada, segundos_hash=0.0)
+        log.debug(f"Caché: {os.path.basename(ruta_destino_descarga)} sin cambios, no se descarga")
+        publicar_progreso(valor_barra=100, texto_porcentaje="En caché")
+        return True
+
+    if not descargar_archivo(url, ruta_destino_descarga, metadatos=metadatos, cancelar=cancelar):
+        return False
+    digest = metadatos["sha256"]
+    if sha256_esperado and digest != sha256_esperado:
+        # El hash se calculó durante la descarga: no hace falta volver a leer el fichero
+        os.remove(ruta_destino_descarga)
+        mostrar_error("Error de Verificación", f"{os.path.basename(ruta_destino_descarga)} no coincide con el SHA-256 esperado.\n\n"
+                                                       f"Esperado: {sha256_esperado}\nObtenido: {digest}")
         return False
+    try:
+        ruta_objeto = _ruta_objeto_cache(digest)
+        with _cache_lock:
+            os.makedirs(os.path.dirname(ruta_objeto), exist_ok=True)
+            if not os.path.exists(ruta_objeto):
+                _enlazar_o_copiar(ruta_destino_descarga, ruta_objeto)
+            indice = _leer_indice_cache()
+            enlaces = indice["objetos"].get(digest, {}).get("enlaces", [])
+            indice["objetos"][digest] = {"tam": os.path.getsize(ruta_objeto), "ultimo_uso": time.time(), "enlaces": enlaces}
+            _anotar_enlace(indice, digest, ruta_destino_descarga)
+            indice["urls"][url] = {"sha256": digest, "etag": metadatos.get("etag"), "last_modified": metadatos.get("last_modified")}
+            _expulsar_lru(indice, conservar=digest)
+            _guardar_indice_cache(indice)
+    except OSError as e:
+        # La caché es una optimización: si falla, el instalador descargado sigue siendo válido
+        log.debug(f"No se pudo guardar {os.path.basename(ruta_destino_descarga)} en caché: {e}")
+    return True
+
+class _VueloDescarga:
+    def __init__(self, ruta_destino):
+        self.ruta_destino = ruta_destino
+        self.ok = False
+        self.metadatos = {}
+        self.hecho = threading.Event()
+
+_vuelos_lock = threading.Lock()
+_vuelos_en_curso = {}
+
+def descargar_con_cache(url, ruta_destino_descarga, sha256_esperado=None, metadatos=None, cancelar=None):
+    # Single-flight: si ya hay una descarga de la misma URL en curso, se espera a que termine y
+    # se reutiliza su fichero en vez de abrir una segunda transferencia (o pisar el mismo .part).
+    # Si se indica sha256_esperado, el instalador se rechaza cuando no coincide.
+    sha256_esperado = sha256_esperado.lower() if sha256_esperado else None
+    with _vuelos_lock:
+        vuelo = _vuelos_en_curso.get(url)
+        lider = vuelo is None
+        if lider:
+            vuelo = _vuelos_en_curso[url] = _VueloDescarga(ruta_destino_descarga)
+    if not lider:
+        log.debug(f"{url} ya se está descargando, se espera a esa transferencia")
+        vuelo.hecho.wait()
+        ok = vuelo.ok and (not sha256_esperado or vuelo.metadatos.get("sha256") == sha256_esperado)
+        if ok and os.path.abspath(vuelo.ruta_destino) != os.path.abspath(ruta_destino_descarga):
+            with _cache_lock:
+                _enlazar_o_copiar(vuelo.ruta_destino, ruta_destino_descarga)
+                indice = _leer_indice_cache()
+                if vuelo.metadatos.get("sha256") in indice["objetos"]:
+                    _anotar_enlace(indice, vuelo.metadatos["sha256"], ruta_destino_descarga)
+                    _guardar_indice_cache(indice)
+        if metadatos is not None:
+            metadatos.update(vuelo.metadatos, segundos_hash=0.0)
+        return ok
+    try:
+        vuelo.ok = _descargar_con_cache(url, ruta_destino_descarga, sha256_esperado, vuelo.metadatos, cancelar)
+    finally:
+        with _vuelos_lock:
+            del _vuelos_en_curso[url]
+        vuelo.hecho.set()
+    if metadatos is not None:
+        metadatos.update(vuelo.metadatos)
+    return vuelo.ok
+
+# --- EJECUCIÓN SUPERVISADA DE INSTALADORES ---
+# Con SUPERVISION_ACTIVA se espera a cada instalador (los silenciosos /S, /VERYSILENT vuelven al instante
+# si no) y su código de salida se clasifica con la tabla de la app ("codigos_salida": {3010: "reinicio"})
+# sobre CODIGOS_SALIDA_POR_DEFECTO; cualquier otro código distinto de 0 es fatal. Un vigilante mata el
+# instalador si pasa "timeout_instalacion" o si, con psutil instalado, su árbol de procesos no gasta CPU
+# ni hace E/S durante INSTALADOR_INACTIVIDAD. Los reintentables y los colgados se repiten con espera
+# exponencial hasta "reintentos" veces.
+SUPERVISION_ACTIVA = True
+INSTALADOR_TIMEOUT = 30 * 60
+INSTALADOR_INACTIVIDAD = 5 * 60
+INSTALADOR_SONDEO = 1.0
+INSTALADOR_REINTENTOS = 2
+INSTALADOR_ESPERA_REINTENTO = 5
+INSTALADOR_ESPERA_MAX = 60
+
+SALIDA_OK = "ok"
+SALIDA_REINICIO = "reinicio"
+SALIDA_REINTENTABLE = "reintentable"
+SALIDA_FATAL = "fatal"
 
-def instalar_exe(ruta_exe_a_instalar, args=None, wait_for_completion=False, timeout=None):
+CODIGOS_SALIDA_POR_DEFECTO = {
+    0: SALIDA_OK,
+    3010: SALIDA_REINICIO,      # MSI: ERROR_SUCCESS_REBOOT_REQUIRED
+    1641: SALIDA_REINICIO,      # MSI: el instalador ha iniciado el reinicio
+    1618: SALIDA_REINTENTABLE,  # MSI: ERROR_INSTALL_ALREADY_RUNNING (otra instalación en curso)
+}
+
+PSUTIL_DISPONIBLE = importlib.util.find_spec("psutil") is not None
+
+# Salida de los instaladores: stdout y stderr van por una misma tubería (conserva el orden entre ambas)
+# que lee un hilo propio y vuelca a REGISTROS_DIR/<app>.log, rotando a .1, .2... al pasar de
+# REGISTRO_TAM_MAX. El hilo de la tarea solo espera al proceso; nunca lee ni escribe la salida.
+REGISTRO_TAM_MAX = 1024 * 1024
+REGISTRO_COPIAS = 3
+REGISTRO_BLOQUE = 64 * 1024
+REGISTRO_ESPERA_CIERRE = 5  # Un nieto que herede la tubería puede mantenerla abierta tras salir el padre
+SIN_VENTANA_CONSOLA = getattr(subprocess, "CREATE_NO_WINDOW", 0)  # Windows: sin consolas emergentes
+
+class RegistroRotativo:
+    def __init__(self, ruta, tam_max=REGISTRO_TAM_MAX, copias=REGISTRO_COPIAS):
+        self.ruta = ruta
+        self.tam_max = tam_max
+        self.copias = copias
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self._f = open(ruta, "ab")
+        self._tam = self._f.tell()
+
+    def _rotar(self):
+        self._f.close()
+        for i in range(self.copias - 1, 0, -1):
+            if os.path.exists(f"{self.ruta}.{i}"):
+                os.replace(f"{self.ruta}.{i}", f"{self.ruta}.{i + 1}")
+        if self.copias:
+            os.replace(self.ruta, f"{self.ruta}.1")
+        else:
+            os.remove(self.ruta)
+        self._f = open(self.ruta, "wb")
+        self._tam = 0
+
+    def escribir(self, datos):
+        with self._lock:
+            while datos:
+                if self._tam >= self.tam_max:
+                    self._rotar()
+                trozo = datos[:self.tam_max - self._tam]
+                self._f.write(trozo)
+                self._tam += len(trozo)
+                datos = datos[len(trozo):]
+
+    def cerrar(self):
+        with self._lock:
+            self._f.close()
+
+def _nombre_registro(ruta_exe):
+    nombre = tarea_actual() or os.path.splitext(os.path.basename(ruta_exe))[0]
+    return re.sub(r"[^\w.-]+", "_", nombre) + ".log"
+
+def _volcar_salida(tuberia, registro, cerrar_registro):
+    # Hilo lector: read1 devuelve lo que haya en cuanto llega, sin esperar a llenar el bloque
+    try:
+        while True:
+            datos = tuberia.read1(REGISTRO_BLOQUE)
+            if not datos:
+                break
+            registro.escribir(datos)
+    except (OSError, ValueError):
+        pass  # Tubería o registro cerrados (proceso matado, o ya no se espera su salida)
+    finally:
+        tuberia.close()
+        if cerrar_registro:
+            registro.cerrar()
+
+def _lanzar_con_registro(comando, cwd, registro, cerrar_registro=False):
+    # Con cerrar_registro el lector se queda el registro y lo cierra al acabar la salida
+    process = subprocess.Popen(comando, cwd=cwd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, creationflags=SIN_VENTANA_CONSOLA)
+    lector = threading.Thread(target=_volcar_salida, args=(process.stdout, registro, cerrar_registro),
+                              name=f"salida-{process.pid}", daemon=True)
+    lector.start()
+    return process, lector
+
+def clasificar_codigo_salida(codigo, tabla=None):
+    if tabla and codigo in tabla:
+        return tabla[codigo]
+    return CODIGOS_SALIDA_POR_DEFECTO.get(codigo, SALIDA_FATAL)
+
+def _actividad_arbol(proceso_ps):
+    # CPU acumulada + bytes de E/S del proceso y sus hijos (Ninite y compañía lanzan subprocesos)
+    total = 0.0
+    try:
+        procesos = [proceso_ps] + proceso_ps.children(recursive=True)
+    except Exception:
+        procesos = [proceso_ps]
+    for p in procesos:
+        try:
+            cpu = p.cpu_times()
+            total += cpu.user + cpu.system
+            io = p.io_counters()
+            total += io.read_bytes + io.write_bytes
+        except Exception:
+            pass  # Proceso ya terminado o sin permisos / io_counters no soportado
+    return total
+
+def _matar_arbol(process):
+    if PSUTIL_DISPONIBLE:
+        import psutil
+        try:
+            for hijo in psutil.Process(process.pid).children(recursive=True):
+                hijo.kill()
+        except psutil.Error:
+            pass
+    process.kill()
+    process.wait()
+
+def _esperar_vigilado(process, timeout, inactividad):
+    # Devuelve el código de salida, o None si hubo que matarlo (colgado o fuera de plazo).
+    # process.wait(timeout=...) hace de pausa entre sondeos y vuelve en cuanto el proceso termina.
+    limite = time.monotonic() + timeout
+    proceso_ps = None
+    if PSUTIL_DISPONIBLE:
+        import psutil
+        try:
+            proceso_ps = psutil.Process(process.pid)
+        except psutil.Error:
+            pass
+    ultima_actividad, ultimo_cambio = None, time.monotonic()
+    while True:
+        try:
+            return process.wait(timeout=max(0.0, min(INSTALADOR_SONDEO, limite - time.monotonic())))
+        except subprocess.TimeoutExpired:
+            pass
+        ahora = time.monotonic()
+        if ahora >= limite:
+            log.warning(f"Instalador fuera de plazo ({timeout} s). Se detiene.")
+            break
+        if proceso_ps is not None:
+            actividad = _actividad_arbol(proceso_ps)
+            if actividad != ultima_actividad:
+                ultima_actividad, ultimo_cambio = actividad, ahora
+            elif ahora - ultimo_cambio >= inactividad:
+                log.warning(f"Instalador sin actividad de CPU ni E/S durante {inactividad} s. Se detiene.")
+                break
+    _matar_arbol(process)
+    return None
+
+def instalar_exe(ruta_exe_a_instalar, args=None, wait_for_completion=None, timeout=None,
+                 codigos_salida=None, reintentos=None):
+    # wait_for_completion=None sigue SUPERVISION_ACTIVA. Esperando, devuelve True si el instalador
+    # terminó bien (o pide reinicio: queda en _contexto_hilo.reinicio) y False si falló del todo.
     if not os.path.exists(ruta_exe_a_instalar):
         ruta_normalizada = os.path.normpath(ruta_exe_a_instalar)
-        messagebox.showerror("Error de Instalación", f"Archivo instalador no encontrado:\n{ruta_normalizada}")
-        print(f"DEBUG: Archivo no encontrado en instalar_exe: {ruta_normalizada}")
+        mostrar_error("Error de Instalación", f"Archivo instalador no encontrado:\n{ruta_normalizada}")
+        log.error(f"Archivo no encontrado en instalar_exe: {ruta_normalizada}")
         return False
+    if wait_for_completion is None:
+        wait_for_completion = SUPERVISION_ACTIVA
+    nombre_exe = os.path.basename(ruta_exe_a_instalar)
+    # Los .msi no son ejecutables: los lanza msiexec (sus códigos de salida son los de la tabla por defecto)
+    comando = ["msiexec", "/i", ruta_exe_a_instalar] if ruta_exe_a_instalar.lower().endswith(".msi") else [ruta_exe_a_instalar]
+    if args:
+        comando.extend(args)
+    intentos = 1 + (INSTALADOR_REINTENTOS if reintentos is None else reintentos)
+    registro = RegistroRotativo(os.path.join(REGISTROS_DIR, _nombre_registro(ruta_exe_a_instalar)))
+    if not wait_for_completion:
+        try:
+            log.info(f"Ejecutando instalador: {comando}", extra={"exe": nombre_exe})
+            with tramo("lanzamiento", exe=nombre_exe):
+                _lanzar_con_registro(comando, os.path.dirname(ruta_exe_a_instalar) or '.', registro, cerrar_registro=True)
+            return True
+        except Exception as e:
+            registro.cerrar()
+            mostrar_error("Error de Instalación", f"No se pudo ejecutar {nombre_exe}:\n{e}")
+            log.error(f"Error al ejecutar instalador {ruta_exe_a_instalar}: {e}")
+            return False
     try:
-        comando = [ruta_exe_a_instalar]
-        if args:
-            comando.extend(args)
-        print(f"DEBUG: Ejecutando instalador: {comando}")
-        
-        if wait_for_completion:
-            process = subprocess.Popen(comando, cwd=os.path.dirname(ruta_exe_a_instalar) or '.')
+        return _instalar_supervisado(ruta_exe_a_instalar, comando, registro, intentos, timeout, codigos_salida)
+    finally:
+        registro.cerrar()
+
+def _instalar_supervisado(ruta_exe_a_instalar, comando, registro, intentos, timeout, codigos_salida):
+    nombre_exe = os.path.basename(ruta_exe_a_instalar)
+    for intento in range(1, intentos + 1):
+        _contexto_hilo.intento = intento
+        try:
+            log.info(f"Ejecutando instalador: {comando} (intento {intento}/{intentos})", extra={"exe": nombre_exe})
+            registro.escribir(f"\n=== {time.strftime('%Y-%m-%d %H:%M:%S')} intento {intento}: {comando} ===\n".encode("utf-8"))
+            with tramo("lanzamiento", exe=nombre_exe, intento=intento):
+                process, lector = _lanzar_con_registro(comando, os.path.dirname(ruta_exe_a_instalar) or '.', registro)
+        except Exception as e:
+            mostrar_error("Error de Instalación", f"No se pudo ejecutar {nombre_exe}:\n{e}")
+            log.error(f"Error al ejecutar instalador {ruta_exe_a_instalar}: {e}")
+            return False
+        with tramo("espera", exe=nombre_exe, intento=intento):
+            codigo = _esperar_vigilado(process, timeout or INSTALADOR_TIMEOUT, INSTALADOR_INACTIVIDAD)
+        lector.join(REGISTRO_ESPERA_CIERRE)
+        registro.escribir(f"=== código de salida: {codigo} ===\n".encode("utf-8"))
+        clase = SALIDA_REINTENTABLE if codigo is None else clasificar_codigo_salida(codigo, codigos_salida)
+        _contexto_hilo.codigo_salida = codigo  # Lo recoge el diario de ejecución
+        log.info(f"Proceso {nombre_exe} terminado con código de salida {codigo} ({clase})",
+                 extra={"exe": nombre_exe, "codigo_salida": codigo, "clase": clase})
+        if clase in (SALIDA_OK, SALIDA_REINICIO):
+            _contexto_hilo.reinicio = clase == SALIDA_REINICIO
+            return True
+        if clase == SALIDA_FATAL or intento == intentos:
+            log.warning(f"El instalador {nombre_exe} falló (código {codigo}, {clase}).",
+                        extra={"exe": nombre_exe, "codigo_salida": codigo, "clase": clase})
+            return False
+        espera = min(INSTALADOR_ESPERA_REINTENTO * 2 ** (intento - 1), INSTALADOR_ESPERA_MAX)
+        publicar_progreso(texto_status=f"{nombre_exe}: código {codigo}, reintento en {espera:.0f} s...")
+        time.sleep(espera)
+    return False
+
+# --- COPIA DE ARCHIVOS ---
+# Copia por bloques con aviso de progreso por bytes. Donde el sistema lo permite, los datos no pasan
+# por Python: os.copy_file_range (Linux; en el mismo sistema de ficheros puede no copiar nada físico)
+# y si no os.sendfile. Si ninguna sirve (Windows, otro sistema de ficheros...) se lee con readinto en
+# un bytearray de COPIA_BLOQUE que cada hilo reutiliza entre copias. Los metadatos se copian como
+# en shutil.copy2 y el destino aparece de golpe al final (se escribe en un .parcial y se renombra).
+COPIA_BLOQUE = 8 * 1024 * 1024
+COPIA_RAPIDA = True
+_ERRORES_SIN_COPIA_RAPIDA = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP,
+                             errno.ENOTSOCK, errno.EBADF, errno.EPERM}
+
+_buferes_copia = threading.local()
+
+def _bufer_copia():
+    bufer = getattr(_buferes_copia, "bufer", None)
+    if bufer is None or len(bufer) != COPIA_BLOQUE:
+        bufer = _buferes_copia.bufer = bytearray(COPIA_BLOQUE)
+    return bufer
+
+def _copiar_con_llamada(llamada, f_origen, f_destino, tam, progreso):
+    # Devuelve los bytes copiados (menos que tam si la llamada deja de avanzar), o None si la llamada
+    # no sirve para este par de archivos
+    copiado = 0
+    while copiado < tam:
+        try:
+            n = llamada(f_origen.fileno(), f_destino.fileno(), min(COPIA_BLOQUE, tam - copiado), copiado)
+        except OSError as e:
+            if copiado == 0 and e.errno in _ERRORES_SIN_COPIA_RAPIDA:
+                return None
+            raise
+        if not n:
+            # Algunos sistemas de ficheros devuelven 0 en vez de un error: sin nada copiado se prueba
+            # la siguiente forma; a medias, copiar_archivo sigue por bloques desde aquí
+            return None if copiado == 0 else copiado
+        copiado += n
+        if progreso:
+            progreso.sumar(n)
+    return copiado
+
+def _llamadas_rapidas():
+    llamadas = []
+    if hasattr(os, "copy_file_range"):
+        # Desplazamiento explícito en el origen; el del destino avanza solo
+        llamadas.append(lambda origen, destino, n, desde: os.copy_file_range(origen, destino, n, desde))
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        llamadas.append(lambda origen, destino, n, desde: os.sendfile(destino, origen, desde, n))
+    return llamadas
+
+def _copiar_por_bloques(f_origen, f_destino, progreso):
+    bloque = _bufer_copia()
+    vista = memoryview(bloque)
+    copiado = 0
+    while True:
+        n = f_origen.readinto(bloque)
+        if not n:
+            return copiado
+        escrito = 0
+        while escrito < n:  # Un write sin búfer puede escribir menos de lo pedido
+            escrito += f_destino.write(vista[escrito:n])
+        copiado += n
+        if progreso:
+            progreso.sumar(n)
+
+def copiar_archivo(origen, destino, progreso=None):
+    # Copia origen en destino con sus metadatos y devuelve los bytes copiados. progreso (p. ej. un
+    # _ProgresoDescarga) recibe sumar(n) tras cada bloque.
+    parcial = destino + ".parcial"
+    try:
+        with open(origen, 'rb', buffering=0) as f_origen, open(parcial, 'wb', buffering=0) as f_destino:
+            tam = os.fstat(f_origen.fileno()).st_size
+            copiado = None
+            if COPIA_RAPIDA and tam:
+                for llamada in _llamadas_rapidas():
+                    copiado = _copiar_con_llamada(llamada, f_origen, f_destino, tam, progreso)
+                    if copiado is not None:
+                        break
+            if copiado is None:
+                copiado = _copiar_por_bloques(f_origen, f_destino, progreso)
+            elif copiado < tam:
+                f_origen.seek(copiado)  # Las llamadas no mueven la posición del origen; la del destino sí
+                copiado += _copiar_por_bloques(f_origen, f_destino, progreso)
+        if copiado != tam:
+            raise OSError(f"Copia incompleta de '{origen}': {copiado} de {tam} bytes")
+        shutil.copystat(origen, parcial)
+        os.replace(parcial, destino)
+    except BaseException:
+        try:
+            os.remove(parcial)
+        except OSError:
+            pass
+        raise
+    return copiado
+
+# Copia a varios destinos (varios perfiles, una carpeta de respaldo, varias memorias USB a la vez):
+# cada bloque del origen se lee una sola vez y lo escriben todos los destinos, uno por hilo. Solo hay
+# COPIA_MULTIPLE_BUFERES bloques en vuelo: cuando el destino más lento aún no ha escrito el más
+# antiguo, el lector espera. El tiempo total es el del destino más lento, no la suma de todos.
+COPIA_MULTIPLE_BUFERES = 4
+
+def copiar_a_varios(origen, destinos, progreso=None):
+    # Devuelve {destino: None si se copió, o la excepción}. Un destino que falla no frena a los demás.
+    # progreso.sumar(n) llega cuando todos los destinos han escrito el bloque.
+    libres = queue.Queue()
+    for _ in range(COPIA_MULTIPLE_BUFERES):
+        libres.put(bytearray(COPIA_BLOQUE))
+    pendientes = {}
+    lock = threading.Lock()
+    errores = dict.fromkeys(destinos)
+
+    def liberar(bufer, n):
+        with lock:
+            pendientes[id(bufer)] -= 1
+            ultimo = pendientes[id(bufer)] == 0
+        if ultimo:
+            libres.put(bufer)
+            if progreso:
+                progreso.sumar(n)
+
+    def escribir(destino, cola):
+        parcial = destino + ".parcial"
+        f_destino = None
+        try:
+            f_destino = open(parcial, 'wb', buffering=0)
+        except OSError as e:
+            errores[destino] = e
+        while True:
+            elemento = cola.get()
+            if elemento is None:
+                break
+            bufer, n = elemento
+            if errores[destino] is None:
+                try:
+                    vista = memoryview(bufer)
+                    escrito = 0
+                    while escrito < n:
+                        escrito += f_destino.write(vista[escrito:n])
+                except OSError as e:
+                    errores[destino] = e
+            liberar(bufer, n)  # Aunque este destino haya fallado, el bloque no puede quedar retenido
+        try:
+            if f_destino:
+                f_destino.close()
+            if errores[destino] is None:
+                shutil.copystat(origen, parcial)
+                os.replace(parcial, destino)
+        except OSError as e:
+            errores[destino] = e
+        if errores[destino] is not None and f_destino:
             try:
-                process.wait(timeout=timeout) 
-                print(f"DEBUG: Proceso {os.path.basename(ruta_exe_a_instalar)} terminado con código de salida: {process.returncode}")
-                if process.returncode != 0:
-                    print(f"ADVERTENCIA: El instalador {os.path.basename(ruta_exe_a_instalar)} terminó con un código de error: {process.returncode}")
-            except subprocess.TimeoutExpired:
-                print(f"ADVERTENCIA: Timeout esperando a {os.path.basename(ruta_exe_a_instalar)}. El proceso puede seguir en segundo plano.")
-                return False 
-        else:
-            subprocess.Popen(comando, cwd=os.path.dirname(ruta_exe_a_instalar) or '.')
-        return True
-    except Exception as e:
-        messagebox.showerror("Error de Instalación", f"No se pudo ejecutar {os.path.basename(ruta_exe_a_instalar)}:\n{e}")
-        print(f"DEBUG: Error al ejecutar instalador {ruta_exe_a_instalar}: {e}")
-        return False
+                os.remove(parcial)
+            except OSError:
+                pass
+
+    colas = [queue.Queue() for _ in destinos]  # Acotadas de hecho por los búferes libres
+    hilos = [threading.Thread(target=escribir, args=(destino, cola), name=f"copia-destino-{i}", daemon=True)
+             for i, (destino, cola) in enumerate(zip(destinos, colas))]
+    for hilo in hilos:
+        hilo.start()
+    try:
+        with open(origen, 'rb', buffering=0) as f_origen:
+            while True:
+                bufer = libres.get()  # Aquí se frena el lector si el destino más lento va atrasado
+                n = f_origen.readinto(bufer)
+                if not n:
+                    break
+                with lock:
+                    pendientes[id(bufer)] = len(destinos)
+                for cola in colas:
+                    cola.put((bufer, n))
+    except OSError as e:
+        for destino in destinos:
+            errores[destino] = errores[destino] or e
+    finally:
+        for cola in colas:
+            cola.put(None)
+        for hilo in hilos:
+            hilo.join()
+    return errores
+
+DESTINOS_COPIA_EXTRA = []  # Carpetas que reciben también cada copia de "copiar_exe" (--copiar-tambien-a)
+
+def destinos_de_copia(app_config_detalle):
+    # "destinos" en la config (con %VARIABLES%) o DOCUMENTOS_DIR, más DESTINOS_COPIA_EXTRA
+    destinos = [expandir_ruta(d) for d in app_config_detalle.get("destinos", [])] or [DOCUMENTOS_DIR]
+    return destinos + [d for d in DESTINOS_COPIA_EXTRA if d not in destinos]
 
-def copiar_a_documentos(ruta_origen_del_exe, nombre_destino_del_exe):
+def copiar_a_documentos(ruta_origen_del_exe, nombre_destino_del_exe, destinos=None):
     if not os.path.exists(ruta_origen_del_exe):
         ruta_normalizada = os.path.normpath(ruta_origen_del_exe)
-        messagebox.showerror("Error al Copiar", f"Archivo de origen no encontrado:\n{ruta_normalizada}")
+        mostrar_error("Error al Copiar", f"Archivo de origen no encontrado:\n{ruta_normalizada}")
         return False
-    ruta_destino_final = os.path.join(DOCUMENTOS_DIR, nombre_destino_del_exe)
+    destinos = destinos or [DOCUMENTOS_DIR]
+    rutas_destino = [os.path.join(carpeta, nombre_destino_del_exe) for carpeta in destinos]
     try:
-        shutil.copy2(ruta_origen_del_exe, ruta_destino_final)
-        return True
+        tam = os.path.getsize(ruta_origen_del_exe)
+        for carpeta in destinos:
+            os.makedirs(carpeta, exist_ok=True)
+        with tramo("copia", bytes=tam, destinos=len(rutas_destino)):
+            if len(rutas_destino) == 1:
+                copiar_archivo(ruta_origen_del_exe, rutas_destino[0], _ProgresoDescarga(tam))
+                return True
+            errores = copiar_a_varios(ruta_origen_del_exe, rutas_destino, _ProgresoDescarga(tam))
     except Exception as e:
-        messagebox.showerror("Error al Copiar", f"No se pudo copiar {nombre_destino_del_exe} a Documentos:\n{e}")
+        mostrar_error("Error al Copiar", f"No se pudo copiar {nombre_destino_del_exe} a Documentos:\n{e}")
         return False
+    fallidos = {ruta: e for ruta, e in errores.items() if e is not None}
+    if fallidos:
+        mostrar_error("Error al Copiar", f"No se pudo copiar {nombre_destino_del_exe} a:\n" +
+                      "\n".join(f"{os.path.dirname(ruta)}: {e}" for ruta, e in fallidos.items()))
+    return not fallidos
+
+AUTOLOGON_TIMEOUT_VENTANA = 10
+AUTOLOGON_INTERVALO = 0.05
 
 def configurar_autologon_gui_con_pywinauto(ruta_autologon_exe, username, domain, password, root_gui_for_update):
     if not PYWINAUTO_AVAILABLE:
         error_msg = "pywinauto no disponible para Autologon."
-        root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status=error_msg, valor_barra=0))
-        root_gui_for_update.after(0, lambda: messagebox.showerror("Dependencia", error_msg))
+        publicar_progreso(texto_status=error_msg, valor_barra=0)
+        mostrar_error("Dependencia", error_msg, root_gui_for_update)
         return False
     if not os.path.exists(ruta_autologon_exe):
         error_msg = f"Autologon no encontrado: {ruta_autologon_exe}"
-        root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status=error_msg, valor_barra=0))
-        root_gui_for_update.after(0, lambda: messagebox.showerror("No Encontrado", error_msg))
+        publicar_progreso(texto_status=error_msg, valor_barra=0)
+        mostrar_error("No Encontrado", error_msg, root_gui_for_update)
         return False
+    from pywinauto.application import Application, ProcessNotFoundError
+    from pywinauto.findwindows import ElementNotFoundError, WindowNotFoundError
+    from pywinauto.timings import TimeoutError as PywinautoTimeoutError
     app = None 
-    try:
-        root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status="Iniciando Autologon...", valor_barra=10))
-        app = Application(backend="uia").start(ruta_autologon_exe)
-        dlg = None
-        for _ in range(10): 
-            try:
-                dlg = app.window(title_re="^Autologon.*") 
-                if dlg.exists() and dlg.is_visible(): break
-            except (WindowNotFoundError, ElementNotFoundError, ProcessNotFoundError): time.sleep(0.5)
-        if not dlg or not dlg.exists(): raise WindowNotFoundError("Ventana Autologon no encontrada.")
-        dlg.wait('visible', timeout=10) 
-        root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status="Autologon detectado.", valor_barra=30))
-        edit_controls = dlg.children(control_type="Edit")
-        if len(edit_controls) < 3: raise Exception(f"Autologon: campos de edición insuficientes ({len(edit_controls)}).")
-        root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status="Rellenando campos...", valor_barra=50))
-        edit_controls[0].set_edit_text(username); edit_controls[1].set_edit_text(domain); edit_controls[2].set_edit_text(password)
-        time.sleep(0.2)
-        root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status="Habilitando Autologon...", valor_barra=70))
-        dlg.child_window(title="Enable", control_type="Button").click_input()
+    with tramo("automatización UI", exe=os.path.basename(ruta_autologon_exe)):
         try:
-            dlg.wait_not('visible', timeout=5) 
-            root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status="Autologon configurado.", valor_barra=100, texto_porcentaje="Hecho ✓"))
-            return True
-        except PywinautoTimeoutError: 
-            if dlg.exists() and dlg.is_visible():
-                 messagebox.showwarning("Autologon", "Ventana Autologon no se cerró. Verificar.")
-                 root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status="Autologon: verificar.", valor_barra=90))
-                 return False
-            else: 
-                 root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status="Autologon configurado (aviso).", valor_barra=100, texto_porcentaje="Hecho ✓"))
-                 return True
-    except Exception as e:
-        error_msg = f"Error Autologon (pywinauto): {e}"
-        root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status=error_msg, valor_barra=0))
-        root_gui_for_update.after(0, lambda: messagebox.showerror("Error Autologon", error_msg))
-        return False
+            publicar_progreso(texto_status="Iniciando Autologon...", valor_barra=10)
+            app = Application(backend="uia").start(ruta_autologon_exe)
+            dlg = app.window(title_re="^Autologon.*")
+            try:
+                # Espera condicionada con plazo: vuelve en cuanto la ventana aparece
+                dlg.wait('exists visible', timeout=AUTOLOGON_TIMEOUT_VENTANA, retry_interval=AUTOLOGON_INTERVALO)
+            except (PywinautoTimeoutError, ElementNotFoundError, ProcessNotFoundError):
+                raise WindowNotFoundError("Ventana Autologon no encontrada.")
+            publicar_progreso(texto_status="Autologon detectado.", valor_barra=30)
+            edit_controls = dlg.children(control_type="Edit")
+            if len(edit_controls) < 3: raise Exception(f"Autologon: campos de edición insuficientes ({len(edit_controls)}).")
+            publicar_progreso(texto_status="Rellenando campos...", valor_barra=50)
+            edit_controls[0].set_edit_text(username); edit_controls[1].set_edit_text(domain); edit_controls[2].set_edit_text(password)
+            publicar_progreso(texto_status="Habilitando Autologon...", valor_barra=70)
+            boton_enable = dlg.child_window(title="Enable", control_type="Button")
+            boton_enable.wait('enabled', timeout=AUTOLOGON_TIMEOUT_VENTANA, retry_interval=AUTOLOGON_INTERVALO)
+            boton_enable.click_input()
+            try:
+                dlg.wait_not('visible', timeout=5, retry_interval=AUTOLOGON_INTERVALO) 
+                publicar_progreso(texto_status="Autologon configurado.", valor_barra=100, texto_porcentaje="Hecho ✓")
+                return True
+            except PywinautoTimeoutError: 
+                if dlg.exists() and dlg.is_visible():
+                     mostrar_advertencia("Autologon", "Ventana Autologon no se cerró. Verificar.")
+                     publicar_progreso(texto_status="Autologon: verificar.", valor_barra=90)
+                     return False
+                else: 
+                     publicar_progreso(texto_status="Autologon configurado (aviso).", valor_barra=100, texto_porcentaje="Hecho ✓")
+                     return True
+        except Exception as e:
+            error_msg = f"Error Autologon (pywinauto): {e}"
+            publicar_progreso(texto_status=error_msg, valor_barra=0)
+            mostrar_error("Error Autologon", error_msg, root_gui_for_update)
+            return False
 
 def instalar_manual_asistido_app(nombre_app, ruta_exe, mensaje_al_usuario, root_gui_for_update):
-    root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status=f"Preparando {nombre_app} (manual)...", valor_barra=10))
+    publicar_progreso(texto_status=f"Preparando {nombre_app} (manual)...", valor_barra=10)
     if not os.path.exists(ruta_exe):
         error_msg = f"Instalador {nombre_app} no encontrado: {ruta_exe}"
-        root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status=error_msg, valor_barra=0, texto_porcentaje="Error X"))
-        root_gui_for_update.after(0, lambda: messagebox.showerror("No Encontrado", error_msg))
+        publicar_progreso(texto_status=error_msg, valor_barra=0, texto_porcentaje="Error X")
+        mostrar_error("No Encontrado", error_msg, root_gui_for_update)
         return False
     try:
         subprocess.Popen([ruta_exe], cwd=os.path.dirname(ruta_exe) or '.')
-        root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status=f"Instalador {nombre_app} lanzado. Esperando...", valor_barra=50))
+        publicar_progreso(texto_status=f"Instalador {nombre_app} lanzado. Esperando...", valor_barra=50)
     except Exception as e:
         error_msg_launch = f"No se pudo lanzar {nombre_app}: {e}"
-        root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status=error_msg_launch, valor_barra=0, texto_porcentaje="Error X"))
-        root_gui_for_update.after(0, lambda: messagebox.showerror("Error Lanzamiento", error_msg_launch))
+        publicar_progreso(texto_status=error_msg_launch, valor_barra=0, texto_porcentaje="Error X")
+        mostrar_error("Error Lanzamiento", error_msg_launch, root_gui_for_update)
         return False
     
-    progress_was_grabbed = False
-    if progress_window and progress_window.winfo_exists() and progress_window.grab_status():
-        progress_window.grab_release()
-        progress_was_grabbed = True
-
-    confirmed = messagebox.askokcancel(f"Instalación Manual: {nombre_app}", mensaje_al_usuario)
+    progress_was_grabbed = []
+    def soltar_grab():
+        if progress_window and progress_window.winfo_exists() and progress_window.grab_status():
+            progress_window.grab_release()
+            progress_was_grabbed.append(True)
+    def recuperar_grab():
+        if progress_was_grabbed and progress_window and progress_window.winfo_exists():
+            progress_window.grab_set()
 
-    if progress_was_grabbed and progress_window and progress_window.winfo_exists():
-        progress_window.grab_set()
+    confirmed = preguntar_ok_cancelar(f"Instalación Manual: {nombre_app}", mensaje_al_usuario,
+                                      root_gui_for_update, antes=soltar_grab, despues=recuperar_grab)
 
     if confirmed:
-        root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status=f"{nombre_app} confirmado por usuario.", valor_barra=100, texto_porcentaje="Hecho ✓"))
+        publicar_progreso(texto_status=f"{nombre_app} confirmado por usuario.", valor_barra=100, texto_porcentaje="Hecho ✓")
         return True
     else:
-        root_gui_for_update.after(0, lambda: actualizar_progreso_gui(texto_status=f"{nombre_app} cancelado.", valor_barra=0, texto_porcentaje="Cancelado X"))
+        publicar_progreso(texto_status=f"{nombre_app} cancelado.", valor_barra=0, texto_porcentaje="Cancelado X")
+        return False
+
+# --- PLANIFICADOR DE TAREAS ---
+# Campos opcionales de APLICACIONES_CONFIG que usa el planificador:
+#   "depends_on": ["Chrome"]   -> no arranca hasta que esas apps (si están seleccionadas) terminen bien
+#   "exclusive_group": "msi"   -> nunca corren a la vez dos apps del mismo grupo (p. ej. instaladores MSI)
+#   "priority": 10             -> entre las que están listas, arrancan antes las de mayor prioridad
+# Las tareas "instalar_manual_asistido" van siempre antes que el resto, como se hacía con NovaLCT.
+# Los instaladores MSI (.msi o "tipo_instalador": "msi") van sin más al grupo GRUPO_MSI: Windows Installer
+# solo admite una instalación a la vez y las demás fallan con 1618.
+# Autologon (clics con pywinauto) y las instalaciones manuales van al grupo GRUPO_INTERFAZ, el mismo que
+# deben usar los instaladores con ventana: así los clics no acaban en la ventana de otro instalador.
+MAX_TAREAS_PARALELAS = 4
+GRUPO_MSI = "msi"
+GRUPO_INTERFAZ = "interfaz"
+TIPOS_CON_INTERFAZ = ("configurar_autologon_gui", "instalar_manual_asistido")
+
+def _es_msi(detalle):
+    archivo = detalle.get("exe_filename") or detalle.get("nombre_archivo_descargado") or ""
+    return detalle.get("tipo_instalador") == "msi" or archivo.lower().endswith(".msi")
+
+TAREA_OK = "ok"
+TAREA_FALLO = "fallo"
+TAREA_CANCELADA = "cancelada"
+TAREA_OMITIDA = "omitida"
+TAREA_YA_INSTALADA = "ya_instalada"
+
+class PlanificadorTareas:
+    # Ejecuta un grafo de tareas en un pool acotado: cada tarea arranca cuando sus dependencias han
+    # terminado bien, sin superar max_paralelas ni solapar dos tareas del mismo grupo exclusivo.
+    # Si una dependencia falla, sus dependientes se omiten.
+    def __init__(self, tareas, dependencias=None, grupos=None, prioridades=None, max_paralelas=MAX_TAREAS_PARALELAS):
+        self.tareas = list(tareas)  # El orden de selección desempata prioridades iguales
+        dependencias = dependencias or {}
+        self.dependencias = {t: set(dependencias.get(t, ())) & set(self.tareas) - {t} for t in self.tareas}
+        self.grupos = grupos or {}
+        self.prioridades = prioridades or {}
+        self.max_paralelas = max(1, max_paralelas)
+        self._cond = threading.Condition()
+        self._cancelado = False
+        self._comprobar_ciclos()
+
+    @classmethod
+    def desde_config(cls, apps, config, max_paralelas=MAX_TAREAS_PARALELAS):
+        manuales = [app for app in apps if config[app]["tipo"] == "instalar_manual_asistido"]
+        dependencias, grupos, prioridades = {}, {}, {}
+        for app in apps:
+            detalle = config[app]
+            dependencias[app] = set(detalle.get("depends_on", []))
+            if app not in manuales:
+                dependencias[app].update(manuales)
+            if detalle.get("exclusive_group"):
+                grupos[app] = detalle["exclusive_group"]
+            elif detalle["tipo"] in TIPOS_CON_INTERFAZ:
+                grupos[app] = GRUPO_INTERFAZ
+            elif _es_msi(detalle):
+                grupos[app] = GRUPO_MSI
+            prioridades[app] = detalle.get("priority", 0)
+        return cls(apps, dependencias, grupos, prioridades, max_paralelas)
+
+    def _comprobar_ciclos(self):
+        restantes = {t: set(deps) for t, deps in self.dependencias.items()}
+        while restantes:
+            sin_deps = [t for t, deps in restantes.items() if not deps]
+            if not sin_deps:
+                raise ValueError(f"Dependencias circulares entre: {', '.join(sorted(restantes))}")
+            for t in sin_deps:
+                del restantes[t]
+            for deps in restantes.values():
+                deps.difference_update(sin_deps)
+
+    def orden_previsto(self):
+        # Orden topológico que seguiría el planificador con una sola tarea a la vez; el
+        # preparador lo usa para saber qué adelantar
+        restantes = {t: set(deps) for t, deps in self.dependencias.items()}
+        orden_seleccion = {t: i for i, t in enumerate(self.tareas)}
+        orden = []
+        while restantes:
+            listas = [t for t, deps in restantes.items() if not deps]
+            siguiente = min(listas, key=lambda t: (-self.prioridades.get(t, 0), orden_seleccion[t]))
+            orden.append(siguiente)
+            del restantes[siguiente]
+            for deps in restantes.values():
+                deps.discard(siguiente)
+        return orden
+
+    def cancelar(self):
+        # Las tareas en curso terminan; las pendientes ya no arrancan
+        with self._cond:
+            self._cancelado = True
+            self._cond.notify_all()
+
+    def ejecutar(self, funcion, al_omitir=None):
+        # funcion(tarea) devuelve TAREA_OK/TAREA_FALLO/TAREA_CANCELADA. Devuelve {tarea: resultado}.
+        # al_omitir(tarea) se llama con cada tarea que ya no se va a ejecutar.
+        resultados = {}
+        pendientes = list(self.tareas)
+        en_curso = set()
+        grupos_ocupados = set()
+        orden = {t: i for i, t in enumerate(self.tareas)}
+
+        def lanzar(tarea):
+            try:
+                resultado = funcion(tarea)
+            except Exception as e:
+                log.error(f"Error inesperado en la tarea {tarea}: {e}", exc_info=True)
+                resultado = TAREA_FALLO
+            with self._cond:
+                resultados[tarea] = resultado
+                en_curso.discard(tarea)
+                grupos_ocupados.discard(self.grupos.get(tarea))
+                self._cond.notify_all()
+
+        with ThreadPoolExecutor(max_workers=self.max_paralelas, thread_name_prefix="tarea") as pool:
+            with self._cond:
+                while pendientes or en_curso:
+                    for tarea in list(pendientes):
+                        deps = self.dependencias[tarea]
+                        if self._cancelado or any(d in resultados and resultados[d] != TAREA_OK for d in deps):
+                            resultados[tarea] = TAREA_OMITIDA
+                            pendientes.remove(tarea)
+                            if al_omitir:
+                                al_omitir(tarea)
+                    listas = [t for t in pendientes if all(resultados.get(d) == TAREA_OK for d in self.dependencias[t])]
+                    listas.sort(key=lambda t: (-self.prioridades.get(t, 0), orden[t]))
+                    for tarea in listas:
+                        if len(en_curso) >= self.max_paralelas:
+                            break
+                        grupo = self.grupos.get(tarea)
+                        if grupo and grupo in grupos_ocupados:
+                            continue
+                        pendientes.remove(tarea)
+                        en_curso.add(tarea)
+                        if grupo:
+                            grupos_ocupados.add(grupo)
+                        pool.submit(lanzar, tarea)
+                    if en_curso:
+                        self._cond.wait()
+        return resultados
+
+# --- DETECCIÓN DE APPS INSTALADAS ---
+# "detectar" es una lista de sondas; la app se da por instalada si TODAS se cumplen. Tipos:
+#   {"tipo": "archivo", "ruta": "%ProgramFiles%/VLC/vlc.exe", "tam_min": 0}  -> el archivo existe
+#   {"tipo": "marcador"}  (o "ruta")  -> marcador que escribe esta herramienta al terminar bien la app
+#   {"tipo": "comando", "comando": [...], "esperado": "regex"}  -> el comando sale con 0 y su salida casa
+# Las rutas admiten %VARIABLES% y ~. Se pueden añadir tipos con @registrar_sonda("tipo").
+SONDEO_HILOS = 8
+SONDEO_TIMEOUT = 15
+
+SONDAS = {}
+
+def registrar_sonda(tipo):
+    def registrar(funcion):
+        SONDAS[tipo] = funcion
+        return funcion
+    return registrar
+
+def expandir_ruta(ruta):
+    # %VAR% como en Windows en cualquier plataforma (así se prueba en Linux con variables falsas)
+    ruta = re.sub(r"%([^%]+)%", lambda m: os.environ.get(m.group(1), m.group(0)), ruta)
+    return os.path.normpath(os.path.expanduser(ruta))
+
+def ruta_marcador(app_nombre_key):
+    return os.path.join(MARCADORES_DIR, f"{app_nombre_key}.instalada")
+
+@registrar_sonda("archivo")
+def _sonda_archivo(app_nombre_key, sonda):
+    ruta = expandir_ruta(sonda["ruta"])
+    return os.path.isfile(ruta) and os.path.getsize(ruta) >= sonda.get("tam_min", 0)
+
+@registrar_sonda("marcador")
+def _sonda_marcador(app_nombre_key, sonda):
+    return os.path.isfile(expandir_ruta(sonda["ruta"]) if sonda.get("ruta") else ruta_marcador(app_nombre_key))
+
+@registrar_sonda("comando")
+def _sonda_comando(app_nombre_key, sonda):
+    try:
+        proc = subprocess.run(sonda["comando"], capture_output=True, text=True, timeout=sonda.get("timeout", SONDEO_TIMEOUT))
+    except (OSError, subprocess.TimeoutExpired) as e:
+        log.debug(f"Sonda de {app_nombre_key} no ejecutable ({e})")
+        return False
+    if proc.returncode != 0:
+        return False
+    return not sonda.get("esperado") or re.search(sonda["esperado"], proc.stdout) is not None
+
+def esta_instalada(app_nombre_key):
+    sondas = APLICACIONES_CONFIG[app_nombre_key].get("detectar")
+    if not sondas:
+        return False
+    try:
+        return all(SONDAS[sonda["tipo"]](app_nombre_key, sonda) for sonda in sondas)
+    except Exception as e:
+        log.debug(f"Error sondeando {app_nombre_key}: {e}")
+        return False
+
+def sondear_instaladas(apps):
+    # Todas las sondas a la vez: lo que tarda el sondeo es lo que tarde la sonda más lenta
+    con_sondas = [app for app in apps if APLICACIONES_CONFIG[app].get("detectar")]
+    if not con_sondas:
+        return set()
+    with ThreadPoolExecutor(max_workers=min(SONDEO_HILOS, len(con_sondas)), thread_name_prefix="sonda") as pool:
+        return {app for app, instalada in zip(con_sondas, pool.map(esta_instalada, con_sondas)) if instalada}
+
+def marcar_instalada(app_nombre_key):
+    # Solo las apps que se detectan por marcador lo necesitan
+    sondas = APLICACIONES_CONFIG[app_nombre_key].get("detectar", [])
+    for sonda in sondas:
+        if sonda["tipo"] == "marcador":
+            ruta = expandir_ruta(sonda["ruta"]) if sonda.get("ruta") else ruta_marcador(app_nombre_key)
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            with open(ruta, "w", encoding="utf-8") as f:
+                f.write(time.strftime("%Y-%m-%d %H:%M:%S"))
+
+# --- COMPROBACIÓN PREVIA ---
+# Antes de ejecutar nada se comprueba toda la selección a la vez: que cada instalador local exista y
+# coincida con el manifiesto de PROGRAMAS_DIR (si lo hay), que cada URL responda al HEAD, que las
+# descargas quepan en DESCARGAS_DIR y que estén los módulos que necesita cada tipo de tarea. El
+# resultado es un único informe de adelante / no seguir, en vez de descubrir a mitad de ejecución
+# (con tareas ya hechas, o el paso manual de Novalct ya completado) que falta un instalador.
+COMPROBACION_HILOS = 16
+COMPROBACION_TIMEOUT = 5                            # Para el HEAD de cada URL
+COMPROBACION_MARGEN_DISCO = 512 * 1024 * 1024       # Libre que debe quedar en DESCARGAS_DIR tras descargar
+MANIFIESTO_NOMBRE = "manifiesto.json"               # En PROGRAMAS_DIR: {"archivos": {"App/setup.exe": {"tam", "mtime", "sha256"}}}
+MODULOS_POR_TIPO = {
+    "configurar_autologon_gui": ("pywinauto",),
+    "descargar_e_instalar": ("requests",),
+}
+
+COMPROBACION_OK = "ok"
+COMPROBACION_AVISO = "aviso"    # Se puede seguir (p. ej. URL caída pero el instalador está en caché)
+COMPROBACION_ERROR = "error"    # La tarea fallaría
+
+def ruta_manifiesto():
+    return os.path.join(PROGRAMAS_DIR, MANIFIESTO_NOMBRE)
+
+def leer_manifiesto():
+    # {ruta relativa con "/": entrada}, o None si PROGRAMAS_DIR no tiene manifiesto
+    try:
+        with open(ruta_manifiesto(), 'r', encoding='utf-8') as f:
+            return json.load(f).get("archivos", {})
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.warning(f"Manifiesto ilegible en '{ruta_manifiesto()}': {e}")
+        return None
+
+def sha256_archivo(ruta):
+    h = hashlib.sha256()
+    with open(ruta, 'rb', buffering=0) as f:
+        bloque = bytearray(HASH_BLOQUE)
+        vista = memoryview(bloque)
+        while True:
+            n = f.readinto(bloque)
+            if not n:
+                return h.hexdigest()
+            h.update(vista[:n])
+
+def _comprobar_contra_manifiesto(ruta, entrada, verificada=None):
+    # El hash solo se evita si este equipo ya lo leyó con el mismo tamaño y mtime (verificada: su entrada
+    # en el estado de verificar_manifiesto). El mtime del propio manifiesto no vale: copiar el paquete a
+    # un USB o a un recurso compartido lo conserva aunque la copia salga dañada.
+    st = os.stat(ruta)
+    if st.st_size != entrada.get("tam", st.st_size):
+        return COMPROBACION_ERROR, f"tamaño {st.st_size} distinto del manifiesto ({entrada['tam']})"
+    if not entrada.get("sha256") or \
+            (verificada and verificada["sha256"] == entrada["sha256"] and _sin_cambios(verificada, st)):
+        return COMPROBACION_OK, "coincide con el manifiesto"
+    if sha256_archivo(ruta) != entrada["sha256"]:
+        return COMPROBACION_ERROR, "SHA-256 distinto del manifiesto"
+    return COMPROBACION_OK, "coincide con el manifiesto (SHA-256 recalculado)"
+
+def _comprobar_app(app_nombre_key, manifiesto, verificados):
+    # Lista de (comprobación, estado, detalle) y bytes que descargará la tarea
+    config = APLICACIONES_CONFIG[app_nombre_key]
+    tipo = config["tipo"]
+    resultado = []
+    bytes_descarga = 0
+    for modulo in MODULOS_POR_TIPO.get(tipo, ()):
+        if importlib.util.find_spec(modulo) is None:
+            resultado.append(("módulo", COMPROBACION_ERROR, f"falta el módulo '{modulo}'"))
+    if tipo == "descargar_e_instalar":
+        if resultado:
+            return resultado, 0  # Sin requests no hay HEAD posible
+        url = config["url_descarga"]
+        info = sondear_descarga(url, timeout=COMPROBACION_TIMEOUT)
+        if info is not None:
+            bytes_descarga = info["total"]
+            resultado.append(("url", COMPROBACION_OK, f"{url} responde ({info['total']} bytes)"))
+        else:
+            with _cache_lock:
+                entrada = _leer_indice_cache()["urls"].get(url)
+            if entrada and os.path.exists(_ruta_objeto_cache(entrada["sha256"])):
+                resultado.append(("url", COMPROBACION_AVISO, f"{url} no responde; se usará la copia en caché"))
+            else:
+                resultado.append(("url", COMPROBACION_ERROR, f"{url} no responde y no hay copia en caché"))
+    elif "exe_filename" in config:
+        relativa = f"{app_nombre_key}/{config['exe_filename']}"
+        ruta = os.path.join(PROGRAMAS_DIR, app_nombre_key, config["exe_filename"])
+        if not os.path.isfile(ruta):
+            resultado.append(("instalador", COMPROBACION_ERROR, f"no encontrado: {os.path.normpath(ruta)}"))
+        elif manifiesto is None:
+            resultado.append(("instalador", COMPROBACION_OK, "existe (sin manifiesto)"))
+        elif relativa not in manifiesto:
+            resultado.append(("instalador", COMPROBACION_AVISO, "existe pero no figura en el manifiesto"))
+        else:
+            resultado.append(("instalador",) + _comprobar_contra_manifiesto(ruta, manifiesto[relativa], verificados.get(relativa)))
+    return resultado, bytes_descarga
+
+def comprobar_seleccion(apps):
+    # Devuelve {"ok", "segundos", "comprobaciones": [{"app", "comprobacion", "estado", "detalle"}]}.
+    # "ok" es False si alguna comprobación dio error.
+    t0 = time.perf_counter()
+    comprobaciones = []
+    locales = [a for a in apps if "exe_filename" in APLICACIONES_CONFIG[a]
+               and APLICACIONES_CONFIG[a]["tipo"] != "descargar_e_instalar"]
+    if locales and not os.path.isdir(PROGRAMAS_DIR):
+        comprobaciones.append({"app": None, "comprobacion": "programas", "estado": COMPROBACION_ERROR,
+                               "detalle": f"carpeta de programas no encontrada: '{PROGRAMAS_DIR}'"})
+    manifiesto = leer_manifiesto() if locales else None
+    verificados = _leer_estado_verificacion() if manifiesto else {}
+    with ThreadPoolExecutor(max_workers=COMPROBACION_HILOS, thread_name_prefix="comprobar") as pool:
+        por_app = list(pool.map(lambda app: _comprobar_app(app, manifiesto, verificados), apps))
+    for app, (resultado, _) in zip(apps, por_app):
+        comprobaciones.extend({"app": app, "comprobacion": c, "estado": e, "detalle": d} for c, e, d in resultado)
+    bytes_descarga = sum(b for _, b in por_app)
+    if any(APLICACIONES_CONFIG[a]["tipo"] == "descargar_e_instalar" for a in apps):
+        os.makedirs(DESCARGAS_DIR, exist_ok=True)
+        libre = shutil.disk_usage(DESCARGAS_DIR).free
+        if libre < bytes_descarga:
+            estado = COMPROBACION_ERROR
+        elif libre - bytes_descarga < COMPROBACION_MARGEN_DISCO:
+            estado = COMPROBACION_AVISO
+        else:
+            estado = COMPROBACION_OK
+        comprobaciones.append({"app": None, "comprobacion": "disco", "estado": estado,
+                               "detalle": f"{libre // (1024 * 1024)} MB libres en DESCARGAS_DIR, "
+                                          f"{bytes_descarga // (1024 * 1024)} MB a descargar"})
+    return {"ok": all(c["estado"] != COMPROBACION_ERROR for c in comprobaciones),
+            "segundos": round(time.perf_counter() - t0, 3), "comprobaciones": comprobaciones}
+
+def texto_comprobacion(informe):
+    # Solo lo que no está bien, y una línea de resumen
+    lineas = [f"- {c['app'] or 'General'} ({c['comprobacion']}): {c['detalle']}"
+              + (" [AVISO]" if c["estado"] == COMPROBACION_AVISO else "")
+              for c in informe["comprobaciones"] if c["estado"] != COMPROBACION_OK]
+    veredicto = "Todo listo" if informe["ok"] else "Hay errores: no es seguro continuar"
+    lineas.append(f"{veredicto}: {len(informe['comprobaciones'])} comprobaciones en {informe['segundos']:.2f} s.")
+    return "\n".join(lineas)
+
+# --- ÍNDICE DE PROGRAMAS ---
+# indice_programas.json guarda, por cada instalador bajo PROGRAMAS_DIR (clave: ruta relativa con "/"),
+# su tamaño, mtime, SHA-256, tipo (Inno Setup, NSIS, MSI) y los argumentos silenciosos de ese tipo.
+# Al reindexar, un archivo con el mismo tamaño y mtime solo cuesta la entrada del listado de os.scandir;
+# los nuevos o modificados se leen una sola vez, calculando el hash y buscando la firma a la vez.
+# Con --descubrir, las carpetas de PROGRAMAS_DIR que no están en APLICACIONES_CONFIG y contienen un único
+# instalador de tipo reconocido se añaden como tareas "instalar_local" (descubrir_aplicaciones).
+INDICE_PROGRAMAS_RUTA = ruta_estado("indice_programas.json")
+INDICE_EXTENSIONES = (".exe", ".msi")
+INDICE_HILOS = 4
+DESCUBRIMIENTO_ACTIVO = False  # Opcional: añade apps con argumentos silenciosos deducidos
+
+FIRMA_OLE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"  # Cabecera de documento compuesto: los .msi
+FIRMAS_INSTALADOR = ((b"Inno Setup", "inno"), (b"NullsoftInst", "nsis"))
+ARGS_SILENCIOSOS = {
+    "inno": ["/VERYSILENT", "/SUPPRESSMSGBOXES", "/NORESTART"],
+    "nsis": ["/S"],
+    "msi": ["/qn", "/norestart"],
+}
+
+indice_programas = {}  # Último índice cargado o actualizado
+
+def _recorrer_archivos(raiz, extensiones=None):
+    # (ruta relativa con "/", DirEntry) de cada archivo bajo raiz (solo los de esas extensiones, si
+    # se indican), sin seguir enlaces a carpetas
+    pendientes = [(raiz, "")]
+    while pendientes:
+        carpeta, prefijo = pendientes.pop()
+        try:
+            entradas = list(os.scandir(carpeta))
+        except OSError as e:
+            log.warning(f"No se pudo listar '{carpeta}': {e}")
+            continue
+        for entrada in entradas:
+            if entrada.is_dir(follow_symlinks=False):
+                pendientes.append((entrada.path, f"{prefijo}{entrada.name}/"))
+            elif extensiones is None or entrada.name.lower().endswith(extensiones):
+                yield f"{prefijo}{entrada.name}", entrada
+
+def analizar_instalador(ruta):
+    # (sha256, tipo o None) en una sola lectura secuencial del archivo
+    h = hashlib.sha256()
+    tipo = None
+    solape = max(len(firma) for firma, _ in FIRMAS_INSTALADOR) - 1
+    cola = b""
+    with open(ruta, 'rb', buffering=0) as f:
+        bloque = bytearray(HASH_BLOQUE)
+        vista = memoryview(bloque)
+        n = f.readinto(bloque)
+        if n >= len(FIRMA_OLE) and bloque.startswith(FIRMA_OLE):
+            tipo = "msi"
+        while n:
+            h.update(vista[:n])
+            if tipo is None:
+                frontera = cola + bytes(vista[:min(n, solape)])  # Firmas partidas entre dos bloques
+                for firma, nombre in FIRMAS_INSTALADOR:
+                    if frontera.find(firma) >= 0 or bloque.find(firma, 0, n) >= 0:
+                        tipo = nombre
+                        break
+                cola = bytes(vista[max(0, n - solape):n])
+            n = f.readinto(bloque)
+    return h.hexdigest(), tipo
+
+def _leer_indice_programas():
+    try:
+        with open(INDICE_PROGRAMAS_RUTA, 'r', encoding='utf-8') as f:
+            indice = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Un índice de otra carpeta de programas no sirve de nada
+    return indice.get("archivos", {}) if indice.get("raiz") == PROGRAMAS_DIR else {}
+
+def _guardar_indice_programas(archivos):
+    with open(INDICE_PROGRAMAS_RUTA + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({"raiz": PROGRAMAS_DIR, "archivos": archivos}, f, indent=1, ensure_ascii=False)
+    os.replace(INDICE_PROGRAMAS_RUTA + ".tmp", INDICE_PROGRAMAS_RUTA)
+
+def _analizar_o_nada(ruta):
+    try:
+        return analizar_instalador(ruta)
+    except OSError as e:
+        log.warning(f"No se pudo leer '{ruta}' para el índice: {e}")
+        return None
+
+def actualizar_indice_programas():
+    # Devuelve (archivos, analizados): el índice al día y cuántos archivos hubo que leer
+    global indice_programas
+    t0 = time.perf_counter()
+    anterior = _leer_indice_programas()
+    archivos = {}
+    cambiados = []
+    for relativa, entrada in _recorrer_archivos(PROGRAMAS_DIR, INDICE_EXTENSIONES):
+        st = entrada.stat()
+        previa = anterior.get(relativa)
+        if previa and previa["tam"] == st.st_size and previa["mtime"] == st.st_mtime:
+            archivos[relativa] = previa
+        else:
+            cambiados.append((relativa, entrada.path, st))
+    with ThreadPoolExecutor(max_workers=INDICE_HILOS, thread_name_prefix="indexar") as pool:
+        for (relativa, _, st), analisis in zip(cambiados, pool.map(_analizar_o_nada, [c[1] for c in cambiados])):
+            if analisis is None:
+                continue
+            digest, tipo = analisis
+            archivos[relativa] = {"tam": st.st_size, "mtime": st.st_mtime, "sha256": digest,
+                                  "tipo_instalador": tipo, "args_silenciosos": ARGS_SILENCIOSOS.get(tipo)}
+    if cambiados or archivos.keys() != anterior.keys():
+        try:
+            _guardar_indice_programas(archivos)
+        except OSError as e:
+            log.warning(f"No se pudo guardar el índice de programas: {e}")
+    indice_programas = archivos
+    log.info(f"Índice de programas: {len(archivos)} instaladores, {len(cambiados)} leídos "
+             f"en {time.perf_counter() - t0:.2f} s")
+    return archivos, len(cambiados)
+
+def descubrir_aplicaciones(archivos):
+    # Añade a APLICACIONES_CONFIG las carpetas nuevas con un único instalador de tipo conocido.
+    # Devuelve sus nombres. Las carpetas se comparan sin distinguir mayúsculas, como en Windows.
+    configuradas = {nombre.casefold() for nombre in APLICACIONES_CONFIG}
+    por_carpeta = {}
+    for relativa, entrada in archivos.items():
+        carpeta, _, resto = relativa.partition("/")
+        if resto:
+            por_carpeta.setdefault(carpeta, []).append((resto, entrada))
+    nuevas = []
+    for carpeta, instaladores in sorted(por_carpeta.items()):
+        if carpeta.casefold() in configuradas:
+            continue
+        if len(instaladores) != 1 or not instaladores[0][1]["tipo_instalador"]:
+            log.debug(f"{carpeta}: sin un único instalador de tipo reconocido, no se añade")
+            continue
+        exe_filename, entrada = instaladores[0]
+        APLICACIONES_CONFIG[carpeta] = {
+            "tipo": "instalar_local",
+            "exe_filename": exe_filename,
+            "args_instalacion": list(entrada["args_silenciosos"]),
+            "tipo_instalador": entrada["tipo_instalador"],
+            "descubierta": True,
+            "icon": "📦",
+        }
+        nuevas.append(carpeta)
+    if nuevas:
+        log.info(f"Aplicaciones descubiertas en PROGRAMAS_DIR: {', '.join(nuevas)}")
+    return nuevas
+
+def cargar_catalogo_programas(en_segundo_plano=False):
+    # Descubrimiento al arrancar (solo con DESCUBRIMIENTO_ACTIVO). Indexar lee y hashea cada instalador nuevo
+    # o cambiado, minutos en una unidad compartida lenta: con en_segundo_plano (la ventana) se descubre con
+    # el índice guardado y se actualiza en un hilo para el próximo arranque.
+    if not DESCUBRIMIENTO_ACTIVO or not os.path.isdir(PROGRAMAS_DIR):
+        return []
+    if en_segundo_plano:
+        archivos = _leer_indice_programas()
+        threading.Thread(target=actualizar_indice_programas, name="indexar", daemon=True).start()
+    else:
+        archivos, _ = actualizar_indice_programas()
+    return descubrir_aplicaciones(archivos)
+
+# --- MANIFIESTO DEL PAQUETE DE PROGRAMAS ---
+# PROGRAMAS_DIR se reparte en memorias USB y carpetas compartidas. crear_manifiesto anota tamaño, mtime
+# y SHA-256 de cada archivo en PROGRAMAS_DIR/manifiesto.json (JSON compacto, clave: ruta relativa) y
+# verificar_manifiesto comprueba una copia contra él. Los hashes se calculan en paralelo, mapeando en
+# memoria los archivos grandes: con hilos (hashlib suelta el GIL con bloques grandes) y solo con paquetes
+# muy grandes en un pool de procesos, porque cada proceso "spawn" vuelve a importar player (en el .exe,
+# arranca el ejecutable entero): en el bench, 89 MB tardan 0.10 s en un proceso y 0.61 s con dos.
+# Lo verificado se guarda en VERIFICACION_PROGRAMAS_RUTA y la siguiente verificación solo vuelve a leer
+# los archivos cuyo tamaño o mtime ha cambiado desde entonces.
+VERIFICACION_PROGRAMAS_RUTA = ruta_estado("verificacion_programas.json")
+MANIFIESTO_PROCESOS = os.cpu_count() or 1
+MANIFIESTO_MMAP_MIN = 16 * 1024 * 1024            # Desde este tamaño se mapea el archivo en vez de leerlo por bloques
+MANIFIESTO_MIN_PROCESOS = 4 * 1024 * 1024 * 1024  # Por debajo, hilos: arrancar procesos cuesta más de lo que ahorran
+
+def _sin_cambios(entrada, st):
+    return entrada.get("tam") == st.st_size and entrada.get("mtime") == st.st_mtime
+
+def _sha256_o_error(ruta):
+    # Se ejecuta en los procesos del pool. Devuelve (sha256, None) o (None, motivo)
+    try:
+        with open(ruta, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < MANIFIESTO_MMAP_MIN:
+                return sha256_archivo(ruta), None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                return hashlib.sha256(mapa).hexdigest(), None
+    except (OSError, ValueError) as e:
+        return None, str(e)
+
+def hashear_archivos(rutas_y_tamanos):
+    # {ruta: (sha256, error)}. Los archivos grandes van de uno en uno, los primeros, para repartir bien
+    # la carga; los pequeños en lotes para no pagar un viaje entre procesos por cada uno
+    rutas = [r for r, _ in sorted(rutas_y_tamanos, key=lambda item: -item[1])]
+    total = sum(t for _, t in rutas_y_tamanos)
+    if len(rutas) < 2 or MANIFIESTO_PROCESOS < 2:
+        return {ruta: _sha256_o_error(ruta) for ruta in rutas}
+    if total < MANIFIESTO_MIN_PROCESOS:
+        with ThreadPoolExecutor(max_workers=min(MANIFIESTO_PROCESOS, len(rutas)), thread_name_prefix="manifiesto") as pool:
+            return dict(zip(rutas, pool.map(_sha256_o_error, rutas)))
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    grandes = [r for r, t in rutas_y_tamanos if t >= MANIFIESTO_MMAP_MIN]
+    pequenas = [r for r, t in rutas_y_tamanos if t < MANIFIESTO_MMAP_MIN]
+    procesos = min(MANIFIESTO_PROCESOS, len(rutas))
+    # "spawn" como en Windows: no se clonan los hilos (registro, pools) del proceso principal
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn")) as pool:
+        resultado = dict(zip(grandes, pool.map(_sha256_o_error, grandes)))
+        resultado.update(zip(pequenas, pool.map(_sha256_o_error, pequenas,
+                                                chunksize=max(1, len(pequenas) // (procesos * 4)))))
+    return resultado
+
+def _archivos_del_paquete():
+    # {ruta relativa: (ruta, stat)} de todo PROGRAMAS_DIR salvo el propio manifiesto
+    return {relativa: (entrada.path, entrada.stat()) for relativa, entrada in _recorrer_archivos(PROGRAMAS_DIR)
+            if relativa != MANIFIESTO_NOMBRE}
+
+def _leer_estado_verificacion():
+    try:
+        with open(VERIFICACION_PROGRAMAS_RUTA, 'r', encoding='utf-8') as f:
+            estado = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return estado.get("archivos", {}) if estado.get("raiz") == PROGRAMAS_DIR else {}
+
+def _guardar_estado_verificacion(archivos):
+    try:
+        with open(VERIFICACION_PROGRAMAS_RUTA + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({"raiz": PROGRAMAS_DIR, "archivos": archivos}, f, separators=(",", ":"), ensure_ascii=False)
+        os.replace(VERIFICACION_PROGRAMAS_RUTA + ".tmp", VERIFICACION_PROGRAMAS_RUTA)
+    except OSError as e:
+        log.warning(f"No se pudo guardar el estado de verificación: {e}")
+
+def crear_manifiesto():
+    # Escribe PROGRAMAS_DIR/manifiesto.json y devuelve cuántos archivos y bytes anota.
+    # Lanza OSError si algún archivo no se puede leer: un manifiesto incompleto no sirve.
+    presentes = _archivos_del_paquete()
+    hashes = hashear_archivos([(ruta, st.st_size) for ruta, st in presentes.values()])
+    archivos = {}
+    for relativa, (ruta, st) in sorted(presentes.items()):
+        digest, error = hashes[ruta]
+        if error:
+            raise OSError(f"No se pudo leer '{relativa}': {error}")
+        archivos[relativa] = {"tam": st.st_size, "mtime": st.st_mtime, "sha256": digest}
+    ruta = ruta_manifiesto()
+    with open(ruta + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({"creado": time.strftime("%Y-%m-%dT%H:%M:%S"), "archivos": archivos}, f,
+                  separators=(",", ":"), ensure_ascii=False)
+    os.replace(ruta + ".tmp", ruta)
+    _guardar_estado_verificacion(archivos)  # Recién leídos: cuentan como verificados
+    return len(archivos), sum(e["tam"] for e in archivos.values())
+
+def verificar_manifiesto():
+    # Compara PROGRAMAS_DIR con su manifiesto. Devuelve {"ok", "correctos", "distintos", "faltan",
+    # "sobran", "releidos", "bytes_releidos"}; "sobran" (archivos fuera del manifiesto) no impide el ok.
+    # Lanza FileNotFoundError si no hay manifiesto.
+    manifiesto = leer_manifiesto()
+    if manifiesto is None:
+        raise FileNotFoundError(f"No hay manifiesto en '{ruta_manifiesto()}'")
+    estado = _leer_estado_verificacion()
+    presentes = _archivos_del_paquete()
+    informe = {"correctos": 0, "distintos": [], "faltan": [], "sobran": sorted(set(presentes) - set(manifiesto)),
+               "releidos": 0, "bytes_releidos": 0}
+    nuevo_estado = {}
+    a_releer = []
+    for relativa, esperado in sorted(manifiesto.items()):
+        if relativa not in presentes:
+            informe["faltan"].append(relativa)
+            continue
+        ruta, st = presentes[relativa]
+        previo = estado.get(relativa)
+        if st.st_size != esperado["tam"]:
+            informe["distintos"].append(relativa)
+        elif previo and _sin_cambios(previo, st):
+            nuevo_estado[relativa] = previo
+            if previo["sha256"] == esperado["sha256"]:
+                informe["correctos"] += 1
+            else:
+                informe["distintos"].append(relativa)
+        else:
+            a_releer.append(relativa)
+    hashes = hashear_archivos([(presentes[r][0], presentes[r][1].st_size) for r in a_releer])
+    for relativa in a_releer:
+        ruta, st = presentes[relativa]
+        digest, error = hashes[ruta]
+        informe["releidos"] += 1
+        informe["bytes_releidos"] += st.st_size
+        if error:
+            log.warning(f"No se pudo leer '{relativa}': {error}")
+        else:
+            nuevo_estado[relativa] = {"tam": st.st_size, "mtime": st.st_mtime, "sha256": digest}
+        if digest == manifiesto[relativa]["sha256"]:
+            informe["correctos"] += 1
+        else:
+            informe["distintos"].append(relativa)
+    informe["distintos"].sort()
+    _guardar_estado_verificacion(nuevo_estado)
+    informe["ok"] = not informe["distintos"] and not informe["faltan"]
+    return informe
+
+# --- DIARIO DE EJECUCIÓN ---
+# Registro JSON por líneas, solo de añadir, con las transiciones de cada tarea (encolada, iniciada,
+# terminada con su resultado, duración y código de salida). Si un instalador reinicia el equipo,
+# --resume lo relee y continúa con lo que no terminó bien. Un hilo escritor agrupa los registros que
+# llegan mientras hace fsync del lote anterior, así que los hilos de trabajo no pagan un fsync cada uno.
+class DiarioEjecucion:
+    def __init__(self, ruta, nuevo=True):
+        if nuevo and os.path.exists(ruta):
+            os.replace(ruta, ruta + ".anterior")
+        self._f = open(ruta, "ab", buffering=0)
+        self._cond = threading.Condition()
+        self._pendientes = []
+        self._encolados = 0
+        self._escritos = 0
+        self._cerrado = False
+        self._hilo = threading.Thread(target=self._escritor, name="diario", daemon=True)
+        self._hilo.start()
+
+    def registrar(self, evento, app=None, esperar=False, **campos):
+        # Con esperar=True no vuelve hasta que el registro (y todo lo anterior) está en disco
+        registro = {"t": round(time.time(), 3), "evento": evento}
+        if app is not None:
+            registro["app"] = app
+        registro.update({k: v for k, v in campos.items() if v is not None})
+        linea = (json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._cond:
+            self._pendientes.append(linea)
+            self._encolados += 1
+            numero = self._encolados
+            self._cond.notify_all()
+            while esperar and self._escritos < numero:
+                self._cond.wait()
+
+    def _escritor(self):
+        while True:
+            with self._cond:
+                while not self._pendientes and not self._cerrado:
+                    self._cond.wait()
+                if not self._pendientes:
+                    return
+                lote, self._pendientes = self._pendientes, []
+            try:
+                self._f.write(b"".join(lote))
+                os.fsync(self._f.fileno())
+            except OSError as e:
+                log.debug(f"No se pudo escribir el diario de ejecución: {e}")
+            with self._cond:
+                self._escritos += len(lote)
+                self._cond.notify_all()
+
+    def cerrar(self):
+        with self._cond:
+            self._cerrado = True
+            self._cond.notify_all()
+        self._hilo.join()
+        self._f.close()
+
+def leer_diario(ruta):
+    registros = []
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    registros.append(json.loads(linea))
+                except ValueError:
+                    break  # Última línea a medias por un corte: lo anterior es válido
+    except FileNotFoundError:
+        pass
+    return registros
+
+def estado_reanudacion(ruta=None):
+    # Devuelve (apps, forzar, {app: resultado} de las que ya terminaron bien) de la última ejecución
+    # del diario, o None si no hay nada que reanudar
+    registros = leer_diario(ruta or DIARIO_EJECUCION_RUTA)
+    inicios = [i for i, r in enumerate(registros) if r["evento"] == "ejecucion"]
+    if not inicios:
+        return None
+    cabecera = registros[inicios[-1]]
+    completadas = {}
+    for registro in registros[inicios[-1]:]:
+        if registro["evento"] == "terminada":
+            if registro["resultado"] in (TAREA_OK, TAREA_YA_INSTALADA):
+                completadas[registro["app"]] = registro["resultado"]
+            else:
+                completadas.pop(registro["app"], None)
+    if all(app in completadas for app in cabecera["apps"]):
+        return None
+    return cabecera["apps"], cabecera.get("forzar", False), completadas
+
+# --- COPIA LOCAL DE INSTALADORES ---
+# PROGRAMAS_DIR suele ser una memoria USB lenta y los instaladores hacen muchas lecturas aleatorias
+# de sí mismos. Si el origen es extraíble o de red, la preparación de cada tarea copia su carpeta a
+# COPIA_LOCAL_DIR con lecturas secuenciales grandes (a la vez que se ejecuta la tarea anterior, ver
+# PIPELINE DE PREPARACIÓN) y la tarea se ejecuta desde allí. Las copias se conservan entre ejecuciones:
+# estado.json guarda tamaño, mtime y SHA-256 de cada una y solo se vuelve a copiar lo que ha cambiado.
+# Al terminar cada ejecución se borran las menos usadas hasta quedar en COPIA_LOCAL_PRESUPUESTO.
+COPIA_LOCAL_MODO = "auto"   # "auto" (solo con origen extraíble o de red), "siempre" o "nunca"
+COPIA_LOCAL_DIR = ruta_estado("copias_locales")
+COPIA_LOCAL_PRESUPUESTO = 8 * 1024 * 1024 * 1024
+COPIA_LOCAL_BLOQUE = 8 * 1024 * 1024
+TIPOS_CON_COPIA_LOCAL = ("instalar_local", "instalar_manual_asistido", "configurar_autologon_gui")
+
+_copia_local_lock = threading.Lock()
+_origen_lento = {}
+
+def _unidad_lenta(ruta):
+    if os.name == "nt":
+        import ctypes
+        raiz = os.path.splitdrive(os.path.abspath(ruta))[0] + "\\"
+        return ctypes.windll.kernel32.GetDriveTypeW(raiz) in (2, 4)  # DRIVE_REMOVABLE, DRIVE_REMOTE
+    # Fuera de Windows no hay tipo de unidad: basta con que esté en otro dispositivo que la copia
+    return os.stat(ruta).st_dev != os.stat(ESTADO_DIR).st_dev
+
+def usar_copia_local(app_config_detalle):
+    if COPIA_LOCAL_MODO == "nunca" or app_config_detalle["tipo"] not in TIPOS_CON_COPIA_LOCAL \
+            or app_config_detalle.get("copia_local") is False:
+        return False
+    if COPIA_LOCAL_MODO == "siempre":
+        return True
+    if PROGRAMAS_DIR not in _origen_lento:
+        try:
+            _origen_lento[PROGRAMAS_DIR] = _unidad_lenta(PROGRAMAS_DIR)
+        except OSError:
+            _origen_lento[PROGRAMAS_DIR] = False
+    return _origen_lento[PROGRAMAS_DIR]
+
+def _ruta_copia_local(relativa):
+    return os.path.join(COPIA_LOCAL_DIR, *relativa.split("/"))
+
+def _leer_estado_copias():
+    try:
+        with open(os.path.join(COPIA_LOCAL_DIR, "estado.json"), 'r', encoding='utf-8') as f:
+            estado = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return estado.get("archivos", {}) if estado.get("raiz") == PROGRAMAS_DIR else {}
+
+def _guardar_estado_copias(archivos):
+    os.makedirs(COPIA_LOCAL_DIR, exist_ok=True)
+    ruta = os.path.join(COPIA_LOCAL_DIR, "estado.json")
+    with open(ruta + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({"raiz": PROGRAMAS_DIR, "archivos": archivos}, f, indent=1, ensure_ascii=False)
+    os.replace(ruta + ".tmp", ruta)
+
+def _sha256_conocido(relativa, st):
+    # SHA-256 del origen sin leerlo, si este equipo lo verificó con el mismo tamaño y mtime. El del
+    # manifiesto no vale: una copia del paquete conserva los mtimes aunque salga dañada.
+    entrada = _leer_estado_verificacion().get(relativa)
+    if entrada and entrada.get("sha256") and _sin_cambios(entrada, st):
+        return entrada["sha256"]
+    return None
+
+def _copia_vigente(previa, st, relativa):
+    try:
+        st_local = os.stat(_ruta_copia_local(relativa))
+    except OSError:
         return False
+    if st_local.st_size != previa["tam"] or st_local.st_mtime != previa["mtime"]:
+        return False  # La copia local se ha tocado
+    if _sin_cambios(previa, st):
+        return True
+    # Mismo contenido con otro mtime (p. ej. el paquete se volvió a copiar a la memoria USB)
+    return st.st_size == previa["tam"] and _sha256_conocido(relativa, st) == previa["sha256"]
+
+def _copiar_secuencial(origen, destino, progreso):
+    # Lecturas de COPIA_LOCAL_BLOQUE, lo que mejor lleva una memoria USB. Devuelve el SHA-256.
+    h = hashlib.sha256()
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    parcial = destino + ".parcial"
+    with open(origen, 'rb', buffering=0) as f_origen, open(parcial, 'wb') as f_destino:
+        bloque = bytearray(COPIA_LOCAL_BLOQUE)
+        vista = memoryview(bloque)
+        while True:
+            n = f_origen.readinto(bloque)
+            if not n:
+                break
+            h.update(vista[:n])
+            f_destino.write(vista[:n])
+            progreso.sumar(n)
+    shutil.copystat(origen, parcial)  # El mtime del origen es el que se compara la próxima vez
+    os.replace(parcial, destino)
+    return h.hexdigest()
+
+def preparar_copia_local(app_nombre_key):
+    # Copia (o reutiliza) la carpeta de la app en COPIA_LOCAL_DIR y devuelve la ruta local de su
+    # instalador, o None si la carpeta no cabe en el presupuesto y hay que ejecutarla desde el origen
+    exe_filename = APLICACIONES_CONFIG[app_nombre_key]["exe_filename"]
+    archivos = [(f"{app_nombre_key}/{relativa}", entrada.path, entrada.stat())
+                for relativa, entrada in _recorrer_archivos(os.path.join(PROGRAMAS_DIR, app_nombre_key))]
+    if sum(st.st_size for _, _, st in archivos) > COPIA_LOCAL_PRESUPUESTO:
+        return None
+    with _copia_local_lock:
+        estado = _leer_estado_copias()
+    a_copiar = [(r, ruta, st) for r, ruta, st in archivos if not (r in estado and _copia_vigente(estado[r], st, r))]
+    copiadas = {}
+    if a_copiar:
+        publicar_progreso(texto_status=f"Copiando {app_nombre_key} a disco local...")
+        progreso = _ProgresoDescarga(sum(st.st_size for _, _, st in a_copiar))
+        for relativa, ruta, st in a_copiar:
+            digest = _copiar_secuencial(ruta, _ruta_copia_local(relativa), progreso)
+            copiadas[relativa] = {"tam": st.st_size, "mtime": st.st_mtime, "sha256": digest}
+        log.info(f"Copia local de {app_nombre_key}: {len(a_copiar)} de {len(archivos)} archivos, {progreso.descargado} bytes")
+    with _copia_local_lock:
+        estado = _leer_estado_copias()  # Otras preparaciones pueden haberlo cambiado mientras tanto
+        estado.update(copiadas)
+        ahora = time.time()
+        for relativa, _, _ in archivos:
+            if relativa in estado:
+                estado[relativa]["ultimo_uso"] = ahora
+        _guardar_estado_copias(estado)
+    return _ruta_copia_local(f"{app_nombre_key}/{exe_filename}")
+
+def limpiar_copias_locales():
+    # Al terminar una ejecución: expulsa por LRU hasta COPIA_LOCAL_PRESUPUESTO
+    with _copia_local_lock:
+        estado = _leer_estado_copias()
+        ocupado = sum(e["tam"] for e in estado.values())
+        if ocupado <= COPIA_LOCAL_PRESUPUESTO:
+            return
+        for relativa, entrada in sorted(estado.items(), key=lambda item: item[1].get("ultimo_uso", 0)):
+            if ocupado <= COPIA_LOCAL_PRESUPUESTO:
+                break
+            try:
+                os.remove(_ruta_copia_local(relativa))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                log.warning(f"No se pudo borrar la copia local de {relativa}: {e}")
+                continue
+            ocupado -= entrada["tam"]
+            del estado[relativa]
+            log.debug(f"Copia local expulsada: {relativa} ({entrada['tam']} bytes)")
+        _guardar_estado_copias(estado)
+
+# --- PIPELINE DE PREPARACIÓN ---
+# Mientras una tarea se instala, las siguientes (en el orden previsto por el planificador) ya se
+# están descargando o leyendo por adelantado desde PROGRAMAS_DIR, sin pasar de PIPELINE_PROFUNDIDAD
+# tareas adelantadas ni de PIPELINE_PRESUPUESTO_BYTES preparados y aún sin consumir.
+PIPELINE_ACTIVO = True
+PIPELINE_PROFUNDIDAD = 2
+PIPELINE_PRESUPUESTO_BYTES = 2 * 1024 * 1024 * 1024
+LECTURA_ANTICIPADA_BLOQUE = 1024 * 1024
+
+TRAZA_ACTIVA = True  # Con False, fase()/tramo() devuelven un contexto vacío y no miden nada
+
+_TRAMO_NULO = contextlib.nullcontext()
+
+class LineaTiempo:
+    # Registro de tramos (tarea, fase, inicio, fin, hilo, args) para ver qué se solapó con qué y dónde
+    # se va el tiempo. Se exporta como tabla o como traza de Chrome (chrome://tracing, Perfetto).
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inicio = time.perf_counter()
+        self.fases = []
+
+    def fase(self, tarea, nombre, **args):
+        if not TRAZA_ACTIVA:
+            return _TRAMO_NULO
+        return self._medir(tarea, nombre, args)
+
+    @contextlib.contextmanager
+    def _medir(self, tarea, nombre, args):
+        t0 = time.perf_counter()
+        fase_anterior = getattr(_contexto_hilo, "fase", None)
+        _contexto_hilo.fase = nombre  # Para el campo "fase" del log
+        try:
+            yield
+        finally:
+            fin = time.perf_counter()
+            _contexto_hilo.fase = fase_anterior
+            with self._lock:
+                self.fases.append((tarea, nombre, t0 - self.inicio, fin - self.inicio,
+                                   threading.current_thread().name, args))
+
+    def resumen(self):
+        with self._lock:
+            fases = sorted(self.fases, key=lambda f: f[2])
+        lineas = [f"{'tarea':<22}{'fase':<20}{'inicio':>9}{'fin':>9}"]
+        for tarea, nombre, ini, fin, _, _ in fases:
+            lineas.append(f"{str(tarea):<22}{nombre:<20}{ini:>8.2f}s{fin:>8.2f}s")
+        return "\n".join(lineas)
+
+    def tabla_resumen(self):
+        # Tiempo acumulado por tipo de fase (las fases anidadas cuentan también dentro de su padre)
+        por_fase = {}
+        with self._lock:
+            for _, nombre, ini, fin, _, _ in self.fases:
+                por_fase.setdefault(nombre, []).append(fin - ini)
+        lineas = [f"{'fase':<22}{'n':>5}{'total':>10}{'media':>10}{'máx':>10}"]
+        for nombre, duraciones in sorted(por_fase.items(), key=lambda item: -sum(item[1])):
+            total = sum(duraciones)
+            lineas.append(f"{nombre:<22}{len(duraciones):>5}{total:>9.3f}s{total / len(duraciones):>9.3f}s{max(duraciones):>9.3f}s")
+        return "\n".join(lineas)
+
+    def traza_chrome(self):
+        # Formato "trace event": un evento completo (ph "X") por tramo, en µs, con una fila por hilo
+        with self._lock:
+            fases = list(self.fases)
+        hilos = {}
+        eventos = []
+        for tarea, nombre, ini, fin, hilo, args in fases:
+            tid = hilos.setdefault(hilo, len(hilos) + 1)
+            eventos.append({"name": nombre, "cat": str(tarea), "ph": "X", "pid": 1, "tid": tid,
+                            "ts": round(ini * 1e6, 1), "dur": round((fin - ini) * 1e6, 1),
+                            "args": dict(args, tarea=tarea)})
+        eventos.extend({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": hilo}}
+                       for hilo, tid in hilos.items())
+        return {"traceEvents": eventos, "displayTimeUnit": "ms"}
+
+    def exportar_chrome(self, ruta):
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.traza_chrome(), f, ensure_ascii=False, default=str)
+
+linea_tiempo = LineaTiempo()
+
+def tramo(nombre, **args):
+    # Tramo de la tarea del hilo actual en la línea de tiempo de la ejecución en curso
+    if not TRAZA_ACTIVA:
+        return _TRAMO_NULO
+    return linea_tiempo.fase(tarea_actual(), nombre, **args)
+
+def _leer_por_adelantado(ruta):
+    # Lectura secuencial que deja el instalador en la caché de disco del SO: cuando se ejecute,
+    # sus lecturas aleatorias ya no irán a la unidad de origen (a menudo un USB lento)
+    leido = 0
+    with open(ruta, 'rb', buffering=0) as f:
+        bloque = bytearray(LECTURA_ANTICIPADA_BLOQUE)
+        while True:
+            n = f.readinto(bloque)
+            if not n:
+                return leido
+            leido += n
+
+def preparar_tarea(app_nombre_key, cancelar=None):
+    # Fase de preparación (red/disco) de una tarea. Devuelve {"ok", "ruta", "bytes", "metadatos"}.
+    # cancelar (threading.Event) corta la descarga en curso si la ejecución termina antes.
+    app_config_detalle = APLICACIONES_CONFIG[app_nombre_key]
+    if app_config_detalle["tipo"] == "descargar_e_instalar":
+        ruta = os.path.join(DESCARGAS_DIR, app_config_detalle["nombre_archivo_descargado"])
+        metadatos = {}
+        publicar_progreso(texto_status=f"Descargando {app_nombre_key}...")
+        with linea_tiempo.fase(app_nombre_key, "preparación"):
+            ok = descargar_con_cache(app_config_detalle["url_descarga"], ruta, app_config_detalle.get("sha256"), metadatos, cancelar)
+        return {"ok": ok, "ruta": ruta, "bytes": os.path.getsize(ruta) if ok else 0, "metadatos": metadatos}
+    ruta = os.path.join(PROGRAMAS_DIR, app_nombre_key, app_config_detalle["exe_filename"])
+    if not os.path.exists(ruta):
+        return {"ok": False, "ruta": ruta, "bytes": 0, "metadatos": {}}
+    if usar_copia_local(app_config_detalle):
+        ruta_local = None
+        with linea_tiempo.fase(app_nombre_key, "copia local"):
+            try:
+                ruta_local = preparar_copia_local(app_nombre_key)
+            except OSError as e:
+                log.warning(f"Copia local de {app_nombre_key} fallida, se ejecuta desde el origen: {e}")
+        if ruta_local:
+            # Ya está en disco local: no retiene memoria del presupuesto del pipeline
+            return {"ok": True, "ruta": ruta_local, "bytes": 0, "metadatos": {}}
+    leido = 0
+    if os.path.getsize(ruta) <= PIPELINE_PRESUPUESTO_BYTES:
+        with linea_tiempo.fase(app_nombre_key, "lectura anticipada"):
+            try:
+                leido = _leer_por_adelantado(ruta)
+            except OSError as e:
+                log.debug(f"Lectura anticipada de {ruta} fallida: {e}")
+    return {"ok": True, "ruta": ruta, "bytes": leido, "metadatos": {}}
+
+class PreparadorTareas:
+    # Adelanta preparar_tarea en segundo plano siguiendo el orden previsto. obtener(app) devuelve la
+    # preparación de esa tarea: al momento si ya está lista, esperando si está en curso, o
+    # haciéndola en el propio hilo si aún no se había empezado.
+    def __init__(self, orden, profundidad=PIPELINE_PROFUNDIDAD, presupuesto_bytes=PIPELINE_PRESUPUESTO_BYTES):
+        self.orden = list(orden)
+        self.profundidad = max(1, profundidad)
+        self.presupuesto_bytes = presupuesto_bytes
+        self._cond = threading.Condition()
+        self._estado = {app: "pendiente" for app in self.orden}
+        self._resultados = {}
+        self._bytes_retenidos = {}
+        self._cancelar = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=self.profundidad, thread_name_prefix="preparar")
+        with self._cond:
+            self._rellenar()
+
+    def _rellenar(self):
+        adelantadas = sum(1 for e in self._estado.values() if e in ("preparando", "lista", "descartada"))
+        for app in self.orden:
+            if adelantadas >= self.profundidad or sum(self._bytes_retenidos.values()) >= self.presupuesto_bytes:
+                return
+            if self._estado[app] == "pendiente":
+                self._estado[app] = "preparando"
+                adelantadas += 1
+                self._pool.submit(self._preparar, app)
+
+    def _preparar(self, app):
+        fijar_tarea_actual(app)
+        try:
+            resultado = preparar_tarea(app, self._cancelar)
+        except Exception as e:
+            log.warning(f"Error preparando {app}: {e}")
+            resultado = {"ok": False, "ruta": None, "bytes": 0, "metadatos": {}}
+        with self._cond:
+            if self._estado[app] == "descartada":
+                # Omitida mientras se preparaba: nadie la va a recoger
+                self._estado[app] = "consumida"
+                self._rellenar()
+                return
+            self._resultados[app] = resultado
+            self._bytes_retenidos[app] = resultado["bytes"]
+            self._estado[app] = "lista"
+            self._cond.notify_all()
+
+    def obtener(self, app):
+        with self._cond:
+            en_este_hilo = self._estado[app] == "pendiente"
+            if en_este_hilo:
+                self._estado[app] = "preparando"
+        if en_este_hilo:
+            self._preparar(app)
+        with self._cond:
+            while self._estado[app] != "lista":
+                self._cond.wait()
+            self._estado[app] = "consumida"
+            self._bytes_retenidos.pop(app, None)
+            self._rellenar()
+            return self._resultados.pop(app)
+
+    def descartar(self, app):
+        # La tarea no se va a ejecutar (el planificador la omitió): libera su hueco y sus bytes
+        # para que se sigan adelantando las demás
+        with self._cond:
+            estado = self._estado.get(app)
+            if estado == "preparando":
+                self._estado[app] = "descartada"
+            elif estado in ("pendiente", "lista"):
+                self._estado[app] = "consumida"
+                self._resultados.pop(app, None)
+                self._bytes_retenidos.pop(app, None)
+                self._rellenar()
+
+    def cerrar(self):
+        # Fin de la ejecución (o cancelación): lo que no ha empezado se descarta y las descargas
+        # adelantadas que siguen en curso paran en el siguiente bloque y borran su .part
+        with self._cond:
+            for app, estado in self._estado.items():
+                if estado == "pendiente":
+                    self._estado[app] = "consumida"
+        self._cancelar.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+def ejecutar_tarea(app_nombre_key, root_gui, numero, total_apps, preparador=None):
+    app_config_detalle = APLICACIONES_CONFIG[app_nombre_key]
+    tipo_accion = app_config_detalle["tipo"]
+    fijar_tarea_actual(app_nombre_key)
+    status_actual = f"Procesando: {app_nombre_key} ({numero}/{total_apps})"
+    publicar_progreso(texto_status=status_actual, valor_barra=0, texto_porcentaje="")
+    preparacion = preparador.obtener(app_nombre_key) if preparador else preparar_tarea(app_nombre_key)
+    with linea_tiempo.fase(app_nombre_key, "ejecución"):
+        return _ejecutar_tarea_preparada(app_nombre_key, app_config_detalle, tipo_accion, preparacion, root_gui)
+
+def _supervision_app(app_config_detalle):
+    return {"timeout": app_config_detalle.get("timeout_instalacion"),
+            "codigos_salida": app_config_detalle.get("codigos_salida"),
+            "reintentos": app_config_detalle.get("reintentos")}
+
+def _texto_instalado():
+    if not SUPERVISION_ACTIVA:
+        return "Lanzado"
+    return "Instalado (reinicio pendiente)" if getattr(_contexto_hilo, "reinicio", False) else "Instalado ✓"
+
+def _ejecutar_tarea_preparada(app_nombre_key, app_config_detalle, tipo_accion, preparacion, root_gui):
+    success_flag = False
+    if tipo_accion == "instalar_manual_asistido":
+        ruta_exe_origen = preparacion["ruta"]
+        mensaje_usuario = app_config_detalle["mensaje_usuario"]
+        if not instalar_manual_asistido_app(app_nombre_key, ruta_exe_origen, mensaje_usuario, root_gui):
+            return TAREA_CANCELADA
+        success_flag = True
+    elif tipo_accion == "descargar_e_instalar":
+        ruta_descarga_completa = preparacion["ruta"]
+        args_inst = app_config_detalle.get("args_instalacion")
+        sha256_esperado = app_config_detalle.get("sha256")
+        metadatos_descarga = preparacion["metadatos"]
+        if preparacion["ok"]:
+            if sha256_esperado:
+                tiempos_verificacion[app_nombre_key] = metadatos_descarga.get("segundos_hash", 0.0)
+                log.debug(f"{app_nombre_key} verificado (SHA-256) en {tiempos_verificacion[app_nombre_key]:.3f} s")
+            publicar_progreso(texto_status=f"Instalando {app_nombre_key}...")
+            if instalar_exe(ruta_descarga_completa, args_inst, **_supervision_app(app_config_detalle)):
+                success_flag = True
+                publicar_progreso(valor_barra=100, texto_porcentaje=_texto_instalado())
+        if not success_flag:
+             publicar_progreso(texto_status=f"Fallo {app_nombre_key}", valor_barra=0, texto_porcentaje="Error X")
+
+    elif tipo_accion == "instalar_local":
+        ruta_exe_origen = preparacion["ruta"]
+        args_inst = app_config_detalle.get("args_instalacion")
+        publicar_progreso(texto_status=f"Instalando {app_nombre_key}...", valor_barra=0, texto_porcentaje="")
+        if os.path.exists(ruta_exe_origen):
+            if instalar_exe(ruta_exe_origen, args_inst, **_supervision_app(app_config_detalle)):
+                success_flag = True
+                publicar_progreso(valor_barra=100, texto_porcentaje=_texto_instalado())
+            else:
+                publicar_progreso(texto_status=f"Fallo {app_nombre_key}", valor_barra=0, texto_porcentaje="Error X")
+        else:
+            error_msg_detalle = f"Instalador no encontrado: {os.path.normpath(ruta_exe_origen)}"
+            publicar_progreso(texto_status=error_msg_detalle, valor_barra=0, texto_porcentaje="Error X")
+            mostrar_error("No Encontrado", error_msg_detalle, root_gui)
+    elif tipo_accion == "copiar_exe":
+        nombre_exe_en_subcarpeta = app_config_detalle["exe_filename"]
+        ruta_exe_origen = preparacion["ruta"]
+        publicar_progreso(texto_status=f"Copiando {app_nombre_key}...", valor_barra=0, texto_porcentaje="")
+        if os.path.exists(ruta_exe_origen):
+            if copiar_a_documentos(ruta_exe_origen, nombre_exe_en_subcarpeta, destinos_de_copia(app_config_detalle)):
+                success_flag = True
+                publicar_progreso(valor_barra=100, texto_porcentaje="Copiado ✓")
+            else:
+                publicar_progreso(texto_status=f"Fallo copia {app_nombre_key}", valor_barra=0, texto_porcentaje="Error X")
+        else:
+            error_msg_detalle = f"Archivo a copiar no encontrado: {os.path.normpath(ruta_exe_origen)}"
+            publicar_progreso(texto_status=error_msg_detalle, valor_barra=0, texto_porcentaje="Error X")
+            mostrar_error("No Encontrado", error_msg_detalle, root_gui)
+    elif tipo_accion == "configurar_autologon_gui":
+        ruta_exe_origen = preparacion["ruta"]
+        username = app_config_detalle["username"]; domain = app_config_detalle["domain"]; password = app_config_detalle["password"]
+        publicar_progreso(texto_status=f"Configurando Autologon...", valor_barra=0)
+        if PYWINAUTO_AVAILABLE:
+            if configurar_autologon_gui_con_pywinauto(ruta_exe_origen, username, domain, password, root_gui):
+                success_flag = True
+            else:
+                 if canal_progreso.ultimo(app_nombre_key, "texto_porcentaje") not in ["Hecho ✓", "Hecho ✔"]:
+                     publicar_progreso(texto_status="Fallo Autologon.", valor_barra=0, texto_porcentaje="Error X")
+        else:
+            error_msg = "Autologon: pywinauto no disponible."
+            publicar_progreso(texto_status=error_msg, valor_barra=0, texto_porcentaje="Error X")
+            mostrar_error("Dependencia", "pywinauto no instalado para Autologon.", root_gui)
+    # Sin pausa fija al terminar: el último estado de la tarea queda en el canal de progreso
+    # hasta que otra publique, así que no hace falta retenerla para que se vea
+    return TAREA_OK if success_flag else TAREA_FALLO
+
+def ejecutar_seleccion(apps_seleccionadas_nombres, root_gui=None, forzar=False, completadas=None, instaladas=None):
+    # Núcleo común a la GUI y al modo sin ventana: planifica y ejecuta las tareas y devuelve
+    # {app: resultado}. Lanza ValueError si la configuración no es válida (p. ej. ciclos).
+    # Salvo con forzar, las apps que ya están instaladas no se vuelven a lanzar. completadas
+    # ({app: resultado}, de estado_reanudacion) indica que se continúa la ejecución del diario.
+    # instaladas es el resultado de sondear_instaladas si el llamante ya sondeó (para la comprobación previa).
+    global linea_tiempo
+    linea_tiempo = LineaTiempo()
+    reinicios_pendientes.clear()
+    completadas = dict(completadas or {})
+    diario = DiarioEjecucion(DIARIO_EJECUCION_RUTA, nuevo=not completadas)
+    if completadas:
+        diario.registrar("reanudacion", esperar=True, completadas=sorted(completadas))
+    else:
+        diario.registrar("ejecucion", esperar=True, apps=list(apps_seleccionadas_nombres), forzar=forzar)
+    try:
+        a_sondear = [app for app in apps_seleccionadas_nombres if app not in completadas]
+        if forzar:
+            instaladas = set()
+        elif instaladas is None:
+            publicar_progreso(texto_status="Comprobando qué está ya instalado...", valor_barra=0, texto_porcentaje="")
+            with linea_tiempo.fase(None, "sondeo"):
+                instaladas = sondear_instaladas(a_sondear)
+        instaladas = set(instaladas) & set(a_sondear)
+        for app in instaladas:
+            publicar_progreso(texto_status=f"{app} ya está instalada.", valor_barra=100, texto_porcentaje="Ya instalada ✓", tarea=app)
+            diario.registrar("terminada", app, resultado=TAREA_YA_INSTALADA)
+        pendientes = [app for app in a_sondear if app not in instaladas]
+        with linea_tiempo.fase(None, "planificación"):
+            planificador = PlanificadorTareas.desde_config(pendientes, APLICACIONES_CONFIG)
+        for app in pendientes:
+            diario.registrar("encolada", app)
+        preparador = PreparadorTareas(planificador.orden_previsto()) if PIPELINE_ACTIVO and pendientes else None
+        total_apps = len(pendientes)
+        numeros = itertools.count(1)
+        def ejecutar(app_nombre_key):
+            diario.registrar("iniciada", app_nombre_key)
+            _contexto_hilo.codigo_salida = None
+            _contexto_hilo.reinicio = False
+            _contexto_hilo.intento = None
+            t0 = time.perf_counter()
+            resultado = ejecutar_tarea(app_nombre_key, root_gui, next(numeros), total_apps, preparador)
+            if resultado == TAREA_CANCELADA:
+                planificador.cancelar()
+            elif resultado == TAREA_OK:
+                marcar_instalada(app_nombre_key)
+                if _contexto_hilo.reinicio:
+                    reinicios_pendientes.add(app_nombre_key)
+            segundos = round(time.perf_counter() - t0, 3)
+            log.info(f"Tarea terminada: {resultado}", extra={"resultado": resultado, "segundos": segundos})
+            # El final sí se espera a que esté en disco: es lo que decide qué se repite al reanudar
+            diario.registrar("terminada", app_nombre_key, esperar=True, resultado=resultado,
+                             segundos=segundos, codigo_salida=_contexto_hilo.codigo_salida,
+                             reinicio=_contexto_hilo.reinicio or None)
+            return resultado
+
+        resultados = planificador.ejecutar(ejecutar, al_omitir=preparador.descartar if preparador else None)
+        if preparador:
+            preparador.cerrar()
+        for app, resultado in resultados.items():
+            if resultado == TAREA_OMITIDA:
+                diario.registrar("terminada", app, resultado=resultado)
+        diario.registrar("fin", esperar=True)
+    finally:
+        diario.cerrar()
+    limpiar_copias_locales()
+    resultados.update(completadas)
+    resultados.update({app: TAREA_YA_INSTALADA for app in instaladas})
+    fijar_tarea_actual(None)
+    if TRAZA_ACTIVA and log.isEnabledFor(logging.DEBUG):
+        log.debug(f"Línea de tiempo por fases:\n{linea_tiempo.resumen()}")
+        log.debug(f"Tiempo por fase:\n{linea_tiempo.tabla_resumen()}")
+    return resultados
+
+VENTANA_PROGRESO_TIMEOUT = 10
 
 def procesar_seleccion(apps_seleccionadas_nombres, root_gui):
     global progress_window, progress_bar, progress_label_status, progress_label_percentage
     def crear_ventana_progreso_threadsafe():
-        global progress_window, progress_bar, progress_label_status, progress_label_percentage
+        global progress_window, progress_bar, progress_label_status, progress_label_percentage, progress_marco_tareas, progress_total_tareas
         progress_window = tk.Toplevel(root_gui)
         progress_window.title("Procesando Tareas...")
         # Usar colores del tema para la ventana de progreso también
@@ -249,7 +2971,8 @@ def procesar_seleccion(apps_seleccionadas_nombres, root_gui):
             s.theme_use('clam') # Fallback
         
         # Hacerla un poco más grande y con más padding
-        progress_window.geometry("500x200") 
+        alto = 150 + 42 * len(apps_seleccionadas_nombres)  # Una fila por tarea
+        progress_window.geometry(f"500x{alto}")
         progress_window.resizable(False, False)
         progress_window.transient(root_gui) 
         progress_window.grab_set()          
@@ -257,7 +2980,7 @@ def procesar_seleccion(apps_seleccionadas_nombres, root_gui):
         try:
             root_x = root_gui.winfo_x(); root_y = root_gui.winfo_y()
             root_width = root_gui.winfo_width(); root_height = root_gui.winfo_height()
-            prog_width = 500; prog_height = 200
+            prog_width = 500; prog_height = alto
             center_x = root_x + (root_width // 2) - (prog_width // 2)
             center_y = root_y + (root_height // 2) - (prog_height // 2)
             progress_window.geometry(f"{prog_width}x{prog_height}+{center_x}+{center_y}")
@@ -283,113 +3006,75 @@ def procesar_seleccion(apps_seleccionadas_nombres, root_gui):
         
         progress_label_percentage = ttk.Label(main_frame, text="", font=percentage_font, anchor="e")
         progress_label_percentage.pack(pady=5, padx=5, fill="x")
+
+        # Debajo, una fila por tarea: con tareas en paralelo la barra de arriba es la media de todas
+        progress_filas.clear()
+        progress_total_tareas = len(apps_seleccionadas_nombres)
+        progress_marco_tareas = ttk.Frame(main_frame)
+        progress_marco_tareas.pack(pady=(5, 0), padx=5, fill="x")
+        for app in apps_seleccionadas_nombres:
+            _fila_progreso(app)
         
         # Botón de cancelar (opcional, puede ser complejo de implementar bien)
         # cancel_button = ttk.Button(main_frame, text="Cancelar Proceso", command=lambda: print("Cancelar solicitado"))
         # cancel_button.pack(pady=(10,0))
 
+        canal_progreso.drenar()  # Descarta restos de una ejecución anterior
+        progress_window.after(1000 // PROGRESO_HZ, _drenar_canal_progreso)
+        return True
+
+    # Comprobación previa antes de abrir la ventana de progreso (que toma el grab): si algo falla,
+    # el usuario decide si seguir antes de que se haya ejecutado ninguna tarea. Primero las sondas:
+    # lo que ya está instalado no se ejecuta, así que su instalador ni se exige ni se rehashea.
+    instaladas = sondear_instaladas(apps_seleccionadas_nombres)
+    informe = comprobar_seleccion([app for app in apps_seleccionadas_nombres if app not in instaladas])
+    log.info(texto_comprobacion(informe))
+    if not informe["ok"] and not preguntar_ok_cancelar(
+            "Comprobación Previa", f"{texto_comprobacion(informe)}\n\n¿Continuar de todos modos?", root_gui):
+        return
 
-    root_gui.after(0, crear_ventana_progreso_threadsafe)
-    while not (progress_window and progress_window.winfo_exists()): time.sleep(0.1)
+    # El hilo de Tk avisa con un Event cuando la ventana existe; nada de sondear widgets desde aquí
+    try:
+        ventana_lista = ejecutar_en_tk(root_gui, crear_ventana_progreso_threadsafe, timeout=VENTANA_PROGRESO_TIMEOUT)
+    except tk.TclError as e:
+        log.error(f"No se pudo crear la ventana de progreso: {e}")
+        return
+    if not ventana_lista:
+        log.error("La ventana de progreso no apareció a tiempo.")
+        return
 
-    ordered_apps_seleccionadas = []
-    novalct_key = None
-    for key in apps_seleccionadas_nombres:
-        if APLICACIONES_CONFIG[key]["tipo"] == "instalar_manual_asistido" and key == "Novalct":
-            novalct_key = key
-        else: ordered_apps_seleccionadas.append(key)
-    if novalct_key: ordered_apps_seleccionadas.insert(0, novalct_key)
+    try:
+        resultados = ejecutar_seleccion(apps_seleccionadas_nombres, root_gui, instaladas=instaladas)
+    except ValueError as e:
+        publicar_progreso(texto_status=f"Error de configuración: {e}", valor_barra=0, texto_porcentaje="Error X")
+        root_gui.after(1000, lambda: progress_window.destroy() if progress_window and progress_window.winfo_exists() else None)
+        mostrar_error("Error de Configuración", str(e), root_gui)
+        return
 
-    total_apps = len(ordered_apps_seleccionadas)
-    for i, app_nombre_key in enumerate(ordered_apps_seleccionadas):
-        app_config_detalle = APLICACIONES_CONFIG[app_nombre_key]
-        tipo_accion = app_config_detalle["tipo"]
-        status_actual = f"Procesando: {app_nombre_key} ({i+1}/{total_apps})"
-        root_gui.after(0, lambda s=status_actual: actualizar_progreso_gui(texto_status=s, valor_barra=0, texto_porcentaje=""))
-        
-        success_flag = False
-        # ... (Lógica de cada tipo_accion igual que antes) ...
-        if tipo_accion == "instalar_manual_asistido":
-            ruta_exe_origen = os.path.join(PROGRAMAS_DIR, app_nombre_key, app_config_detalle["exe_filename"])
-            mensaje_usuario = app_config_detalle["mensaje_usuario"]
-            if instalar_manual_asistido_app(app_nombre_key, ruta_exe_origen, mensaje_usuario, root_gui):
-                success_flag = True
-            else:
-                root_gui.after(0, lambda: actualizar_progreso_gui(texto_status="Proceso cancelado por usuario.", valor_barra=0))
-                root_gui.after(1000, lambda: progress_window.destroy() if progress_window and progress_window.winfo_exists() else None)
-                messagebox.showwarning("Cancelado", f"Instalación de {app_nombre_key} cancelada. Tareas restantes no se ejecutarán.")
-                return
-        elif tipo_accion == "descargar_e_instalar":
-            # ...
-            url = app_config_detalle["url_descarga"]
-            nombre_archivo_guardado = app_config_detalle["nombre_archivo_descargado"]
-            ruta_descarga_completa = os.path.join(DESCARGAS_DIR, nombre_archivo_guardado)
-            args_inst = app_config_detalle.get("args_instalacion")
-            root_gui.after(0, lambda an=app_nombre_key: actualizar_progreso_gui(texto_status=f"Descargando {an}..."))
-            if descargar_archivo(url, ruta_descarga_completa):
-                root_gui.after(0, lambda an=app_nombre_key: actualizar_progreso_gui(texto_status=f"Instalando {an}..."))
-                if instalar_exe(ruta_descarga_completa, args_inst):
-                    success_flag = True
-                    root_gui.after(0, lambda: actualizar_progreso_gui(valor_barra=100, texto_porcentaje="Lanzado"))
-            if not success_flag:
-                 root_gui.after(0, lambda an=app_nombre_key: actualizar_progreso_gui(texto_status=f"Fallo {an}", valor_barra=0, texto_porcentaje="Error X"))
-
-        elif tipo_accion == "instalar_local":
-            # ...
-            nombre_exe_en_subcarpeta = app_config_detalle["exe_filename"]
-            ruta_exe_origen = os.path.join(PROGRAMAS_DIR, app_nombre_key, nombre_exe_en_subcarpeta)
-            args_inst = app_config_detalle.get("args_instalacion")
-            root_gui.after(0, lambda an=app_nombre_key: actualizar_progreso_gui(texto_status=f"Instalando {an}...", valor_barra=0, texto_porcentaje=""))
-            if os.path.exists(ruta_exe_origen):
-                if instalar_exe(ruta_exe_origen, args_inst):
-                    success_flag = True
-                    root_gui.after(0, lambda: actualizar_progreso_gui(valor_barra=100, texto_porcentaje="Lanzado"))
-                else:
-                    root_gui.after(0, lambda an=app_nombre_key: actualizar_progreso_gui(texto_status=f"Fallo {an}", valor_barra=0, texto_porcentaje="Error X"))
-            else:
-                error_msg_detalle = f"Instalador no encontrado: {os.path.normpath(ruta_exe_origen)}"
-                root_gui.after(0, lambda emd=error_msg_detalle: actualizar_progreso_gui(texto_status=emd, valor_barra=0, texto_porcentaje="Error X"))
-                root_gui.after(0, lambda emd=error_msg_detalle: messagebox.showerror("No Encontrado", emd))
-        elif tipo_accion == "copiar_exe":
-            # ...
-            nombre_exe_en_subcarpeta = app_config_detalle["exe_filename"]
-            ruta_exe_origen = os.path.join(PROGRAMAS_DIR, app_nombre_key, nombre_exe_en_subcarpeta)
-            root_gui.after(0, lambda an=app_nombre_key: actualizar_progreso_gui(texto_status=f"Copiando {an}...", valor_barra=0, texto_porcentaje=""))
-            if os.path.exists(ruta_exe_origen):
-                if copiar_a_documentos(ruta_exe_origen, nombre_exe_en_subcarpeta):
-                    success_flag = True
-                    root_gui.after(0, lambda: actualizar_progreso_gui(valor_barra=100, texto_porcentaje="Copiado ✓"))
-                else:
-                    root_gui.after(0, lambda an=app_nombre_key: actualizar_progreso_gui(texto_status=f"Fallo copia {an}", valor_barra=0, texto_porcentaje="Error X"))
-            else:
-                error_msg_detalle = f"Archivo a copiar no encontrado: {os.path.normpath(ruta_exe_origen)}"
-                root_gui.after(0, lambda emd=error_msg_detalle: actualizar_progreso_gui(texto_status=emd, valor_barra=0, texto_porcentaje="Error X"))
-                root_gui.after(0, lambda emd=error_msg_detalle: messagebox.showerror("No Encontrado", emd))
-        elif tipo_accion == "configurar_autologon_gui":
-            # ...
-            nombre_exe_en_subcarpeta = app_config_detalle["exe_filename"]
-            ruta_exe_origen = os.path.join(PROGRAMAS_DIR, app_nombre_key, nombre_exe_en_subcarpeta)
-            username = app_config_detalle["username"]; domain = app_config_detalle["domain"]; password = app_config_detalle["password"]
-            root_gui.after(0, lambda: actualizar_progreso_gui(texto_status=f"Configurando Autologon...", valor_barra=0))
-            if PYWINAUTO_AVAILABLE:
-                if configurar_autologon_gui_con_pywinauto(ruta_exe_origen, username, domain, password, root_gui):
-                    success_flag = True
-                else:
-                     if progress_label_percentage.cget("text") not in ["Hecho ✓", "Hecho ✔"]:
-                         root_gui.after(0, lambda: actualizar_progreso_gui(texto_status="Fallo Autologon.", valor_barra=0, texto_porcentaje="Error X"))
-            else:
-                error_msg = "Autologon: pywinauto no disponible."
-                root_gui.after(0, lambda: actualizar_progreso_gui(texto_status=error_msg, valor_barra=0, texto_porcentaje="Error X"))
-                root_gui.after(0, lambda: messagebox.showerror("Dependencia", "pywinauto no instalado para Autologon."))
-        # ---
-        if success_flag and progress_label_percentage.cget("text") in ["Hecho ✓", "Copiado ✓", "Lanzado"]:
-            time.sleep(0.5) 
-        else:
-            time.sleep(0.2)
-            
-    root_gui.after(0, lambda: actualizar_progreso_gui(texto_status="Proceso finalizado.", valor_barra=100, texto_porcentaje="Completado"))
+    canceladas = [app for app, resultado in resultados.items() if resultado == TAREA_CANCELADA]
+    if canceladas:
+        publicar_progreso(texto_status="Proceso cancelado por usuario.", valor_barra=0)
+        root_gui.after(1000, lambda: progress_window.destroy() if progress_window and progress_window.winfo_exists() else None)
+        mostrar_advertencia("Cancelado", f"Instalación de {canceladas[0]} cancelada. Tareas restantes no se ejecutarán.", root_gui)
+        return
+
+    publicar_progreso(texto_status="Proceso finalizado.", valor_barra=100, texto_porcentaje="Completado")
     root_gui.after(2500, lambda: progress_window.destroy() if progress_window and progress_window.winfo_exists() else None) # Un poco menos de espera final
-    root_gui.after(100, lambda: messagebox.showinfo("Finalizado", "Tareas solicitadas han sido procesadas o iniciadas."))
+    mensaje_final = "Tareas solicitadas han sido procesadas o iniciadas."
+    if reinicios_pendientes:
+        mensaje_final += f"\n\nEs necesario reiniciar el equipo para completar: {', '.join(sorted(reinicios_pendientes))}."
+    root_gui.after(100, lambda: mostrar_info("Finalizado", mensaje_final))
+
+def describir_accion(nombre_app_key):
+    config = APLICACIONES_CONFIG[nombre_app_key]
+    exe_f_display = config.get("exe_filename", config.get("nombre_archivo_descargado", "archivo_desconocido.exe"))
+    return {
+        "instalar_manual_asistido": "Iniciar instalación manual.",
+        "configurar_autologon_gui": f"Configurar Autologon para '{config.get('username')}'.",
+        "descargar_e_instalar": f"Descargar e instalar '{exe_f_display}'.",
+        "instalar_local": f"Instalar '{exe_f_display}' desde local.",
+        "copiar_exe": f"Copiar '{exe_f_display}' a Documentos.",
+    }.get(config["tipo"], config["tipo"])
 
 def on_siguiente_click(app_vars_dict, root_gui):
     # ... (Lógica igual que antes) ...
@@ -397,7 +3082,7 @@ def on_siguiente_click(app_vars_dict, root_gui):
     resumen_acciones_str = "Se realizarán las siguientes acciones:\n\n"
     hay_seleccion = False
     requiere_pywinauto_seleccionado = False
-    novalct_seleccionado = False
+    manual_seleccionado = None
 
     for nombre_app_key, var_tk_bool in app_vars_dict.items():
         if var_tk_bool.get():
@@ -405,20 +3090,11 @@ def on_siguiente_click(app_vars_dict, root_gui):
             seleccionadas_keys.append(nombre_app_key)
             config = APLICACIONES_CONFIG[nombre_app_key]
             icon = config.get("icon", "") + " " if config.get("icon") else "" # Añadir icono al resumen
-            exe_f_display = config.get("exe_filename", config.get("nombre_archivo_descargado", "archivo_desconocido.exe"))
-
+            resumen_acciones_str += f"- {icon}{nombre_app_key}: {describir_accion(nombre_app_key)}\n"
             if config["tipo"] == "instalar_manual_asistido":
-                resumen_acciones_str += f"- {icon}{nombre_app_key}: Iniciar instalación manual.\n"
-                if nombre_app_key == "Novalct": novalct_seleccionado = True
+                manual_seleccionado = manual_seleccionado or nombre_app_key
             elif config["tipo"] == "configurar_autologon_gui":
-                 resumen_acciones_str += f"- {icon}{nombre_app_key}: Configurar Autologon para '{config['username']}'.\n"
-                 requiere_pywinauto_seleccionado = True
-            elif config["tipo"] == "descargar_e_instalar":
-                resumen_acciones_str += f"- {icon}{nombre_app_key}: Descargar e instalar '{exe_f_display}'.\n"
-            elif config["tipo"] == "instalar_local":
-                resumen_acciones_str += f"- {icon}{nombre_app_key}: Instalar '{exe_f_display}' desde local.\n"
-            elif config["tipo"] == "copiar_exe":
-                resumen_acciones_str += f"- {icon}{nombre_app_key}: Copiar '{exe_f_display}' a Documentos.\n"
+                requiere_pywinauto_seleccionado = True
 
     if not hay_seleccion:
         messagebox.showwarning("Sin Selección", "No has seleccionado ninguna aplicación.")
@@ -428,8 +3104,8 @@ def on_siguiente_click(app_vars_dict, root_gui):
         messagebox.showerror("Dependencia Faltante", "Autologon requiere 'pywinauto' (no instalado).")
         return
 
-    if novalct_seleccionado and len(seleccionadas_keys) > 1:
-        resumen_acciones_str += "\nATENCIÓN: NovaLCT (manual) se procesará primero.\n"
+    if manual_seleccionado and len(seleccionadas_keys) > 1:
+        resumen_acciones_str += f"\nATENCIÓN: {manual_seleccionado} (manual) se procesará primero.\n"
     
     resumen_acciones_str += "\n¿Deseas continuar?"
     if messagebox.askyesno("Confirmar Acciones", resumen_acciones_str, icon='question'): # Añadir icono al messagebox
@@ -437,7 +3113,9 @@ def on_siguiente_click(app_vars_dict, root_gui):
         thread.start()
 # --- INTERFAZ GRÁFICA PRINCIPAL ---
 def crear_ventana_principal():
-    root = tk.Tk()
+    global root_tk
+    cargar_tk()
+    root = root_tk = tk.Tk()
     root.title("Asistente de Configuración de PC")
     
     # --- ESTILOS Y TEMA ---
@@ -447,14 +3125,14 @@ def crear_ventana_principal():
         # 'clam' o 'vista' suelen ser buenas opciones para un look más moderno.
         # Elige uno que te guste y esté disponible en tu sistema.
         available_themes = style.theme_names()
-        print(f"Temas ttk disponibles: {available_themes}")
+        log.debug(f"Temas ttk disponibles: {available_themes}")
         if 'clam' in available_themes:
             style.theme_use('clam')
         elif 'vista' in available_themes: # Bueno para Windows
              style.theme_use('vista')
         # Puedes probar otros si los anteriores no te gustan o no están
     except tk.TclError:
-        print("No se pudo cambiar el tema ttk. Usando el predeterminado.")
+        log.debug("No se pudo cambiar el tema ttk. Usando el predeterminado.")
 
     # Definir fuentes
     default_font = tkfont.nametofont("TkDefaultFont")
@@ -561,11 +3239,245 @@ def crear_ventana_principal():
 
     # Mensaje inicial si falta pywinauto
     if not PYWINAUTO_AVAILABLE:
+        log.warning("pywinauto no está instalado: Autologon (GUI) no estará disponible.")
         root.after(150, lambda: messagebox.showwarning("Advertencia de Dependencia", 
                                "La librería 'pywinauto' no está instalada.\n"
                                "La funcionalidad de Autologon (GUI) no estará disponible.\n\n"
                                "Instala 'pywinauto' con 'pip install pywinauto' y reinicia."))
     root.mainloop()
 
+# --- MODO SIN VENTANA (CLI) ---
+PROGRESO_CONSOLA_HZ = 2
+
+class ImpresorProgreso:
+    # Drena el canal de progreso desde un hilo propio y escribe en stdout solo los cambios de cada tarea
+    def __init__(self, hz=PROGRESO_CONSOLA_HZ):
+        self._intervalo = 1.0 / hz
+        self._parar = threading.Event()
+        self._vistos = {}
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._hilo.join()
+        self._imprimir()  # Lo que quedase pendiente
+
+    def _bucle(self):
+        while not self._parar.wait(self._intervalo):
+            self._imprimir()
+
+    def _imprimir(self):
+        for tarea, campos in canal_progreso.drenar().items():
+            visto = self._vistos.setdefault(tarea, {})
+            cambios = {k: v for k, v in campos.items() if visto.get(k) != v}
+            if not cambios:
+                continue
+            visto.update(cambios)
+            partes = [visto.get("texto_status") or ""]
+            if visto.get("texto_porcentaje"):
+                partes.append(f"[{visto['texto_porcentaje']}]")
+            escribir_consola(f"{tarea or '-'}: {' '.join(p for p in partes if p)}", logging.DEBUG)
+
+def _escribir_informe_json(ruta, apps, inicio, duracion, resultados):
+    informe = {
+        "apps": apps,
+        "inicio": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(inicio)),
+        "duracion_s": round(duracion, 3),
+        "resultados": resultados,
+        "fases": [{"app": t, "fase": f, "inicio_s": round(i, 3), "fin_s": round(fin, 3)}
+                  for t, f, i, fin, _, _ in linea_tiempo.fases],
+        "verificacion_s": tiempos_verificacion,
+        "reinicio_pendiente": sorted(reinicios_pendientes),
+    }
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+
+def ejecutar_sin_ventana(args):
+    global RESPUESTA_AUTOMATICA
+    RESPUESTA_AUTOMATICA = args.yes
+    if args.apps.strip().lower() == "todas":
+        apps = list(APLICACIONES_CONFIG)
+    else:
+        apps = [a.strip() for a in args.apps.split(",") if a.strip()]
+    desconocidas = [a for a in apps if a not in APLICACIONES_CONFIG]
+    if desconocidas or not apps:
+        print(f"ERROR: Aplicaciones desconocidas: {', '.join(desconocidas) or '(ninguna indicada)'}. "
+              f"Disponibles: {', '.join(APLICACIONES_CONFIG)}", file=sys.stderr)
+        return 2
+    if args.comprobar:
+        instaladas = set() if args.forzar else sondear_instaladas(apps)
+        informe = comprobar_seleccion([a for a in apps if a not in instaladas])
+        print(texto_comprobacion(informe))
+        return 0 if informe["ok"] else 1
+    return _ejecutar_apps_sin_ventana(args, apps, args.forzar)
+
+def reanudar_sin_ventana(args):
+    global RESPUESTA_AUTOMATICA
+    RESPUESTA_AUTOMATICA = args.yes
+    estado = estado_reanudacion()
+    if estado is None:
+        print(f"Nada que reanudar en '{DIARIO_EJECUCION_RUTA}'.")
+        return 0
+    apps, forzar, completadas = estado
+    desconocidas = [a for a in apps if a not in APLICACIONES_CONFIG]
+    if desconocidas:
+        print(f"ERROR: El diario menciona aplicaciones que ya no existen: {', '.join(desconocidas)}", file=sys.stderr)
+        return 2
+    print(f"Reanudando: {len(completadas)} de {len(apps)} tareas ya completadas ({', '.join(completadas) or '-'}).")
+    return _ejecutar_apps_sin_ventana(args, apps, forzar or args.forzar, completadas)
+
+def manifiesto_sin_ventana(accion):
+    if not os.path.isdir(PROGRAMAS_DIR):
+        print(f"ERROR: Carpeta de programas no encontrada: '{PROGRAMAS_DIR}'", file=sys.stderr)
+        return 2
+    t0 = time.perf_counter()
+    try:
+        if accion == "crear":
+            n, total = crear_manifiesto()
+            print(f"Manifiesto de {n} archivos ({total / 1024 / 1024:.1f} MB) escrito en '{ruta_manifiesto()}' "
+                  f"en {time.perf_counter() - t0:.2f} s")
+            return 0
+        informe = verificar_manifiesto()
+    except OSError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    for etiqueta, clave in (("DISTINTO", "distintos"), ("FALTA", "faltan"), ("FUERA DEL MANIFIESTO", "sobran")):
+        for relativa in informe[clave]:
+            print(f"  {etiqueta}: {relativa}")
+    print(f"{'Copia correcta' if informe['ok'] else 'Copia INCORRECTA'}: {informe['correctos']} archivos correctos, "
+          f"{len(informe['distintos'])} distintos, {len(informe['faltan'])} faltan, {len(informe['sobran'])} fuera del manifiesto; "
+          f"{informe['releidos']} releídos ({informe['bytes_releidos'] / 1024 / 1024:.1f} MB) en {time.perf_counter() - t0:.2f} s")
+    return 0 if informe["ok"] else 1
+
+def _ejecutar_apps_sin_ventana(args, apps, forzar, completadas=None):
+    completadas = completadas or {}
+    a_ejecutar = [a for a in apps if a not in completadas]
+    # Sondas antes que la comprobación previa: solo se comprueba lo que de verdad se va a ejecutar
+    instaladas = set() if forzar else sondear_instaladas(a_ejecutar)
+    if not args.sin_comprobacion:
+        informe = comprobar_seleccion([a for a in a_ejecutar if a not in instaladas])
+        if not informe["ok"]:
+            mostrar_error("Comprobación Previa", f"{texto_comprobacion(informe)}\n"
+                          "Corrige lo anterior o repite con --sin-comprobacion.")
+            return 2
+        print(texto_comprobacion(informe))
+
+    resumen = "\n".join(f"- {a}: {'ya instalada, se omite' if a in instaladas else describir_accion(a)}" for a in a_ejecutar)
+    if not preguntar_ok_cancelar("Confirmar Acciones", f"Se realizarán las siguientes acciones:\n{resumen}"):
+        print("Cancelado por el usuario.")
+        return 1
+
+    inicio = time.time()
+    try:
+        with ImpresorProgreso():
+            resultados = ejecutar_seleccion(apps, forzar=forzar, completadas=completadas, instaladas=instaladas)
+    except ValueError as e:
+        mostrar_error("Error de Configuración", str(e))
+        return 2
+    duracion = time.time() - inicio
+
+    print(f"\nResultado ({duracion:.1f} s):")
+    for app in apps:
+        print(f"  {app}: {resultados.get(app, TAREA_OMITIDA)}")
+    if reinicios_pendientes:
+        print(f"AVISO: Es necesario reiniciar el equipo ({', '.join(sorted(reinicios_pendientes))}). "
+              f"Tras el reinicio, 'player.py --resume' continúa con lo pendiente.")
+    if args.json_report:
+        _escribir_informe_json(args.json_report, apps, inicio, duracion, resultados)
+        print(f"Informe JSON escrito en '{args.json_report}'")
+    if args.traza and TRAZA_ACTIVA:
+        linea_tiempo.exportar_chrome(args.traza)
+        print(f"Traza (formato Chrome trace) escrita en '{args.traza}'")
+    return 0 if all(r in (TAREA_OK, TAREA_YA_INSTALADA) for r in resultados.values()) else 1
+
+def main(argv=None):
+    global TRAZA_ACTIVA, PROGRAMAS_DIR, COPIA_LOCAL_MODO, DESCUBRIMIENTO_ACTIVO
+    parser = argparse.ArgumentParser(description="Asistente de configuración de PC. Sin --apps abre la ventana.")
+    parser.add_argument("--apps", help="Aplicaciones separadas por comas (o 'todas'); ejecuta sin ventana")
+    parser.add_argument("-y", "--yes", action="store_true", help="No pedir confirmación")
+    parser.add_argument("--forzar", action="store_true", help="Reinstalar aunque se detecte que la app ya está instalada")
+    parser.add_argument("--json-report", metavar="RUTA", help="Escribir un informe JSON con los resultados")
+    parser.add_argument("--traza", metavar="RUTA", help="Escribir la línea de tiempo como traza de Chrome (chrome://tracing)")
+    parser.add_argument("--sin-traza", action="store_true", help="No medir fases (sin coste de instrumentación)")
+    parser.add_argument("--resume", action="store_true", help="Continuar la última ejecución del diario (p. ej. tras un reinicio)")
+    parser.add_argument("--listar", action="store_true", help="Listar las aplicaciones disponibles y salir")
+    parser.add_argument("--programas", metavar="RUTA", help=f"Carpeta de programas (por defecto '{PROGRAMAS_DIR}')")
+    parser.add_argument("--copia-local", choices=("auto", "siempre", "nunca"),
+                        help="Copiar los instaladores a disco local antes de ejecutarlos (por defecto: auto, si el origen es extraíble o de red)")
+    parser.add_argument("--copiar-tambien-a", metavar="CARPETA", action="append", default=[],
+                        help="Carpeta que recibe también cada copia de las tareas de copia (se puede repetir)")
+    parser.add_argument("--limite-descarga", metavar="MB/S", type=float, default=os.environ.get("PLAYER_LIMITE_DESCARGA", "0"),
+                        help="Tope de todas las descargas juntas en MB/s (por defecto PLAYER_LIMITE_DESCARGA o sin límite)")
+    parser.add_argument("--manifiesto", choices=("crear", "verificar"),
+                        help="Crear el manifiesto de la carpeta de programas o verificar una copia contra él, y salir")
+    parser.add_argument("--descubrir", action="store_true",
+                        help="Añadir como apps las carpetas de programas sin configurar que tengan un único instalador reconocido")
+    parser.add_argument("--indexar", action="store_true", help="Actualizar el índice de instaladores de la carpeta de programas, mostrarlo y salir")
+    parser.add_argument("--comprobar", action="store_true", help="Solo la comprobación previa de --apps; sale con 1 si hay errores")
+    parser.add_argument("--sin-comprobacion", action="store_true", help="No hacer la comprobación previa antes de ejecutar")
+    parser.add_argument("--log-nivel", type=str.upper, choices=NIVELES_LOG,
+                        help=f"Nivel del registro en '{os.path.basename(REGISTRO_LOG_RUTA)}' (por defecto PLAYER_LOG_NIVEL o {NIVEL_LOG_POR_DEFECTO})")
+    parser.add_argument("--depurar", action="store_true", help="Registrar en nivel DEBUG y mostrar el registro en la consola")
+    if sys.argv[1:] if argv is None else argv:  # Con argumentos es modo CLI (también --help y errores de uso)
+        conectar_consola()
+    args = parser.parse_args(argv)
+    if args.programas:
+        PROGRAMAS_DIR = args.programas
+    if args.copia_local:
+        COPIA_LOCAL_MODO = args.copia_local
+    DESTINOS_COPIA_EXTRA.extend(args.copiar_tambien_a)
+    if args.descubrir:
+        DESCUBRIMIENTO_ACTIVO = True
+    if args.limite_descarga < 0:
+        parser.error("--limite-descarga no puede ser negativo")
+    fijar_limite_descarga(int(args.limite_descarga * 1024 * 1024))
+    if args.sin_traza:
+        if args.traza:
+            parser.error("--traza y --sin-traza son incompatibles")
+        TRAZA_ACTIVA = False
+    if args.apps is None and args.json_report and not (args.resume or args.listar or args.indexar or args.manifiesto):
+        parser.error("--json-report requiere --apps")
+    if args.comprobar and args.apps is None:
+        parser.error("--comprobar requiere --apps")
+
+    configurar_registro("DEBUG" if args.depurar else args.log_nivel, consola=args.depurar)
+    if SUPERVISION_ACTIVA and not PSUTIL_DISPONIBLE:
+        log.warning(f"psutil no está instalado: un instalador colgado solo se detecta al pasar "
+                    f"{INSTALADOR_TIMEOUT // 60} min (sin vigilancia de CPU y E/S)")
+    try:
+        if args.manifiesto:
+            return manifiesto_sin_ventana(args.manifiesto)
+        if args.indexar:
+            if not os.path.isdir(PROGRAMAS_DIR):
+                print(f"ERROR: Carpeta de programas no encontrada: '{PROGRAMAS_DIR}'", file=sys.stderr)
+                return 2
+            t0 = time.perf_counter()
+            archivos, analizados = actualizar_indice_programas()
+            print(f"{len(archivos)} instaladores en '{PROGRAMAS_DIR}', {analizados} leídos "
+                  f"en {time.perf_counter() - t0:.2f} s. Índice: '{INDICE_PROGRAMAS_RUTA}'")
+            for relativa, entrada in sorted(archivos.items()):
+                print(f"  {relativa}: {entrada['tipo_instalador'] or '?'} {' '.join(entrada['args_silenciosos'] or [])}")
+            return 0
+        cargar_catalogo_programas(en_segundo_plano=args.apps is None and not args.listar and not args.resume)
+        if args.listar:
+            for app in APLICACIONES_CONFIG:
+                print(f"{app}: {describir_accion(app)}")
+            return 0
+        if args.resume:
+            return reanudar_sin_ventana(args)
+        if args.apps is None:
+            crear_ventana_principal()
+            return 0
+        return ejecutar_sin_ventana(args)
+    finally:
+        cerrar_registro()
+
 if __name__ == "__main__":
-    crear_ventana_principal()
\ No newline at end of file
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()  # Los procesos del manifiesto arrancan el propio ejecutable
+    sys.exit(main())
\ No newline at end of file